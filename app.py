@@ -1,57 +1,50 @@
 # app.py
 import streamlit as st
-from managers.data_manager import DataManager
-from managers.auth_manager import AuthManager
-from managers.theme_manager import ThemeManager
-from managers.analysis_engine import AnalysisEngine
-from managers.recommendations_engine import RecommendationsEngine
+from managers.app_container import AppContainer
 from managers.ui_manager import UIManager
-from managers.sample_data_generator import SampleDataGenerator
-import os
 
-# Ensure the data folder exists
-if not os.path.exists("data"):
-    os.makedirs("data")
+
+@st.cache_resource(show_spinner=False)
+def get_container(data_dir: str = "data") -> AppContainer:
+    """
+    Build the shared managers once per process.
+
+    Every session and rerun gets the same container, so the managers'
+    caches are reused instead of being rebuilt from disk on each rerun.
+
+    Args:
+        data_dir (str): Folder holding the data, users and rule files.
+
+    Returns:
+        AppContainer: The shared managers.
+    """
+    return AppContainer(data_dir)
+
 
 def main():
     """
     Main entry point for the Wellness Tracker application.
 
-    This function initializes all the managers, sets up the application theme,
-    and handles user authentication and dashboard rendering.
+    This function gets the shared managers, sets up the current session and
+    the application theme, and handles user authentication and dashboard rendering.
     """
-    # Instantiate managers
-    data_manager = DataManager(data_csv="data/saved_data.csv")
-    auth_manager = AuthManager(users_csv="data/users.csv")
-    theme_manager = ThemeManager()
-    analysis_engine = AnalysisEngine()
-    recs_engine = RecommendationsEngine()
-    sample_gen = SampleDataGenerator(users_csv="data/users.csv", output_csv="data/saved_data.csv")
-
-    # Lightweight app object passed to UIManager
-    class App:
-        pass
-
-    app = App()
-    app.data_manager = data_manager
-    app.auth_manager = auth_manager
-    app.theme_manager = theme_manager
-    app.analysis_engine = analysis_engine
-    app.recs_engine = recs_engine
-    app.sample_gen = sample_gen
+    # Set up the Streamlit page configuration; this must be the first Streamlit command
+    st.set_page_config(layout="wide", page_title="Wellness Tracker")
+
+    app = get_container()
+
+    # Per-session state stays in st.session_state, apart from the shared managers
+    app.auth_manager.init_session()
 
     # Initialize the UI manager
     ui = UIManager(app)
 
-    # Set up the Streamlit page configuration
-    st.set_page_config(layout="wide", page_title="Wellness Tracker")
-
     # Apply the selected theme
-    theme = theme_manager.select_theme()
-    theme_manager.apply_theme(theme)
+    theme = app.theme_manager.select_theme()
+    app.theme_manager.apply_theme(theme)
 
     # Authenticate the user
-    username = auth_manager.authenticate_user()
+    username = app.auth_manager.authenticate_user()
     if not username:
         return
 
@@ -0,0 +1,24 @@
+# backfill_recommendations.py
+import argparse
+
+from managers.data_manager import DataManager
+from managers.recommendation_store import RecommendationStore, recommendation_path_for
+from managers.recommendations_engine import RecommendationsEngine
+
+parser = argparse.ArgumentParser(description="Compute and store the recommendations of all existing entries.")
+parser.add_argument("--data-csv", default="data/saved_data.csv", help="Data CSV of the store")
+parser.add_argument("--backend", choices=["csv", "sqlite", "parquet"], default="csv", help="Storage backend")
+parser.add_argument("--rules-csv", default="data/recommendation_rules.csv",
+                    help="Rule table; the built-in rules are used if it does not exist")
+parser.add_argument("--chunksize", type=int, default=100000, help="Entries read and processed per batch")
+args = parser.parse_args()
+
+data_manager = DataManager(data_csv=args.data_csv, backend=args.backend)
+store = RecommendationStore(recommendation_path_for(data_manager.backend.files()[0]),
+                            RecommendationsEngine(rules_csv=args.rules_csv))
+
+# Entries saved while the job runs are stored by the app's save listener, but the store's
+# signature stays behind; run the job again to mark it in sync
+signature = data_manager.backend.signature()
+total = store.backfill(data_manager.backend.iter_chunks(args.chunksize), signature)
+print(f"Done: recommendations for {total} entries written to '{store.db_path}'.")
@@ -0,0 +1,16 @@
+# convert_to_parquet.py
+import argparse
+
+from managers.storage import convert_csv_to_parquet
+
+parser = argparse.ArgumentParser(description="Convert the wellness data CSV to a Parquet file.")
+parser.add_argument("data_csv", nargs="?", default="data/saved_data.csv", help="CSV file to convert")
+parser.add_argument("--output", default=None, help="Parquet file to write (default: next to the CSV)")
+parser.add_argument("--partition-by", choices=["date", "user"], default="date",
+                    help="Sort order that defines the row groups")
+parser.add_argument("--row-group-size", type=int, default=65536, help="Maximum rows per row group")
+args = parser.parse_args()
+
+path = convert_csv_to_parquet(args.data_csv, args.output, partition_by=args.partition_by,
+                              row_group_size=args.row_group_size)
+print(f"Wrote '{path}'.")
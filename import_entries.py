@@ -0,0 +1,32 @@
+# import_entries.py
+import argparse
+import os
+
+import pandas as pd
+
+from managers.data_manager import DataManager
+
+parser = argparse.ArgumentParser(description="Bulk import wellness entries (e.g. wearable history) into the data store.")
+parser.add_argument("input", help="CSV or JSON Lines file with date, user_id and metric columns")
+parser.add_argument("--data-csv", default="data/saved_data.csv", help="Data CSV of the target store")
+parser.add_argument("--backend", choices=["csv", "sqlite", "parquet"], default="csv", help="Storage backend")
+parser.add_argument("--chunksize", type=int, default=50000, help="Records read and written per batch")
+args = parser.parse_args()
+
+# No automatic compaction per chunk: that would rewrite the whole CSV once per chunk of a large
+# import. The log is compacted once at the end instead.
+data_manager = DataManager(data_csv=args.data_csv, backend=args.backend, compact_threshold=None)
+
+# Stream the input so files larger than memory can be imported
+if os.path.splitext(args.input)[1].lower() in (".jsonl", ".json"):
+    chunks = pd.read_json(args.input, lines=True, dtype=False, chunksize=args.chunksize)
+else:
+    chunks = pd.read_csv(args.input, dtype=str, chunksize=args.chunksize)
+
+total = 0
+for chunk in chunks:
+    total += len(data_manager.save_entries(chunk))
+    print(f"Imported {total} records...")
+
+data_manager.compact()
+print(f"Done: {total} records imported into '{args.data_csv}'.")
@@ -0,0 +1,431 @@
+# managers/aggregate_store.py
+import pandas as pd
+import json
+import os
+import sqlite3
+from contextlib import closing
+from .base_manager import BaseManager
+from .quantile_sketch import QuantileSketch, sketch_bins
+from .schema import KEY_COLUMNS, NUMERIC_COLS
+
+# Bumped when tables are added, so stores written by older versions are rebuilt
+SCHEMA_VERSION = "2"
+
+
+def aggregate_path_for(data_file: str) -> str:
+    """
+    Build the path of the aggregate store that sits next to a data file.
+
+    Args:
+        data_file (str): Path to the main data file (CSV, SQLite or Parquet).
+
+    Returns:
+        str: Path to the aggregate database, e.g. "data/saved_data.agg.sqlite".
+    """
+    return os.path.splitext(data_file)[0] + ".agg.sqlite"
+
+
+def week_labels(dates: pd.Series) -> pd.Series:
+    """
+    Label dates with the week they fall in, as pandas' "W-MON" resampling does.
+
+    Weeks run from Tuesday to Monday and are labelled with their Monday.
+
+    Args:
+        dates (pd.Series): Datetime values.
+
+    Returns:
+        pd.Series: The Monday ending each date's week.
+    """
+    return dates + pd.to_timedelta((7 - dates.dt.weekday) % 7, unit="D")
+
+
+def _with_bins(values: pd.DataFrame) -> pd.DataFrame:
+    """
+    Add each value's QuantileSketch bin.
+
+    Args:
+        values (pd.DataFrame): Output of _long_values().
+
+    Returns:
+        pd.DataFrame: The values with an added "bin" column.
+    """
+    bins = pd.Series(0, index=values.index, dtype="int64")
+    for metric, group in values.groupby("metric"):
+        bins.loc[group.index] = sketch_bins(metric, group["value"].to_numpy())
+    return values.assign(bin=bins)
+
+
+def _long_values(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Turn entries into one row per present metric value.
+
+    Args:
+        df (pd.DataFrame): Entries with user_id, date and float metric columns.
+
+    Returns:
+        pd.DataFrame: Columns user_id, date, metric and value.
+    """
+    long = df.melt(id_vars=KEY_COLUMNS, value_vars=NUMERIC_COLS, var_name="metric", value_name="value")
+    return long.dropna(subset=["value"])
+
+
+class AggregateStore(BaseManager):
+    """
+    Per-user aggregates that are kept up to date on every save.
+
+    For each user and metric the store keeps the count, sum, sum of squares,
+    minimum and maximum, a count and sum per week, and the bin counts of a
+    QuantileSketch for approximate quantiles. Reading a user's summary or
+    weekly averages is then a keyed lookup whose cost does not depend on the
+    length of their history, and summing the bin counts over users gives the
+    sketch of a whole cohort.
+
+    The store also keeps each entry's metric values, so when an entry is
+    overwritten its old contribution can be subtracted before the new one
+    is added. Sums and counts are updated exactly. When the old value was
+    the user's minimum or maximum, that extreme is marked stale and is
+    recomputed from the kept values the next time it is read.
+
+    The store records the storage signature it is in sync with. DataManager
+    compares it with the storage: after writes that bypassed it the store is
+    stale, and readers fall back to the entries until rebuild_aggregates.py
+    or `DataManager.rebuild_aggregates()` rebuilds it.
+    """
+
+    def __init__(self, db_path="data/saved_data.agg.sqlite"):
+        """
+        Initialize the AggregateStore.
+
+        Args:
+            db_path (str): Path to the SQLite database holding the aggregates.
+        """
+        self.db_path = db_path
+        self._ensure_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Open a new connection with explicit transaction control.
+
+        Returns:
+            sqlite3.Connection: An open database connection.
+        """
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+
+    def _ensure_db(self):
+        """
+        Ensure the database and its tables exist.
+        """
+        parent = os.path.dirname(self.db_path)
+        if parent and not os.path.exists(parent):
+            os.makedirs(parent)
+        metric_columns = ", ".join(f"{c} REAL" for c in NUMERIC_COLS)
+        with closing(self._connect()) as conn:
+            conn.executescript(
+                f"""
+                CREATE TABLE IF NOT EXISTS days (
+                    user_id TEXT NOT NULL, date TEXT NOT NULL, {metric_columns},
+                    PRIMARY KEY (user_id, date)
+                );
+                CREATE TABLE IF NOT EXISTS stats (
+                    user_id TEXT NOT NULL, metric TEXT NOT NULL,
+                    count INTEGER NOT NULL, total REAL NOT NULL, total_sq REAL NOT NULL,
+                    min REAL, max REAL, stale INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (user_id, metric)
+                );
+                CREATE TABLE IF NOT EXISTS weekly (
+                    user_id TEXT NOT NULL, week TEXT NOT NULL, metric TEXT NOT NULL,
+                    count INTEGER NOT NULL, total REAL NOT NULL,
+                    PRIMARY KEY (user_id, week, metric)
+                );
+                CREATE TABLE IF NOT EXISTS quantiles (
+                    user_id TEXT NOT NULL, metric TEXT NOT NULL, bin INTEGER NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (user_id, metric, bin)
+                );
+                CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+                """
+            )
+            version = conn.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+            if version is None or version[0] != SCHEMA_VERSION:
+                # Forgetting the signature marks all tables stale until they are rebuilt
+                conn.execute("DELETE FROM meta WHERE key = 'source_signature'")
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('schema_version', ?)",
+                             (SCHEMA_VERSION,))
+
+    @staticmethod
+    def _numeric(rows: pd.DataFrame) -> pd.DataFrame:
+        """
+        Reduce records to their keys and float metric values.
+
+        Args:
+            rows (pd.DataFrame): Records with the COLUMNS schema, as strings or typed.
+
+        Returns:
+            pd.DataFrame: user_id and ISO date strings plus float metric columns.
+        """
+        out = pd.DataFrame({
+            "user_id": rows["user_id"].astype(str).to_numpy(),
+            "date": pd.to_datetime(rows["date"], errors="coerce").dt.strftime("%Y-%m-%d").to_numpy(),
+        })
+        for c in NUMERIC_COLS:
+            out[c] = pd.to_numeric(rows[c], errors="coerce").astype(float).to_numpy()
+        out = out.dropna(subset=["date"])
+        return out.drop_duplicates(subset=KEY_COLUMNS, keep="last").reset_index(drop=True)
+
+    def source_signature(self) -> str:
+        """
+        Return the storage signature the aggregates were last synced with.
+
+        Returns:
+            str: The signature as JSON, or None if the store was never synced.
+        """
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'source_signature'").fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def _set_signature(conn: sqlite3.Connection, signature):
+        """
+        Record the storage signature inside the current transaction.
+        """
+        if signature is not None:
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('source_signature', ?)",
+                (json.dumps(signature),),
+            )
+
+    def apply(self, rows: pd.DataFrame, before=None, after=None):
+        """
+        Fold newly saved records into the aggregates.
+
+        Runs in one transaction: the previous values of the saved entries are
+        looked up by key, their contribution is replaced by the new one, and
+        only the touched users, metrics and weeks are updated. If the store
+        was not in sync with the storage right before the save, nothing is
+        applied and the store stays out of sync until it is rebuilt.
+
+        Args:
+            rows (pd.DataFrame): The saved records with the COLUMNS schema.
+            before (optional): The storage signature right before the save.
+            after (optional): The storage signature right after the save.
+        """
+        new = self._numeric(rows)
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                synced = conn.execute("SELECT value FROM meta WHERE key = 'source_signature'").fetchone()
+                if before is None or (synced is not None and synced[0] == json.dumps(before)):
+                    if not new.empty:
+                        self._apply(conn, new)
+                    self._set_signature(conn, after)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _apply(self, conn: sqlite3.Connection, new: pd.DataFrame):
+        """
+        Apply saved values inside an open transaction.
+
+        Args:
+            conn (sqlite3.Connection): Connection with an open write transaction.
+            new (pd.DataFrame): Output of _numeric() for the saved records.
+        """
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS batch_keys (user_id TEXT, date TEXT)")
+        conn.execute("DELETE FROM batch_keys")
+        conn.executemany("INSERT INTO batch_keys VALUES (?, ?)", new[KEY_COLUMNS].values.tolist())
+        old = pd.read_sql_query(
+            f"SELECT d.user_id, d.date, {', '.join('d.' + c for c in NUMERIC_COLS)} "
+            "FROM days d JOIN batch_keys b ON d.user_id = b.user_id AND d.date = b.date",
+            conn,
+        )
+        old[NUMERIC_COLS] = old[NUMERIC_COLS].astype(float)
+
+        added, removed = _long_values(new), _long_values(old)
+        # Values that are saved again unchanged cannot move an extreme
+        unchanged = removed.merge(added, on=KEY_COLUMNS + ["metric", "value"], how="left", indicator=True)
+        removed_changed = removed[(unchanged["_merge"] == "left_only").to_numpy()]
+
+        delta = pd.concat([added.assign(sign=1), removed.assign(sign=-1)], ignore_index=True)
+        delta["total"] = delta["sign"] * delta["value"]
+        delta["total_sq"] = delta["sign"] * delta["value"] ** 2
+        delta["week"] = week_labels(pd.to_datetime(delta["date"])).dt.strftime("%Y-%m-%d")
+
+        # Removing a value equal to the current extreme makes that extreme stale
+        if not removed_changed.empty:
+            extremes = removed_changed.groupby(["user_id", "metric"])["value"].agg(["min", "max"]).reset_index()
+            conn.executemany(
+                "UPDATE stats SET stale = 1 WHERE user_id = ? AND metric = ? AND (min >= ? OR max <= ?)",
+                extremes[["user_id", "metric", "min", "max"]].values.tolist(),
+            )
+
+        stats = delta.groupby(["user_id", "metric"]).agg(
+            count=("sign", "sum"), total=("total", "sum"), total_sq=("total_sq", "sum"))
+        stats = stats.join(added.groupby(["user_id", "metric"])["value"].agg(["min", "max"])).reset_index()
+        stats = stats.astype(object).where(stats.notna(), None)
+        conn.executemany(
+            """
+            INSERT INTO stats (user_id, metric, count, total, total_sq, min, max) VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (user_id, metric) DO UPDATE SET
+                count = count + excluded.count,
+                total = total + excluded.total,
+                total_sq = total_sq + excluded.total_sq,
+                min = MIN(COALESCE(min, excluded.min), COALESCE(excluded.min, min)),
+                max = MAX(COALESCE(max, excluded.max), COALESCE(excluded.max, max))
+            """,
+            stats[["user_id", "metric", "count", "total", "total_sq", "min", "max"]].values.tolist(),
+        )
+
+        weekly = delta.groupby(["user_id", "week", "metric"]).agg(
+            count=("sign", "sum"), total=("total", "sum")).reset_index()
+        conn.executemany(
+            """
+            INSERT INTO weekly (user_id, week, metric, count, total) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (user_id, week, metric) DO UPDATE SET
+                count = count + excluded.count, total = total + excluded.total
+            """,
+            weekly[["user_id", "week", "metric", "count", "total"]].astype(object).values.tolist(),
+        )
+
+        bins = _with_bins(delta).groupby(["user_id", "metric", "bin"])["sign"].sum().reset_index()
+        bins = bins[bins["sign"] != 0]
+        conn.executemany(
+            """
+            INSERT INTO quantiles (user_id, metric, bin, count) VALUES (?, ?, ?, ?)
+            ON CONFLICT (user_id, metric, bin) DO UPDATE SET count = count + excluded.count
+            """,
+            bins[["user_id", "metric", "bin", "sign"]].astype(object).values.tolist(),
+        )
+
+        days = new.astype(object).where(new.notna(), None)
+        conn.executemany(
+            f"INSERT OR REPLACE INTO days (user_id, date, {', '.join(NUMERIC_COLS)}) "
+            f"VALUES ({', '.join('?' * (2 + len(NUMERIC_COLS)))})",
+            days[KEY_COLUMNS + NUMERIC_COLS].values.tolist(),
+        )
+
+    def rebuild(self, df: pd.DataFrame, signature=None):
+        """
+        Recompute all aggregates from the full set of entries.
+
+        Args:
+            df (pd.DataFrame): All entries with the COLUMNS schema.
+            signature (optional): The storage signature the entries were read at.
+        """
+        new = self._numeric(df)
+        values = _long_values(new)
+        values["week"] = week_labels(pd.to_datetime(values["date"])).dt.strftime("%Y-%m-%d")
+        values["value_sq"] = values["value"] ** 2
+        stats = values.groupby(["user_id", "metric"]).agg(
+            count=("value", "size"), total=("value", "sum"), total_sq=("value_sq", "sum"),
+            min=("value", "min"), max=("value", "max")).reset_index()
+        weekly = values.groupby(["user_id", "week", "metric"]).agg(
+            count=("value", "size"), total=("value", "sum")).reset_index()
+        bins = _with_bins(values).groupby(["user_id", "metric", "bin"]).size().reset_index()
+
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for table in ("days", "stats", "weekly", "quantiles"):
+                    conn.execute(f"DELETE FROM {table}")
+                conn.executemany(
+                    f"INSERT INTO days (user_id, date, {', '.join(NUMERIC_COLS)}) "
+                    f"VALUES ({', '.join('?' * (2 + len(NUMERIC_COLS)))})",
+                    new.astype(object).where(new.notna(), None).values.tolist(),
+                )
+                conn.executemany(
+                    "INSERT INTO stats (user_id, metric, count, total, total_sq, min, max) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    stats.astype(object).values.tolist(),
+                )
+                conn.executemany(
+                    "INSERT INTO weekly (user_id, week, metric, count, total) VALUES (?, ?, ?, ?, ?)",
+                    weekly.astype(object).values.tolist(),
+                )
+                conn.executemany(
+                    "INSERT INTO quantiles (user_id, metric, bin, count) VALUES (?, ?, ?, ?)",
+                    bins.astype(object).values.tolist(),
+                )
+                self._set_signature(conn, signature)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        self.log(f"Rebuilt aggregates for {new['user_id'].nunique()} users from {len(new)} entries.")
+
+    def user_stats(self, user_id: str) -> pd.DataFrame:
+        """
+        Read a user's running totals per metric, refreshing stale extremes first.
+
+        Args:
+            user_id (str): The user whose aggregates to read.
+
+        Returns:
+            pd.DataFrame: Indexed by metric (NUMERIC_COLS order) with count, total,
+                total_sq, min and max columns; metrics without values have a zero count.
+        """
+        user_id = str(user_id)
+        with closing(self._connect()) as conn:
+            stale = [m for (m,) in conn.execute(
+                "SELECT metric FROM stats WHERE user_id = ? AND stale = 1", (user_id,)) if m in NUMERIC_COLS]
+            if stale:
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    for metric in stale:
+                        conn.execute(
+                            f"UPDATE stats SET min = (SELECT MIN({metric}) FROM days WHERE user_id = ?), "
+                            f"max = (SELECT MAX({metric}) FROM days WHERE user_id = ?), stale = 0 "
+                            "WHERE user_id = ? AND metric = ?",
+                            (user_id, user_id, user_id, metric),
+                        )
+                    conn.execute("COMMIT")
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    raise
+            stats = pd.read_sql_query(
+                "SELECT metric, count, total, total_sq, min, max FROM stats WHERE user_id = ?",
+                conn, params=[user_id],
+            )
+        stats = stats.set_index("metric").reindex(NUMERIC_COLS)
+        stats[["count", "total", "total_sq"]] = stats[["count", "total", "total_sq"]].fillna(0)
+        return stats.astype(float)
+
+    def user_weekly(self, user_id: str) -> pd.DataFrame:
+        """
+        Read a user's weekly counts and sums per metric.
+
+        Args:
+            user_id (str): The user whose weekly buckets to read.
+
+        Returns:
+            pd.DataFrame: Columns date (the week's Monday label), metric, count and total,
+                for weeks with at least one value.
+        """
+        with closing(self._connect()) as conn:
+            weekly = pd.read_sql_query(
+                "SELECT week AS date, metric, count, total FROM weekly "
+                "WHERE user_id = ? AND count > 0 ORDER BY week",
+                conn, params=[str(user_id)],
+            )
+        weekly["date"] = pd.to_datetime(weekly["date"], format="%Y-%m-%d")
+        return weekly
+
+    def sketch(self, user_ids=None) -> QuantileSketch:
+        """
+        Read the quantile sketch of one user, several users or everyone.
+
+        Args:
+            user_ids (str or list, optional): A user id or a list of them; None for all users.
+
+        Returns:
+            QuantileSketch: The merged sketch of the selected users.
+        """
+        query = "SELECT q.metric, q.bin, SUM(q.count) AS count FROM quantiles q"
+        with closing(self._connect()) as conn:
+            if user_ids is not None:
+                user_ids = [user_ids] if isinstance(user_ids, str) else user_ids
+                conn.execute("CREATE TEMP TABLE sketch_users (user_id TEXT PRIMARY KEY)")
+                conn.executemany("INSERT OR IGNORE INTO sketch_users VALUES (?)", [(str(u),) for u in user_ids])
+                query += " JOIN sketch_users u ON q.user_id = u.user_id"
+            counts = pd.read_sql_query(query + " GROUP BY q.metric, q.bin HAVING SUM(q.count) > 0", conn)
+        return QuantileSketch.from_counts(counts)
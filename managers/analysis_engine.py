@@ -1,9 +1,89 @@
 # managers/analysis_engine.py
 import pandas as pd
+import numpy as np
 from .base_manager import BaseManager
+from .online_stats import OnlineStats
+from .quantile_sketch import QUARTILES, QuantileSketch
+from .parallel import PARALLEL_MIN_ROWS, SharedArrays, map_user_shards, resolve_workers
+from .schema import NUMERIC_COLS, is_typed_frame
+
+
+class PreparedFrame:
+    """
+    Read-only, preprocessed entries that the AnalysisEngine methods accept directly.
+
+    Created by `AnalysisEngine.prepare()`: the dates are parsed, the rows
+    sorted and the numeric columns converted once, so running several
+    analyses over the same entries does not repeat that work. The numeric
+    columns are also kept as a float frame indexed by date, which is what
+    the statistics, rolling and resampling methods work on.
+
+    The object cannot be modified, and the frames it exposes are shared
+    between analyses, so they must be treated as read-only.
+    """
+
+    __slots__ = ("data", "numeric")
+
+    def __init__(self, data: pd.DataFrame):
+        """
+        Initialize the PreparedFrame.
+
+        Args:
+            data (pd.DataFrame): Output of `AnalysisEngine.preprocess()`.
+        """
+        object.__setattr__(self, "data", data)
+        numeric = data[NUMERIC_COLS]
+        if not is_typed_frame(data):
+            numeric = numeric.apply(pd.to_numeric, errors="coerce")
+        numeric = numeric.astype(float)
+        numeric.index = pd.DatetimeIndex(data["date"])
+        object.__setattr__(self, "numeric", numeric)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("PreparedFrame is immutable")
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    @property
+    def empty(self) -> bool:
+        """
+        bool: True if there are no entries.
+        """
+        return self.data.empty
+
+
+def _window_starts(groups: np.ndarray, seconds: np.ndarray, window) -> np.ndarray:
+    """
+    Find where each row's trailing window starts, without crossing group boundaries.
+
+    Args:
+        groups (np.ndarray): Group code per row; rows are sorted by group, then time.
+        seconds (np.ndarray): Row times in seconds since the first row.
+        window (int, str or pd.Timedelta): A number of rows, or a time span such as "7D"
+            that covers the rows in (t - span, t].
+
+    Returns:
+        np.ndarray: Index of the first row in each row's window.
+    """
+    n = len(groups)
+    group_starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+    first_in_group = np.repeat(group_starts, np.diff(np.r_[group_starts, n]))
+    if isinstance(window, (int, np.integer)):
+        return np.maximum(np.arange(n) - int(window) + 1, first_in_group)
+    span = int(pd.Timedelta(window).total_seconds())
+    # Offset every group past the previous one so one search handles all groups
+    stride = int(seconds.max()) + span + 1 if n else 1
+    keys = groups.astype(np.int64) * stride + seconds
+    return np.searchsorted(keys, keys - span, side="right")
+
+
+def _allocate_local(name: str, shape, dtype) -> np.ndarray:
+    """
+    Default allocator for `AnalysisEngine._cohort_arrays()`: private memory.
+    """
+    return np.empty(shape, dtype)
 
-# Define the numeric columns used for analysis
-NUMERIC_COLS = ["sleep_hours", "mood", "stress", "activity_min"]
 
 class AnalysisEngine(BaseManager):
     """
@@ -11,12 +91,35 @@ class AnalysisEngine(BaseManager):
 
     This class includes methods for preprocessing data, calculating summary statistics,
     computing rolling means, generating correlation matrices, and creating weekly summaries.
+    Every analysis method accepts either a raw DataFrame or a PreparedFrame from
+    `prepare()`; prepare once when running several analyses over the same entries.
+
+    The cohort methods can shard large inputs by user across worker processes;
+    see `n_workers`. Bound to a DataManager that maintains aggregates, the
+    per-user weekly summary is read from the materialized weekly table.
     """
 
+    def __init__(self, n_workers: int = 1, data_manager=None):
+        """
+        Initialize the AnalysisEngine.
+
+        Args:
+            n_workers (int): Worker processes for the cohort methods. 1 runs everything
+                in this process; None or 0 uses one per CPU. Inputs with fewer than
+                parallel.PARALLEL_MIN_ROWS rows always run in this process.
+            data_manager (DataManager, optional): Source of materialized aggregates,
+                used by `weekly_summary()` when it is given a user id.
+        """
+        self.n_workers = n_workers
+        self.data_manager = data_manager
+
     def preprocess(self, df: pd.DataFrame, user_id: str = None) -> pd.DataFrame:
         """
         Preprocess the input DataFrame by normalizing dates and converting columns to numeric types.
 
+        Frames that are already typed (as returned by DataManager) skip the
+        date and numeric coercion.
+
         Args:
             df (pd.DataFrame): The input DataFrame to preprocess.
             user_id (str, optional): Filter the data for a specific user ID.
@@ -24,12 +127,17 @@ class AnalysisEngine(BaseManager):
         Returns:
             pd.DataFrame: The preprocessed DataFrame.
         """
+        if is_typed_frame(df):
+            df = df.dropna(subset=["date"])
+            if user_id:
+                df = df[df["user_id"] == user_id]
+            return df.sort_values("date").reset_index(drop=True)
+
         df = df.copy()
         if "date" in df.columns:
-            df["date"] = pd.to_datetime(df["date"], errors="coerce")
+            # Parse once and normalize to date only (midnight)
+            df["date"] = pd.to_datetime(df["date"], errors="coerce").dt.normalize()
             df = df.dropna(subset=["date"])
-            # Normalize to date only (midnight)
-            df["date"] = pd.to_datetime(df["date"].dt.date)
         else:
             df["date"] = pd.NaT
 
@@ -44,67 +152,488 @@ class AnalysisEngine(BaseManager):
 
         return df.sort_values("date").reset_index(drop=True)
 
-    def summary_stats(self, df: pd.DataFrame) -> pd.DataFrame:
+    def prepare(self, df, user_id: str = None) -> PreparedFrame:
+        """
+        Preprocess entries once for several analyses.
+
+        Args:
+            df (pd.DataFrame or PreparedFrame): The input entries. A PreparedFrame
+                is returned unchanged.
+            user_id (str, optional): Filter the data for a specific user ID.
+
+        Returns:
+            PreparedFrame: The preprocessed, read-only entries.
+        """
+        if isinstance(df, PreparedFrame):
+            if user_id and not (df.data["user_id"] == user_id).all():
+                return PreparedFrame(self.preprocess(df.data, user_id))
+            return df
+        return PreparedFrame(self.preprocess(df, user_id))
+
+    def summary_stats(self, df, quantiles: str = "exact") -> pd.DataFrame:
         """
         Calculate summary statistics for the numeric columns in the DataFrame.
 
         Args:
-            df (pd.DataFrame): The input DataFrame.
+            df (pd.DataFrame or PreparedFrame): The input entries.
+            quantiles (str): "exact" for pandas' describe(), or "approx" to take the
+                quartiles from a QuantileSketch (within half a grid step, see
+                quantile_sketch), in linear passes without sorting.
 
         Returns:
             pd.DataFrame: A DataFrame containing summary statistics.
         """
-        df = self.preprocess(df)
-        if df.empty:
+        if quantiles not in ("exact", "approx"):
+            raise ValueError(f"Unknown quantiles mode: {quantiles!r}")
+        prepared = self.prepare(df)
+        if prepared.empty:
             return pd.DataFrame(columns=["count", "mean", "std", "min", "25%", "50%", "75%", "max"], index=NUMERIC_COLS)
-        return df[NUMERIC_COLS].describe().T
+        if quantiles == "approx":
+            numeric = prepared.numeric
+            quartiles = QuantileSketch(NUMERIC_COLS).update(numeric).quantiles(QUARTILES)
+            return pd.concat([
+                pd.DataFrame({"count": numeric.count().astype(float), "mean": numeric.mean(),
+                              "std": numeric.std(), "min": numeric.min()}),
+                quartiles,
+                numeric.max().rename("max"),
+            ], axis=1)
+        return prepared.numeric.describe().T
 
-    def rolling_mean(self, df: pd.DataFrame, col: str, window: int = 7) -> pd.Series:
+    def rolling_mean(self, df, col: str, window: int = 7) -> pd.Series:
         """
         Calculate the rolling mean for a specific column over a given window.
 
         Args:
-            df (pd.DataFrame): The input DataFrame.
+            df (pd.DataFrame or PreparedFrame): The input entries.
             col (str): The column for which to calculate the rolling mean.
             window (int): The size of the rolling window.
 
         Returns:
             pd.Series: A Series containing the rolling mean values.
         """
-        df = self.preprocess(df)
-        if df.empty or col not in df.columns:
+        prepared = self.prepare(df)
+        if prepared.empty or col not in prepared.numeric.columns:
             return pd.Series(dtype=float)
-        s = df.set_index("date")[col].rolling(window=window, min_periods=1).mean()
-        return s
+        return prepared.numeric[col].rolling(window=window, min_periods=1).mean()
+
+    def rolling_means(self, df, cols=NUMERIC_COLS, windows=(7, 30), per_user: bool = False) -> pd.DataFrame:
+        """
+        Calculate trailing means for several columns and windows in one vectorized pass.
+
+        Each mean is a difference of two cumulative sums, so the cost does not
+        grow with the window size and every column and window shares the same
+        sort. Missing values are skipped, as with `rolling_mean()`.
+
+        Args:
+            df (pd.DataFrame or PreparedFrame): The input entries.
+            cols (list): The columns to average.
+            windows (tuple): Window sizes. An int counts entries; a time span such as
+                "7D" covers that many calendar days, so gaps in logging do not
+                stretch the window.
+            per_user (bool): Keep windows within each user, for frames holding
+                several users (e.g. cohort jobs).
+
+        Returns:
+            pd.DataFrame: One column per column and window, named e.g. "mood_7" or
+                "mood_7D", indexed by date (or by user_id and date if per_user).
+        """
+        prepared = self.prepare(df)
+        cols = list(cols)
+        names = [f"{c}_{w}" for w in windows for c in cols]
+        data = prepared.data
+        dates = data["date"].to_numpy(dtype="datetime64[ns]")
+        if per_user:
+            groups, users = pd.factorize(data["user_id"], sort=True)
+            # The rows are already sorted by date, so a stable sort by user keeps dates in order;
+            # the smallest integer type lets NumPy use a radix sort for up to 65536 users
+            order = np.argsort(groups.astype(np.min_scalar_type(max(len(users) - 1, 0))), kind="stable")
+            groups, dates = groups[order], dates[order]
+            index = pd.MultiIndex.from_arrays([users[groups], dates], names=["user_id", "date"])
+        else:
+            groups = np.zeros(len(data), dtype=np.int64)
+            index = pd.DatetimeIndex(dates, name="date")
+        if prepared.empty:
+            return pd.DataFrame(columns=names, index=index, dtype=float)
+
+        # One contiguous row per column keeps the cumulative sums and gathers fast
+        values = prepared.numeric[cols].to_numpy(dtype=float)
+        values = np.ascontiguousarray((values[order] if per_user else values).T)
+        present = ~np.isnan(values)
+        # Leading zero so a window starting at the first row subtracts nothing
+        zeros = np.zeros((len(cols), 1))
+        sums = np.hstack([zeros, np.cumsum(np.where(present, values, 0.0), axis=1)])
+        counts = np.hstack([zeros, np.cumsum(present, axis=1, dtype=float)])
+        seconds = (dates - dates.min()).astype("timedelta64[s]").astype(np.int64)
+
+        blocks = []
+        for window in windows:
+            starts = _window_starts(groups, seconds, window)
+            means = sums[:, 1:] - np.take(sums, starts, axis=1)
+            with np.errstate(invalid="ignore"):
+                # A window without values has a zero sum and count, giving NaN
+                means /= counts[:, 1:] - np.take(counts, starts, axis=1)
+            blocks.append(means)
+        return pd.DataFrame(np.vstack(blocks).T, index=index, columns=names)
 
-    def correlations(self, df: pd.DataFrame) -> pd.DataFrame:
+    def correlations(self, df) -> pd.DataFrame:
         """
         Compute the correlation matrix for the numeric columns in the DataFrame.
 
         Args:
-            df (pd.DataFrame): The input DataFrame.
+            df (pd.DataFrame or PreparedFrame): The input entries.
 
         Returns:
             pd.DataFrame: A DataFrame containing the correlation matrix.
         """
-        df = self.preprocess(df)
-        if df.empty:
+        prepared = self.prepare(df)
+        if prepared.empty:
             return pd.DataFrame(columns=NUMERIC_COLS, index=NUMERIC_COLS)
-        return df[NUMERIC_COLS].corr()
+        return prepared.numeric.corr()
 
-    def weekly_summary(self, df: pd.DataFrame) -> pd.DataFrame:
+    def weekly_summary(self, df=None, user_id: str = None) -> pd.DataFrame:
         """
         Generate a weekly summary of the numeric columns in the DataFrame.
 
+        Given a user id, and with the engine bound to a DataManager that maintains
+        aggregates, the user's weeks are read from the materialized weekly table,
+        where a save refreshes only the weeks it touches. The cost then depends on
+        the number of weeks, not entries, and `df` is not used. Otherwise, or
+        while the aggregates are stale, the entries are resampled.
+
         Args:
-            df (pd.DataFrame): The input DataFrame.
+            df (pd.DataFrame or PreparedFrame, optional): The input entries.
+            user_id (str, optional): Summarize this user's entries only.
 
         Returns:
             pd.DataFrame: A DataFrame containing weekly averages for the numeric columns.
         """
-        df = self.preprocess(df)
-        if df.empty:
+        if user_id is not None and self.data_manager is not None and self.data_manager.aggregates_current():
+            return self.weekly_from_aggregates(self.data_manager.aggregate_weekly(user_id))
+        if df is None:
+            raise ValueError("Entries are required when no materialized weekly table is available")
+        prepared = self.prepare(df, user_id)
+        if prepared.empty:
             return pd.DataFrame(columns=["date"] + NUMERIC_COLS)
-        df = df.set_index("date")
-        weekly = df[NUMERIC_COLS].resample("W-MON").mean().reset_index()
-        return weekly
+        weekly = prepared.numeric.resample("W-MON").mean()
+        weekly.index.name = "date"
+        return weekly.reset_index()
+
+    def summary_from_aggregates(self, stats: pd.DataFrame, sketch: QuantileSketch = None) -> pd.DataFrame:
+        """
+        Turn a user's running totals into summary statistics without reading their entries.
+
+        Args:
+            stats (pd.DataFrame): Output of `DataManager.aggregate_stats()`.
+            sketch (QuantileSketch, optional): Output of `DataManager.aggregate_sketch()`,
+                adding approximate quartiles.
+
+        Returns:
+            pd.DataFrame: count, mean, std (sample), min and max per numeric column,
+                matching those columns of `summary_stats()`; with a sketch, all of
+                the `summary_stats(..., quantiles="approx")` columns.
+        """
+        count = stats["count"]
+        mean = stats["total"] / count.where(count > 0)
+        # Sample variance from the sums; clip rounding noise below zero
+        var = ((stats["total_sq"] - count * mean ** 2) / (count - 1).where(count > 1)).clip(lower=0)
+        summary = pd.DataFrame({
+            "count": count, "mean": mean, "std": var ** 0.5, "min": stats["min"], "max": stats["max"],
+        }, index=NUMERIC_COLS)
+        if sketch is None:
+            return summary
+        quartiles = sketch.quantiles(QUARTILES).reindex(NUMERIC_COLS)
+        return pd.concat([summary.drop(columns="max"), quartiles, summary["max"]], axis=1)
+
+    def weekly_from_aggregates(self, weekly: pd.DataFrame) -> pd.DataFrame:
+        """
+        Turn a user's weekly buckets into weekly averages without reading their entries.
+
+        Args:
+            weekly (pd.DataFrame): Output of `DataManager.aggregate_weekly()`.
+
+        Returns:
+            pd.DataFrame: The same frame as `weekly_summary()`: one row per week
+                ("W-MON" labels, empty weeks included) with the average of each numeric column.
+        """
+        if weekly.empty:
+            return pd.DataFrame(columns=["date"] + NUMERIC_COLS)
+        # Scatter the buckets into a (week, metric) grid; the labels are all Mondays
+        days = weekly["date"].to_numpy(dtype="datetime64[D]")
+        first = days.min()
+        rows = (days - first).astype(np.int64) // 7
+        cols = pd.Index(NUMERIC_COLS).get_indexer(weekly["metric"])
+        known = cols >= 0
+        means = np.full((rows.max() + 1, len(NUMERIC_COLS)), np.nan)
+        means[rows[known], cols[known]] = (weekly["total"] / weekly["count"]).to_numpy(dtype=float)[known]
+        weeks = first + 7 * np.arange(len(means))
+        result = pd.DataFrame(means, columns=NUMERIC_COLS)
+        result.insert(0, "date", pd.DatetimeIndex(weeks.astype("datetime64[ns]")))
+        return result
+
+    def user_means(self, data) -> pd.DataFrame:
+        """
+        Compute each user's average metrics and number of entries.
+
+        The data can be a single DataFrame or an iterable of chunks, such as
+        `DataManager.iter_entries()`; per-user sums and counts are accumulated
+        chunk by chunk so the full history never has to be in memory.
+
+        Args:
+            data (pd.DataFrame or iterable of pd.DataFrame): Entries with user_id and numeric columns.
+
+        Returns:
+            pd.DataFrame: Per-user means of the numeric columns plus an "entries" count.
+        """
+        chunks = [data] if isinstance(data, pd.DataFrame) else data
+        sums, counts, entries = None, None, None
+        for chunk in chunks:
+            if chunk.empty:
+                continue
+            numeric = chunk.reindex(columns=NUMERIC_COLS).apply(pd.to_numeric, errors="coerce")
+            grouped = numeric.astype(float).groupby(chunk["user_id"].astype(str))
+            chunk_sums, chunk_counts, chunk_entries = grouped.sum(), grouped.count(), grouped.size()
+            if sums is None:
+                sums, counts, entries = chunk_sums, chunk_counts, chunk_entries
+            else:
+                sums = sums.add(chunk_sums, fill_value=0)
+                counts = counts.add(chunk_counts, fill_value=0)
+                entries = entries.add(chunk_entries, fill_value=0)
+        if sums is None:
+            return pd.DataFrame(columns=NUMERIC_COLS + ["entries"])
+        means = sums / counts.where(counts > 0)
+        means["entries"] = entries.astype(int)
+        means.index.name = "user_id"
+        return means
+
+    def online_stats(self, data) -> OnlineStats:
+        """
+        Accumulate running statistics over entries, chunk by chunk.
+
+        The result's `summary()` and `correlations()` have the shape of
+        `summary_stats()` and `correlations()`, and accumulators from other
+        shards can be folded in with `merge()`.
+
+        Args:
+            data (pd.DataFrame, PreparedFrame or iterable of pd.DataFrame): Entries, such as
+                the chunks of `DataManager.iter_entries()` or of `pd.read_csv(..., chunksize=...)`.
+
+        Returns:
+            OnlineStats: The accumulated statistics.
+        """
+        if isinstance(data, PreparedFrame):
+            data = data.numeric
+        chunks = [data] if isinstance(data, pd.DataFrame) else data
+        stats = OnlineStats(NUMERIC_COLS)
+        for chunk in chunks:
+            stats.update(chunk)
+        return stats
+
+    def _cohort_arrays(self, df, allocate=None):
+        """
+        Sort entries by user once and extract float metric arrays for the cohort methods.
+
+        Typed frames and PreparedFrames are used as they are; raw frames are
+        preprocessed first. After the sort every user's rows are contiguous,
+        so per-user totals, minima and maxima are single np.ufunc.reduceat calls.
+
+        Args:
+            df (pd.DataFrame or PreparedFrame): Entries of any number of users.
+            allocate (callable, optional): allocate(name, shape, dtype) returning the
+                output arrays, e.g. SharedArrays.empty. Defaults to np.empty.
+
+        Returns:
+            tuple: (user_ids in order, start row of each user, arrays), where arrays holds
+                "values", the (metric, row) float array in NUMERIC_COLS order, and "days",
+                the day numbers since 1970-01-01, both in user order.
+        """
+        if isinstance(df, PreparedFrame):
+            df = df.data
+        elif not is_typed_frame(df):
+            df = self.preprocess(df)
+        allocate = allocate or _allocate_local
+        codes, users = pd.factorize(df["user_id"], sort=True)
+        order = np.argsort(codes, kind="stable")
+        starts = np.flatnonzero(np.diff(codes[order], prepend=-1))
+        values = allocate("values", (len(NUMERIC_COLS), len(df)), np.float64)
+        for j, c in enumerate(NUMERIC_COLS):
+            column = pd.to_numeric(df[c], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+            np.take(column, order, out=values[j])
+        days = allocate("days", len(df), np.int64)
+        np.take(df["date"].to_numpy(dtype="datetime64[D]").astype(np.int64), order, out=days)
+        users = pd.Index(np.asarray(users, dtype=object), name="user_id")
+        return users, starts, {"values": values, "days": days}
+
+    def _run_cohort(self, df, compute) -> pd.DataFrame:
+        """
+        Run a cohort computation here or, for large inputs, on user shards in worker processes.
+
+        In parallel mode the sorted arrays are written straight into shared
+        memory, each worker maps the rows of its own users, and the per-shard
+        frames, which cover disjoint users in order, are concatenated.
+
+        Args:
+            df (pd.DataFrame or PreparedFrame): Entries of any number of users.
+            compute (callable): compute(users, starts, arrays) on `_cohort_arrays()` output.
+
+        Returns:
+            pd.DataFrame: The result of `compute` for all users.
+        """
+        n_workers = resolve_workers(self.n_workers)
+        if n_workers == 1 or len(df) < PARALLEL_MIN_ROWS:
+            return compute(*self._cohort_arrays(df))
+        with SharedArrays() as shared:
+            users, starts, arrays = self._cohort_arrays(df, allocate=shared.empty)
+            n_rows = len(arrays["days"])
+            if not len(users):
+                return compute(users, starts, arrays)
+            # Drop the views so the shared blocks can be closed on exit
+            del arrays
+            results = map_user_shards(compute, shared, users, starts, n_rows, n_workers)
+        return pd.concat(results)
+
+    def cohort_summary(self, df) -> pd.DataFrame:
+        """
+        Calculate summary statistics for every user at once.
+
+        The entries are sorted by user once; counts, sums, squared deviations
+        and extremes are then reduced per user with NumPy, so the cost is a
+        few linear passes over the data no matter how many users there are.
+
+        Args:
+            df (pd.DataFrame or PreparedFrame): Entries of any number of users.
+
+        Returns:
+            pd.DataFrame: Indexed by (user_id, metric), with count, mean, std (sample),
+                min and max columns.
+        """
+        return self._run_cohort(df, self._cohort_summary)
+
+    def _cohort_summary(self, users, starts, arrays) -> pd.DataFrame:
+        """
+        `cohort_summary()` on the output of `_cohort_arrays()`.
+        """
+        values = dict(zip(NUMERIC_COLS, arrays["values"]))
+        index = pd.MultiIndex.from_product([users, NUMERIC_COLS], names=["user_id", "metric"])
+        names = ["count", "mean", "std", "min", "max"]
+        if not len(users):
+            return pd.DataFrame(columns=names, index=index, dtype=float)
+        sizes = np.diff(np.r_[starts, len(values[NUMERIC_COLS[0]])])
+        stats = {name: np.empty((len(users), len(NUMERIC_COLS))) for name in names}
+        with np.errstate(invalid="ignore", divide="ignore"):
+            for j, c in enumerate(NUMERIC_COLS):
+                v = values[c]
+                present = ~np.isnan(v)
+                count = np.add.reduceat(present.astype(float), starts)
+                mean = np.add.reduceat(np.where(present, v, 0.0), starts) / count
+                # Second pass on deviations keeps the variance accurate for large values
+                deviation = np.where(present, v - np.repeat(mean, sizes), 0.0)
+                stats["count"][:, j] = count
+                stats["mean"][:, j] = mean
+                stats["std"][:, j] = np.sqrt(np.add.reduceat(deviation * deviation, starts) / (count - 1))
+                # fmin/fmax skip NaN, so only users without any value get NaN
+                stats["min"][:, j] = np.fmin.reduceat(v, starts)
+                stats["max"][:, j] = np.fmax.reduceat(v, starts)
+        return pd.DataFrame({name: a.ravel() for name, a in stats.items()}, index=index)
+
+    def cohort_weekly(self, df) -> pd.DataFrame:
+        """
+        Calculate weekly averages for every user at once.
+
+        Args:
+            df (pd.DataFrame or PreparedFrame): Entries of any number of users.
+
+        Returns:
+            pd.DataFrame: Indexed by (user_id, date), where date is the "W-MON"
+                week label as in `weekly_summary()`, with the average of each
+                numeric column. Weeks without entries are left out.
+        """
+        return self._run_cohort(df, self._cohort_weekly)
+
+    def _cohort_weekly(self, users, starts, arrays) -> pd.DataFrame:
+        """
+        `cohort_weekly()` on the output of `_cohort_arrays()`.
+        """
+        values, days = dict(zip(NUMERIC_COLS, arrays["values"])), arrays["days"]
+        codes = np.repeat(np.arange(len(users)), np.diff(np.r_[starts, len(days)]))
+        valid = days != np.iinfo(np.int64).min
+        # 1970-01-01 was a Thursday; move each day forward to the Monday closing its week
+        weeks = (days + (7 - (days + 3) % 7) % 7)[valid]
+        first = weeks.min() if len(weeks) else 0
+        n_weeks = (weeks.max() - first) // 7 + 1 if len(weeks) else 1
+        keys = codes[valid].astype(np.int64) * n_weeks + (weeks - first) // 7
+        groups, unique_keys = pd.factorize(keys)
+        order = np.argsort(unique_keys)
+        means = {}
+        with np.errstate(invalid="ignore", divide="ignore"):
+            for c in NUMERIC_COLS:
+                v = values[c][valid]
+                present = ~np.isnan(v)
+                count = np.bincount(groups, weights=present, minlength=len(unique_keys))
+                total = np.bincount(groups, weights=np.where(present, v, 0.0), minlength=len(unique_keys))
+                means[c] = (total / count)[order]
+        user_codes, week_offsets = np.divmod(np.asarray(unique_keys)[order], n_weeks)
+        index = pd.MultiIndex.from_arrays([
+            users[user_codes],
+            pd.DatetimeIndex((first + 7 * week_offsets).astype("datetime64[D]"), name="date"),
+        ], names=["user_id", "date"])
+        return pd.DataFrame(means, index=index, columns=NUMERIC_COLS)
+
+    def cohort_correlations(self, df) -> pd.DataFrame:
+        """
+        Compute every user's correlation matrix at once.
+
+        Like `correlations()`, each pair of metrics uses the entries where both
+        are present. The values are centered on each user's mean and the
+        pairwise sums are reduced per user with NumPy.
+
+        Args:
+            df (pd.DataFrame or PreparedFrame): Entries of any number of users.
+
+        Returns:
+            pd.DataFrame: Indexed by (user_id, metric) with one column per metric,
+                i.e. each user's `correlations()` matrix stacked.
+        """
+        return self._run_cohort(df, self._cohort_correlations)
+
+    def _cohort_correlations(self, users, starts, arrays) -> pd.DataFrame:
+        """
+        `cohort_correlations()` on the output of `_cohort_arrays()`; centers the values in place.
+        """
+        values = dict(zip(NUMERIC_COLS, arrays["values"]))
+        n_users, k = len(users), len(NUMERIC_COLS)
+        index = pd.MultiIndex.from_product([users, NUMERIC_COLS], names=["user_id", "metric"])
+        if not n_users:
+            return pd.DataFrame(columns=NUMERIC_COLS, index=index, dtype=float)
+        sizes = np.diff(np.r_[starts, len(values[NUMERIC_COLS[0]])])
+        centered, present, complete = values, {}, {}
+        with np.errstate(invalid="ignore", divide="ignore"):
+            for c in NUMERIC_COLS:
+                v = values[c]
+                present[c] = ~np.isnan(v)
+                complete[c] = bool(present[c].all())
+                v[~present[c]] = 0.0
+                mean = np.add.reduceat(v, starts) / np.add.reduceat(present[c].astype(float), starts)
+                # Centering by each user's mean avoids cancellation in the sums below;
+                # done in place, as the arrays are large and not needed otherwise
+                v -= np.repeat(mean, sizes)
+                v[~present[c]] = 0.0
+
+            corr = np.full((n_users, k, k), np.nan)
+            for i, a in enumerate(NUMERIC_COLS):
+                for j in range(i, k):
+                    b = NUMERIC_COLS[j]
+                    if complete[a] and complete[b]:
+                        x, y, n = centered[a], centered[b], sizes.astype(float)
+                    else:
+                        both = present[a] & present[b]
+                        x, y = np.where(both, centered[a], 0.0), np.where(both, centered[b], 0.0)
+                        n = np.add.reduceat(both.astype(float), starts)
+                    sx, sy = np.add.reduceat(x, starts), np.add.reduceat(y, starts)
+                    sxx = np.add.reduceat(x * x, starts) - sx * sx / n
+                    syy = np.add.reduceat(y * y, starts) - sy * sy / n if a != b else sxx
+                    sxy = np.add.reduceat(x * y, starts) - sx * sy / n if a != b else sxx
+                    r = np.clip(sxy / np.sqrt(sxx * syy), -1.0, 1.0)
+                    # Constant columns have no correlation, as in pandas
+                    r[(sxx <= 1e-12 * n) | (syy <= 1e-12 * n)] = np.nan
+                    corr[:, i, j] = corr[:, j, i] = r
+        return pd.DataFrame(corr.reshape(n_users * k, k), index=index, columns=NUMERIC_COLS)
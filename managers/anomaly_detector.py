@@ -0,0 +1,313 @@
+# managers/anomaly_detector.py
+import numpy as np
+import pandas as pd
+from .analysis_engine import AnalysisEngine, _window_starts
+from .base_manager import BaseManager
+from .schema import KEY_COLUMNS, NUMERIC_COLS
+
+# Smallest spread a baseline is given, so that a user who always logs the
+# same value is not flagged for a change too small to matter
+MIN_SCALE = {
+    "sleep_hours": 0.5,
+    "mood": 1.0,
+    "stress": 1.0,
+    "activity_min": 10.0,
+}
+
+# Scales the median absolute deviation to a standard deviation for normal data
+MAD_TO_STD = 1.4826
+
+# Rows per block when gathering sliding windows for the robust baseline
+_WINDOW_BLOCK_ROWS = 65536
+
+
+def _nan_row_medians(rows: np.ndarray) -> np.ndarray:
+    """
+    Median of each row of a 2-D array, skipping NaN.
+
+    Args:
+        rows (np.ndarray): Values, NaN where missing.
+
+    Returns:
+        np.ndarray: One median per row; NaN for rows without values.
+    """
+    ordered = np.sort(rows, axis=1)  # NaN sorts last
+    count = (~np.isnan(ordered)).sum(axis=1)
+    index = np.arange(len(ordered))
+    low = ordered[index, np.maximum((count - 1) // 2, 0)]
+    high = ordered[index, count // 2]
+    return np.where(count > 0, (low + high) / 2, np.nan)
+
+
+class AnomalyDetector(BaseManager):
+    """
+    Flags days on which a metric departs from the user's own recent baseline.
+
+    Every entry is compared with the `window` entries before it, from the
+    same user: either as a z-score against their mean and standard deviation
+    ("zscore"), or robustly against their median and median absolute
+    deviation ("mad"), which a few extreme days do not distort. All users
+    are scored at once: rows are sorted by user and date, the z-score
+    baselines come from differences of cumulative sums as in
+    `AnalysisEngine.rolling_means()`, and the robust baselines from sliding
+    windows sorted in blocks, so there is no loop over users.
+
+    `detect_new()` scores only newly saved entries, reading just the
+    entries their baselines need.
+    """
+
+    def __init__(self, analysis_engine: AnalysisEngine = None, window: int = 28, method: str = "zscore",
+                 threshold: float = 3.0, min_periods: int = 7):
+        """
+        Initialize the AnomalyDetector.
+
+        Args:
+            analysis_engine (AnalysisEngine, optional): Used to preprocess entries.
+            window (int): Number of previous entries forming each baseline.
+            method (str): "zscore" or "mad".
+            threshold (float): Absolute score from which a value is an anomaly.
+            min_periods (int): Fewest values a baseline needs before it is used.
+        """
+        if method not in ("zscore", "mad"):
+            raise ValueError(f"Unknown anomaly method: {method!r}")
+        self.analysis_engine = analysis_engine or AnalysisEngine()
+        self.window = int(window)
+        self.method = method
+        self.threshold = threshold
+        self.min_periods = min_periods
+
+    def _sorted_values(self, df, cols):
+        """
+        Prepare entries and sort them by user, then date.
+
+        Returns:
+            tuple: (users, user code per row, dates, (column, row) float array).
+        """
+        prepared = self.analysis_engine.prepare(df)
+        data = prepared.data
+        codes, users = pd.factorize(data["user_id"], sort=True)
+        # The rows are already sorted by date, so a stable sort by user keeps dates in order;
+        # the smallest integer type lets NumPy use a radix sort for up to 65536 users
+        order = np.argsort(codes.astype(np.min_scalar_type(max(len(users) - 1, 0))), kind="stable")
+        values = np.stack([np.take(prepared.numeric[c].to_numpy(dtype=float), order) for c in cols]) \
+            if cols else np.empty((0, len(order)))
+        dates = data["date"].to_numpy(dtype="datetime64[ns]")[order]
+        return users, codes[order], dates, values
+
+    def _zscore_baselines(self, codes: np.ndarray, values: np.ndarray) -> tuple:
+        """
+        Mean and standard deviation of each row's previous `window` values.
+
+        Returns:
+            tuple: (centers, scales, counts), each shaped like values.
+        """
+        # A window of window + 1 entries ending at a row starts where its previous entries do
+        starts = _window_starts(codes, None, self.window + 1)
+        present = ~np.isnan(values)
+        filled = np.where(present, values, 0.0)
+
+        def previous(x):
+            # Leading zero, so column i of the cumulative sum covers the rows before i
+            running = np.zeros((len(x), x.shape[1] + 1))
+            np.cumsum(x, axis=1, out=running[:, 1:])
+            return running[:, :-1] - np.take(running, starts, axis=1)
+
+        count = previous(present.astype(float))
+        total = previous(filled)
+        total_sq = previous(filled * filled)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = total / count
+            # Clip rounding noise below zero
+            var = np.maximum(total_sq - total * mean, 0.0) / (count - 1)
+        return mean, np.sqrt(var), count
+
+    def _mad_baselines(self, codes: np.ndarray, values: np.ndarray) -> tuple:
+        """
+        Median and scaled median absolute deviation of each row's previous `window` values.
+
+        Returns:
+            tuple: (centers, scales, counts), each shaped like values.
+        """
+        k, n = values.shape
+        w = self.window
+        # Put `w` missing values before every user, so no window reaches into the previous user
+        positions = np.arange(n) + (codes.astype(np.int64) + 1) * w
+        padded = np.full((k, n + (int(codes.max()) + 1 if n else 0) * w), np.nan)
+        padded[:, positions] = values
+        centers, scales, counts = (np.full((k, n), np.nan) for _ in range(3))
+        for j in range(k):
+            windows = np.lib.stride_tricks.sliding_window_view(padded[j], w)
+            for lo in range(0, n, _WINDOW_BLOCK_ROWS):
+                hi = min(lo + _WINDOW_BLOCK_ROWS, n)
+                block = windows[positions[lo:hi] - w]
+                median = _nan_row_medians(block)
+                centers[j, lo:hi] = median
+                scales[j, lo:hi] = MAD_TO_STD * _nan_row_medians(np.abs(block - median[:, None]))
+                counts[j, lo:hi] = (~np.isnan(block)).sum(axis=1)
+        return centers, scales, counts
+
+    def _score(self, df, cols) -> tuple:
+        """
+        Score every entry against its baseline.
+
+        Returns:
+            tuple: (users, codes, dates, values, centers, scores) in user, date order,
+                with (column, row) arrays.
+        """
+        cols = list(cols)
+        users, codes, dates, values = self._sorted_values(df, cols)
+        if self.method == "mad":
+            centers, scales, counts = self._mad_baselines(codes, values)
+        else:
+            centers, scales, counts = self._zscore_baselines(codes, values)
+        floor = np.array([MIN_SCALE.get(c, 0.0) for c in cols])[:, None]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            scores = (values - centers) / np.maximum(scales, floor)
+        scores[counts < self.min_periods] = np.nan
+        return users, codes, dates, values, centers, scores
+
+    def _anomalies(self, users, codes, dates, values, centers, scores, cols, direction, keep=None) -> pd.DataFrame:
+        """
+        Collect the rows whose score crosses the threshold into a long frame.
+        """
+        if direction == "up":
+            flagged = scores >= self.threshold
+        elif direction == "down":
+            flagged = scores <= -self.threshold
+        else:
+            flagged = np.abs(scores) >= self.threshold
+        if keep is not None:
+            flagged &= keep
+        metric, row = np.nonzero(flagged)
+        order = np.lexsort((np.asarray(metric), row))
+        metric, row = metric[order], row[order]
+        score = scores[metric, row]
+        return pd.DataFrame({
+            "user_id": np.asarray(users, dtype=object)[codes[row]],
+            "date": pd.DatetimeIndex(dates[row]),
+            "metric": np.asarray(cols, dtype=object)[metric],
+            "value": values[metric, row],
+            "baseline": centers[metric, row],
+            "score": score,
+            "direction": np.where(score > 0, "up", "down"),
+        })
+
+    def detect(self, df, cols=NUMERIC_COLS, direction: str = "both") -> pd.DataFrame:
+        """
+        Find anomalous values in the entries of any number of users.
+
+        Args:
+            df (pd.DataFrame or PreparedFrame): Entries with user_id, date and numeric columns.
+            cols (list): The metrics to check.
+            direction (str): "both", or "up" / "down" for values above / below the baseline only.
+
+        Returns:
+            pd.DataFrame: One row per anomaly with user_id, date, metric, value, baseline
+                (the mean or median it was compared with), score (signed; in standard
+                deviations) and direction, sorted by user and date.
+        """
+        cols = list(cols)
+        return self._anomalies(*self._score(df, cols), cols, direction)
+
+    def detect_new(self, history, new_rows, cols=NUMERIC_COLS, direction: str = "both") -> pd.DataFrame:
+        """
+        Score only newly saved entries.
+
+        Just the users in `new_rows` are looked at, and of their history only
+        the `window` entries before their earliest new entry onwards, so the
+        cost depends on the size of the batch rather than of the history.
+
+        Args:
+            history (pd.DataFrame): Stored entries; the new rows may already be included.
+            new_rows (pd.DataFrame): The saved records, overriding stored entries with the same key.
+            cols (list): The metrics to check.
+            direction (str): As in `detect()`.
+
+        Returns:
+            pd.DataFrame: Like `detect()`, for the new entries only.
+        """
+        cols = list(cols)
+        new = self.analysis_engine.preprocess(new_rows)
+        new["user_id"] = new["user_id"].astype(str)
+        history = history[history["user_id"].isin(new["user_id"].unique())]
+        old = self.analysis_engine.preprocess(history)
+        old["user_id"] = old["user_id"].astype(str)
+        combined = pd.concat([old.assign(_new=False), new.assign(_new=True)], ignore_index=True)
+        combined = combined.drop_duplicates(subset=KEY_COLUMNS, keep="last")
+        combined = combined.sort_values(KEY_COLUMNS, kind="stable").reset_index(drop=True)
+
+        # Keep each user's rows from `window` entries before their first new entry
+        codes = pd.factorize(combined["user_id"])[0]
+        position = np.arange(len(combined))
+        first_new = pd.Series(np.where(combined["_new"], position, len(combined))).groupby(codes).transform("min")
+        combined = combined[position >= first_new.to_numpy() - self.window].reset_index(drop=True)
+
+        users, codes, dates, values, centers, scores = self._score(combined, cols)
+        # _score sorts by user, then date, which is the order combined already has
+        keep = combined["_new"].to_numpy()[None, :]
+        return self._anomalies(users, codes, dates, values, centers, scores, cols, direction, keep)
+
+    def stress_spikes(self, df) -> pd.DataFrame:
+        """
+        Find days of sudden high stress.
+
+        Args:
+            df (pd.DataFrame or PreparedFrame): Entries of any number of users.
+
+        Returns:
+            pd.DataFrame: Like `detect()`, for stress values above the baseline.
+        """
+        return self.detect(df, cols=["stress"], direction="up")
+
+    def streak_breaks(self, df, min_streak: int = 3, today=None) -> pd.DataFrame:
+        """
+        Find where runs of daily entries ended.
+
+        Args:
+            df (pd.DataFrame or PreparedFrame): Entries of any number of users.
+            min_streak (int): Shortest run of consecutive days that counts as a streak.
+            today (optional): When given, a user's latest streak counts as broken if it
+                ended before yesterday.
+
+        Returns:
+            pd.DataFrame: One row per broken streak with user_id, start, end (the last
+                logged day), days (its length) and resumed (the next entry's date, or NaT).
+        """
+        prepared = self.analysis_engine.prepare(df)
+        data = prepared.data
+        if prepared.empty:
+            return pd.DataFrame({"user_id": pd.Series(dtype=object), "start": pd.Series(dtype="datetime64[ns]"),
+                                 "end": pd.Series(dtype="datetime64[ns]"), "days": pd.Series(dtype=np.int64),
+                                 "resumed": pd.Series(dtype="datetime64[ns]")})
+        codes, users = pd.factorize(data["user_id"], sort=True)
+        days = data["date"].to_numpy(dtype="datetime64[D]")
+        order = np.lexsort((days, codes))
+        codes, days = codes[order], days[order]
+        # Several entries on the same day belong to the same run
+        distinct = np.r_[True, (codes[1:] != codes[:-1]) | (days[1:] != days[:-1])]
+        codes, days = codes[distinct], days[distinct]
+        n = len(days)
+        new_user = np.r_[True, codes[1:] != codes[:-1]]
+        new_run = new_user | np.r_[True, (days[1:] - days[:-1]) != np.timedelta64(1, "D")]
+        run_starts = np.flatnonzero(new_run)
+        run_ends = np.r_[run_starts[1:], n] - 1
+        lengths = run_ends - run_starts + 1
+        # A run is broken when the same user logged again later
+        resumed_at = run_ends + 1
+        same_user = np.zeros(len(run_ends), dtype=bool)
+        inside = resumed_at < n
+        same_user[inside] = codes[resumed_at[inside]] == codes[run_ends[inside]]
+        resumed = np.full(len(run_ends), np.datetime64("NaT"), dtype="datetime64[D]")
+        resumed[same_user] = days[resumed_at[same_user]]
+        broken = same_user
+        if today is not None:
+            yesterday = np.datetime64(pd.Timestamp(today).date(), "D") - np.timedelta64(1, "D")
+            broken = broken | (days[run_ends] < yesterday)
+        keep = broken & (lengths >= min_streak)
+        return pd.DataFrame({
+            "user_id": np.asarray(users, dtype=object)[codes[run_ends[keep]]],
+            "start": pd.DatetimeIndex(days[run_starts[keep]].astype("datetime64[ns]")),
+            "end": pd.DatetimeIndex(days[run_ends[keep]].astype("datetime64[ns]")),
+            "days": lengths[keep],
+            "resumed": pd.DatetimeIndex(resumed[keep].astype("datetime64[ns]")),
+        })
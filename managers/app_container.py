@@ -0,0 +1,119 @@
+# managers/app_container.py
+import os
+import threading
+from .analysis_engine import AnalysisEngine
+from .anomaly_detector import AnomalyDetector
+from .auth_manager import AuthManager
+from .base_manager import BaseManager
+from .data_manager import DataManager
+from .recommendation_store import RecommendationStore, recommendation_path_for
+from .recommendations_engine import RecommendationsEngine
+from .sample_data_generator import SampleDataGenerator
+from .theme_manager import ThemeManager
+from .trend_recommender import TrendRecommender
+
+
+class AppContainer(BaseManager):
+    """
+    The application's managers, built once and shared by every session.
+
+    None of the managers keep per-session state: login state lives in each
+    session's st.session_state (see AuthManager.init_session()), and the
+    caches they hold, such as DataManager's entry frames and AuthManager's
+    users table, are valid for everyone. The Streamlit app builds the
+    container once per process with st.cache_resource instead of rebuilding
+    the managers, and touching their files, on every rerun.
+
+    Writes that go through the managers keep their caches in step. The
+    invalidation hooks cover the other write paths: `invalidate_entries()`
+    and `invalidate_users()` drop the caches of the data and users files,
+    and callables registered with `add_invalidation_listener()` are told
+    which kind of data changed, so caches built on top of the managers can
+    follow.
+
+    Attributes:
+        data_manager, auth_manager, theme_manager, analysis_engine, anomaly_detector,
+        recs_engine, recs_store, trend_recommender, sample_gen: The shared managers.
+    """
+
+    def __init__(self, data_dir: str = "data"):
+        """
+        Initialize the AppContainer.
+
+        Args:
+            data_dir (str): Folder holding the data, users and rule files.
+        """
+        if not os.path.exists(data_dir):
+            os.makedirs(data_dir, exist_ok=True)
+        data_csv = os.path.join(data_dir, "saved_data.csv")
+        users_csv = os.path.join(data_dir, "users.csv")
+        self._listeners = []
+        self._lock = threading.Lock()
+
+        self.data_manager = DataManager(data_csv=data_csv, aggregates=True)
+        self.auth_manager = AuthManager(users_csv=users_csv)
+        self.theme_manager = ThemeManager()
+        self.analysis_engine = AnalysisEngine(data_manager=self.data_manager)
+        self.anomaly_detector = AnomalyDetector(self.analysis_engine)
+        self.recs_engine = RecommendationsEngine(rules_csv=os.path.join(data_dir, "recommendation_rules.csv"))
+        self.recs_store = RecommendationStore(recommendation_path_for(self.data_manager.backend.files()[0]),
+                                              self.recs_engine)
+        self.trend_recommender = TrendRecommender(self.analysis_engine, self.recs_engine)
+        self.sample_gen = SampleDataGenerator(users_csv=users_csv, output_csv=data_csv)
+
+        # Write paths call back into the container
+        self.recs_store.seed(self.data_manager)
+        self.data_manager.add_save_listener(self.recs_store.apply)
+        self.data_manager.add_save_listener(lambda rows, before, after: self._notify("entries"))
+        self.sample_gen.add_write_listener(lambda path: self._entries_replaced())
+        self.auth_manager.add_users_listener(lambda: self._notify("users"))
+        self.recs_engine.add_rules_listener(lambda version: self._notify("rules"))
+
+    def add_invalidation_listener(self, listener):
+        """
+        Register a callable to run whenever shared data changes. It is called as
+        listener(kind), where kind is "entries", "users" or "rules".
+
+        Args:
+            listener (callable): The function to call.
+        """
+        with self._lock:
+            self._listeners.append(listener)
+
+    def _notify(self, kind: str):
+        """
+        Call the invalidation listeners.
+
+        Args:
+            kind (str): What changed: "entries", "users" or "rules".
+        """
+        with self._lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(kind)
+            except Exception as e:
+                self.log(f"Invalidation listener {getattr(listener, '__qualname__', listener)} failed: {e}")
+
+    def _entries_replaced(self):
+        """
+        Bring the aggregates back in sync after the sample data generator replaced
+        all entries, as part of that write rather than on a later read.
+        """
+        self.data_manager.rebuild_aggregates()
+        self.invalidate_entries()
+
+    def invalidate_entries(self):
+        """
+        Drop the cached entries after the data file was written outside DataManager,
+        e.g. by the sample data generator. The aggregates stay stale, and readers
+        use the entries, until DataManager.rebuild_aggregates() runs.
+        """
+        self.data_manager.clear_cache()
+        self._notify("entries")
+
+    def invalidate_users(self):
+        """
+        Drop the cached users table after the users file was written outside AuthManager.
+        """
+        self.auth_manager.invalidate_users()
@@ -2,7 +2,10 @@
 import streamlit as st
 import pandas as pd
 import os
+import threading
 from .base_manager import BaseManager
+from .csv_index import file_signature
+from .file_io import FileLock, atomic_write_csv, lock_path_for
 
 # Default user data for demonstration purposes
 DEFAULT_USERS = pd.DataFrame([
@@ -17,8 +20,20 @@ class AuthManager(BaseManager):
 
     This class provides functionality for user login, signup, and session management.
     It uses a CSV file to store user credentials.
+
+    One instance can be shared by all sessions of the process: the login
+    state lives in each session's st.session_state, set up by
+    `init_session()`, and the users table is cached until the file changes
+    or `invalidate_users()` is called.
     """
 
+    # Per-session state keys and their initial values
+    SESSION_DEFAULTS = {
+        "username": None,
+        "login_submitted": False,
+        "signup_submitted": False,
+    }
+
     def __init__(self, users_csv="data/users.csv"):
         """
         Initialize the AuthManager.
@@ -27,15 +42,19 @@ class AuthManager(BaseManager):
             users_csv (str): Path to the CSV file storing user credentials.
         """
         self.users_csv = users_csv
+        self._users = None
+        self._users_signature = None
+        self._users_lock = threading.Lock()
+        self._users_listeners = []
         self._ensure_users_csv()
 
-        # Initialize session state keys
-        if "username" not in st.session_state:
-            st.session_state["username"] = None
-        if "login_submitted" not in st.session_state:
-            st.session_state["login_submitted"] = False
-        if "signup_submitted" not in st.session_state:
-            st.session_state["signup_submitted"] = False
+    def init_session(self):
+        """
+        Initialize the current session's login state; call once per rerun.
+        """
+        for key, value in self.SESSION_DEFAULTS.items():
+            if key not in st.session_state:
+                st.session_state[key] = value
 
     def _ensure_users_csv(self):
         """
@@ -45,21 +64,99 @@ class AuthManager(BaseManager):
             parent = os.path.dirname(self.users_csv)
             if parent and not os.path.exists(parent):
                 os.makedirs(parent)
-            DEFAULT_USERS.to_csv(self.users_csv, index=False)
+            with FileLock(lock_path_for(self.users_csv)):
+                if not os.path.exists(self.users_csv):
+                    atomic_write_csv(DEFAULT_USERS, self.users_csv)
 
     def load_users(self):
         """
         Load user credentials from the CSV file.
 
+        The table is cached while the file's size and modification time stay
+        the same; the cached frame is shared and should be treated as read-only.
+
+        Returns:
+            pd.DataFrame: DataFrame containing user credentials.
+        """
+        signature = file_signature(self.users_csv)
+        with self._users_lock:
+            if self._users is not None and signature is not None and signature == self._users_signature:
+                return self._users
+        try:
+            users = pd.read_csv(self.users_csv, dtype=str).fillna("")
+        except pd.errors.EmptyDataError:
+            with FileLock(lock_path_for(self.users_csv)):
+                users = self._read_users_unlocked()
+            self.invalidate_users()
+            return users
+        with self._users_lock:
+            self._users, self._users_signature = users, signature
+        return users
+
+    def _read_users_unlocked(self) -> pd.DataFrame:
+        """
+        Read the users CSV, restoring the default users if the file is empty.
+
+        The caller must hold the users file lock.
+
         Returns:
             pd.DataFrame: DataFrame containing user credentials.
         """
         try:
             return pd.read_csv(self.users_csv, dtype=str).fillna("")
         except pd.errors.EmptyDataError:
-            DEFAULT_USERS.to_csv(self.users_csv, index=False)
+            atomic_write_csv(DEFAULT_USERS, self.users_csv)
             return DEFAULT_USERS.copy()
 
+    def invalidate_users(self):
+        """
+        Drop the cached users table, so the next load re-reads the file.
+
+        Writers of the users CSV call this after every write: a rewrite within
+        the file system's timestamp resolution may keep the size and mtime.
+        """
+        with self._users_lock:
+            self._users, self._users_signature = None, None
+        for listener in list(self._users_listeners):
+            try:
+                listener()
+            except Exception as e:
+                self.log(f"Users listener {getattr(listener, '__qualname__', listener)} failed: {e}")
+
+    def add_users_listener(self, listener):
+        """
+        Register a callable to run whenever the users table is invalidated, e.g. after
+        a signup. It is called without arguments.
+
+        Args:
+            listener (callable): The function to call.
+        """
+        self._users_listeners.append(listener)
+
+    def add_user(self, username: str, password: str) -> bool:
+        """
+        Add a new account to the users CSV file.
+
+        The file is re-read under an exclusive lock and replaced atomically, so
+        concurrent signups cannot overwrite each other.
+
+        Args:
+            username (str): The new username.
+            password (str): The new password.
+
+        Returns:
+            bool: True if the account was created, False if the username already exists.
+        """
+        with FileLock(lock_path_for(self.users_csv)):
+            users = self._read_users_unlocked()
+            if username in users["username"].values:
+                return False
+            df = pd.concat([users, pd.DataFrame([{"username": username, "password": password}])],
+                           ignore_index=True)
+            atomic_write_csv(df, self.users_csv)
+            self.invalidate_users()
+        return True
+
     def authenticate_user(self):
         """
         Authenticate the user by displaying login or signup options.
@@ -143,14 +240,10 @@ class AuthManager(BaseManager):
                 elif pw1 != pw2:
                     st.error("Passwords do not match.")
                     st.session_state["signup_submitted"] = False
-                elif nu in users["username"].values:
+                elif nu in users["username"].values or not self.add_user(nu, pw1):
                     st.error("Username already exists.")
                     st.session_state["signup_submitted"] = False
                 else:
-                    df = users.copy()
-                    df = pd.concat([df, pd.DataFrame([{"username": nu, "password": pw1}])],
-                                   ignore_index=True)
-                    df.to_csv(self.users_csv, index=False)
                     st.success(f"Account created. Logged in as {nu}")
                     st.session_state["username"] = nu
                     st.session_state["signup_submitted"] = False
@@ -0,0 +1,336 @@
+# managers/csv_index.py
+import pandas as pd
+import numpy as np
+import csv
+import io
+import json
+import os
+import tempfile
+from .base_manager import BaseManager
+
+
+def index_path_for(data_csv: str) -> str:
+    """
+    Build the path of the per-user index that sits next to a data CSV file.
+
+    Args:
+        data_csv (str): Path to the main data CSV file.
+
+    Returns:
+        str: Path to the index file, e.g. "data/saved_data.idx.json".
+    """
+    return os.path.splitext(data_csv)[0] + ".idx.json"
+
+
+def date_index_path_for(data_csv: str) -> str:
+    """
+    Build the path of the sorted date index that sits next to a data CSV file.
+
+    Args:
+        data_csv (str): Path to the main data CSV file.
+
+    Returns:
+        str: Path to the index file, e.g. "data/saved_data.dates.npz".
+    """
+    return os.path.splitext(data_csv)[0] + ".dates.npz"
+
+
+def _day_number(value) -> int:
+    """
+    Convert a date-like value to days since 1970-01-01.
+    """
+    return int(np.datetime64(pd.Timestamp(value).date(), "D").astype(np.int64))
+
+
+def file_signature(path: str) -> list:
+    """
+    Describe the current version of a file by its size and modification time.
+
+    Args:
+        path (str): Path to the file.
+
+    Returns:
+        list: [size, mtime_ns], or None if the file does not exist.
+    """
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+class CsvUserIndex(BaseManager):
+    """
+    Persistent per-user byte-offset index over a data CSV file.
+
+    For every user the index stores the byte ranges of that user's records,
+    with adjacent records merged into a single range. Reading one user's
+    entries then only touches those ranges instead of parsing the whole
+    file. The index is saved next to the CSV and rebuilt automatically
+    whenever the CSV's size or modification time no longer matches.
+    """
+
+    def __init__(self, data_csv: str, index_path: str = None):
+        """
+        Initialize the CsvUserIndex.
+
+        Args:
+            data_csv (str): Path to the CSV file to index.
+            index_path (str, optional): Where to persist the index. Defaults to
+                the CSV path with an ".idx.json" extension.
+        """
+        self.data_csv = data_csv
+        self.index_path = index_path or index_path_for(data_csv)
+        self._index = None
+
+    def _load(self) -> dict:
+        """
+        Return an index matching the current CSV, loading or rebuilding it as needed.
+
+        Returns:
+            dict: Index with "signature", "header" and "users" keys.
+        """
+        signature = file_signature(self.data_csv)
+        if self._index is not None and self._index["signature"] == signature:
+            return self._index
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, "r", encoding="utf-8") as f:
+                    index = json.load(f)
+                if index.get("signature") == signature:
+                    self._index = index
+                    return index
+            except (OSError, ValueError):
+                pass
+        self._index = self.rebuild()
+        return self._index
+
+    def rebuild(self) -> dict:
+        """
+        Scan the CSV once, record each user's byte ranges and persist the index.
+
+        Records are split on line endings outside quoted fields, so notes
+        containing commas, quotes or newlines are handled.
+
+        Returns:
+            dict: The rebuilt index.
+        """
+        signature = file_signature(self.data_csv)
+        users = {}
+        header = b""
+        if signature is not None:
+            with open(self.data_csv, "rb") as f:
+                header = f.readline()
+                columns = next(csv.reader([header.decode("utf-8")]), [])
+                user_col = columns.index("user_id") if "user_id" in columns else None
+                offset = len(header)
+                record, start, quotes = b"", offset, 0
+                for line in f:
+                    offset += len(line)
+                    record += line
+                    quotes += line.count(b'"')
+                    if quotes % 2:
+                        continue  # newline inside a quoted field
+                    if user_col is not None and record.strip():
+                        if b'"' in record:
+                            fields = next(csv.reader([record.decode("utf-8")]))
+                        else:
+                            fields = record.rstrip(b"\r\n").decode("utf-8").split(",")
+                        user = fields[user_col] if user_col < len(fields) else ""
+                        ranges = users.setdefault(user, [])
+                        if ranges and ranges[-1][1] == start:
+                            ranges[-1][1] = offset
+                        else:
+                            ranges.append([start, offset])
+                    record, start, quotes = b"", offset, 0
+
+        index = {"signature": signature, "header": header.decode("utf-8"), "users": users}
+        # Readers may rebuild concurrently, so each writes its own temp file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.index_path) or ".", prefix=".tmp-", suffix=".json")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(tmp_path, self.index_path)
+        self.log(f"Indexed {len(users)} users in '{self.data_csv}'.")
+        return index
+
+    def read_user(self, user_id: str) -> pd.DataFrame:
+        """
+        Read only the given user's records from the CSV.
+
+        Args:
+            user_id (str): The user whose records to read.
+
+        Returns:
+            pd.DataFrame: The user's records as strings, in file order.
+        """
+        index = self._load()
+        header = index["header"]
+        ranges = index["users"].get(str(user_id), [])
+        chunks = [header.encode("utf-8")]
+        if ranges:
+            with open(self.data_csv, "rb") as f:
+                for start, end in ranges:
+                    f.seek(start)
+                    chunks.append(f.read(end - start))
+        if not header.strip():
+            return pd.DataFrame()
+        return pd.read_csv(io.BytesIO(b"".join(chunks)), dtype=str)
+
+
+class CsvDateIndex(BaseManager):
+    """
+    Persistent sorted (user, date) index over a data CSV file.
+
+    The index holds the byte range and date of every record, kept in two
+    sorted orders: by user and date, and by date alone. A date-range lookup
+    is then two binary searches, and only the matching records are read and
+    parsed. Like CsvUserIndex, it is saved next to the CSV as NumPy arrays
+    and rebuilt whenever the CSV's size or modification time changes.
+    """
+
+    def __init__(self, data_csv: str, index_path: str = None):
+        """
+        Initialize the CsvDateIndex.
+
+        Args:
+            data_csv (str): Path to the CSV file to index.
+            index_path (str, optional): Where to persist the index. Defaults to
+                the CSV path with a ".dates.npz" extension.
+        """
+        self.data_csv = data_csv
+        self.index_path = index_path or date_index_path_for(data_csv)
+        self._index = None
+
+    def _load(self) -> dict:
+        """
+        Return an index matching the current CSV, loading or rebuilding it as needed.
+
+        Returns:
+            dict: Index arrays (see rebuild()).
+        """
+        signature = file_signature(self.data_csv) or [-1, -1]
+        if self._index is not None and list(self._index["signature"]) == signature:
+            return self._index
+        if os.path.exists(self.index_path):
+            try:
+                with np.load(self.index_path, allow_pickle=False) as npz:
+                    index = {k: npz[k] for k in npz.files}
+                if list(index["signature"]) == signature:
+                    self._index = index
+                    return index
+            except (OSError, ValueError, KeyError):
+                pass
+        self._index = self.rebuild()
+        return self._index
+
+    def rebuild(self) -> dict:
+        """
+        Scan the CSV once and persist the byte range and date of every record.
+
+        Record boundaries are found with NumPy: a newline ends a record when
+        the number of quotes before it is even, so notes containing commas,
+        quotes or newlines are handled. The key columns are parsed with pandas.
+
+        Returns:
+            dict: The rebuilt index with "signature", "header", "starts", "ends",
+                "days" and "users"/"user_bounds" (records sorted by user and date),
+                plus "by_day"/"sorted_days" (the same records ordered by date).
+        """
+        signature = file_signature(self.data_csv) or [-1, -1]
+        data = b""
+        if os.path.exists(self.data_csv):
+            with open(self.data_csv, "rb") as f:
+                data = f.read()
+        header_end = data.find(b"\n") + 1 or len(data)
+        buf = np.frombuffer(data, dtype=np.uint8)
+        newlines = np.flatnonzero(buf == ord("\n"))
+        quotes = np.flatnonzero(buf == ord('"'))
+        ends = newlines[np.searchsorted(quotes, newlines) % 2 == 0] + 1
+        ends = ends[ends > header_end]
+        if data[ends[-1] if len(ends) else header_end:].strip():
+            ends = np.append(ends, len(data))  # last record without a trailing newline
+        starts = np.concatenate([[header_end], ends[:-1]]).astype(np.int64)[:len(ends)]
+        # pandas skips blank lines, so drop them here as well to stay aligned
+        short = np.flatnonzero(ends - starts < 12)
+        blank = [i for i in short if not data[starts[i]:ends[i]].strip()]
+        keep = np.ones(len(starts), dtype=bool)
+        keep[blank] = False
+        starts, ends = starts[keep], ends[keep]
+
+        users, days = np.array([], dtype=str), np.array([], dtype=np.int64)
+        if len(starts):
+            keys = pd.read_csv(io.BytesIO(data), dtype=str, usecols=["user_id", "date"])
+            if len(keys) != len(starts):
+                raise ValueError(f"Could not align {len(keys)} records in '{self.data_csv}' with their offsets.")
+            dates = pd.to_datetime(keys["date"], errors="coerce", format="%Y-%m-%d")
+            # Invalid dates become NaT, the smallest int64, so they sort first
+            days = dates.to_numpy(dtype="datetime64[D]").astype(np.int64)
+            codes, users = pd.factorize(keys["user_id"].fillna(""), sort=True)
+            users = np.asarray(users, dtype=str)
+            order = np.lexsort((days, codes))
+            starts, ends, days = starts[order], ends[order], days[order]
+            bounds = np.searchsorted(codes[order], np.arange(len(users) + 1))
+        else:
+            bounds = np.zeros(1, dtype=np.int64)
+        by_day = np.argsort(days, kind="stable")
+
+        index = {
+            "signature": np.array(signature, dtype=np.int64),
+            "header": np.frombuffer(data[:header_end], dtype=np.uint8),
+            "starts": starts, "ends": ends, "days": days,
+            "users": users, "user_bounds": bounds.astype(np.int64),
+            "by_day": by_day, "sorted_days": days[by_day],
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.index_path) or ".", prefix=".tmp-", suffix=".npz")
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, **index)
+        os.replace(tmp_path, self.index_path)
+        self.log(f"Indexed {len(starts)} records by date in '{self.data_csv}'.")
+        return index
+
+    def read_range(self, user_id: str = None, start=None, end=None) -> pd.DataFrame:
+        """
+        Read only the records of a user and/or an inclusive date range from the CSV.
+
+        Args:
+            user_id (str, optional): Only read this user's records.
+            start (optional): First date to read.
+            end (optional): Last date to read.
+
+        Returns:
+            pd.DataFrame: The matching records as strings, in file order.
+        """
+        index = self._load()
+        lo_day = None if start is None else _day_number(start)
+        hi_day = None if end is None else _day_number(end)
+        if user_id is not None:
+            users = index["users"]
+            pos = int(np.searchsorted(users, str(user_id)))
+            if pos == len(users) or users[pos] != str(user_id):
+                selected = np.array([], dtype=np.int64)
+            else:
+                first, last = index["user_bounds"][pos], index["user_bounds"][pos + 1]
+                days = index["days"][first:last]
+                lo = first + (0 if lo_day is None else np.searchsorted(days, lo_day, "left"))
+                hi = first + (len(days) if hi_day is None else np.searchsorted(days, hi_day, "right"))
+                selected = np.arange(lo, hi)
+        else:
+            days = index["sorted_days"]
+            lo = 0 if lo_day is None else np.searchsorted(days, lo_day, "left")
+            hi = len(days) if hi_day is None else np.searchsorted(days, hi_day, "right")
+            selected = index["by_day"][lo:hi]
+
+        header = index["header"].tobytes()
+        if not header.strip():
+            return pd.DataFrame()
+        starts = np.sort(index["starts"][selected])
+        ends = np.sort(index["ends"][selected])
+        chunks = [header]
+        if len(starts):
+            # Merge adjacent records into one read each
+            breaks = np.flatnonzero(starts[1:] != ends[:-1]) + 1
+            with open(self.data_csv, "rb") as f:
+                for s, e in zip(starts[np.r_[0, breaks]], ends[np.r_[breaks - 1, len(ends) - 1]]):
+                    f.seek(s)
+                    chunks.append(f.read(e - s))
+        return pd.read_csv(io.BytesIO(b"".join(chunks)), dtype=str)
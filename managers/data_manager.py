@@ -1,65 +1,183 @@
 # managers/data_manager.py
 import pandas as pd
+import json
 import os
+import threading
 from datetime import date
+from .aggregate_store import AggregateStore, aggregate_path_for
 from .base_manager import BaseManager
+from .schema import COLUMNS, KEY_COLUMNS, merge_entries, to_typed_frame
+from .storage import COMPACT_THRESHOLD, StorageBackend, make_backend, project_columns, to_iso_date
 
-# Define the columns for the data CSV file
-COLUMNS = [
-    "date",
-    "user_id",
-    "sleep_hours",
-    "mood",
-    "stress",
-    "activity_min",
-    "notes"
-]
+# Process-wide cache of typed entry frames: data file -> (storage signature, frame)
+_ENTRY_CACHE = {}
+_CACHE_LOCK = threading.Lock()
+_CACHE_STATS = {"hits": 0, "misses": 0, "updates": 0}
+
+
+def _filter_typed(df: pd.DataFrame, user_id: str = None, start=None, end=None) -> pd.DataFrame:
+    """
+    Filter typed entries by user and an inclusive date range.
+
+    Args:
+        df (pd.DataFrame): Typed entries.
+        user_id (str, optional): Keep only this user's entries.
+        start (optional): First date to keep.
+        end (optional): Last date to keep.
+
+    Returns:
+        pd.DataFrame: The matching entries.
+    """
+    if user_id is None and start is None and end is None:
+        return df.copy(deep=False)
+    mask = pd.Series(True, index=df.index)
+    if user_id is not None:
+        mask &= df["user_id"] == str(user_id)
+    if start is not None:
+        mask &= df["date"] >= pd.Timestamp(to_iso_date(start))
+    if end is not None:
+        mask &= df["date"] <= pd.Timestamp(to_iso_date(end))
+    return df[mask].reset_index(drop=True)
 
 
 class DataManager(BaseManager):
     """
     Manages the storage and retrieval of user wellness data.
 
-    This class handles operations such as loading entries from a CSV file,
-    ensuring the file structure, and saving new or updated entries.
+    This class handles operations such as loading entries and saving new or
+    updated entries. The actual storage is delegated to a pluggable backend:
+    a flat CSV file with an append log (the default), an embedded SQLite
+    database keyed on (user_id, date) or a columnar Parquet file.
+
+    Loaded frames are kept in a process-wide cache keyed on the data file and
+    validated against the storage files' inode, size and mtime, so Streamlit
+    reruns only re-parse the data after it actually changed. Frames returned
+    from the cache share memory with it and should be treated as read-only.
+
+    Derived stores can register save listeners, which are called with every
+    batch of saved records while the storage lock is still held. The optional
+    per-user AggregateStore is kept up to date this way.
     """
 
-    def __init__(self, data_csv="data/saved_data.csv"):
+    def __init__(self, data_csv="data/saved_data.csv", append_only=True, compact_threshold=COMPACT_THRESHOLD,
+                 backend="csv", db_path=None, aggregates=False):
         """
         Initialize the DataManager.
 
         Args:
             data_csv (str): Path to the CSV file storing user wellness data.
+            append_only (bool): For the CSV backend, append saves to the log instead of rewriting the CSV.
+            compact_threshold (int): For the CSV backend, log size in bytes that triggers an
+                automatic compaction. Use None to only compact on demand.
+            backend (str or StorageBackend): "csv", "sqlite", "parquet" or a ready-made backend instance.
+            db_path (str, optional): Path to the SQLite database or Parquet file. Defaults to
+                the CSV path with a ".sqlite" or ".parquet" extension; a new store is
+                seeded from data_csv.
+            aggregates (bool): Maintain per-user aggregates on every save (see AggregateStore),
+                stored next to the data file.
         """
         self.data_csv = data_csv
-        self._ensure_csv()
+        self.use_cache = True
+        self._save_listeners = []
+        if isinstance(backend, StorageBackend):
+            self.backend = backend
+        elif backend == "csv":
+            self.backend = make_backend("csv", data_csv, append_only=append_only,
+                                        compact_threshold=compact_threshold)
+        else:
+            self.backend = make_backend(backend, data_csv, db_path=db_path)
+        self.aggregates = None
+        if aggregates:
+            self.aggregates = AggregateStore(aggregate_path_for(self.backend.files()[0]))
+            self._seed_aggregates()
+            self.add_save_listener(self.aggregates.apply)
+
+    def load_entries(self, user_id: str = None, start=None, end=None, columns=None) -> pd.DataFrame:
+        """
+        Load entries from storage, optionally filtered by user and date.
+
+        Args:
+            user_id (str, optional): Only return this user's entries.
+            start (optional): First date to return (inclusive).
+            end (optional): Last date to return (inclusive).
+            columns (list, optional): Only return these columns, e.g. ["date"] + NUMERIC_COLS.
+                When the cache is cold, only these columns are read from storage.
+
+        Returns:
+            pd.DataFrame: Typed DataFrame (see schema.DTYPES) containing the user wellness data.
+        """
+        if self.use_cache:
+            cached = self._peek_cache() if columns is not None else self._cached_entries()
+            if cached is not None:
+                return project_columns(_filter_typed(cached, user_id, start, end), columns)
+        return to_typed_frame(self.backend.read(user_id=user_id, start=start, end=end, columns=columns))
 
-    def _ensure_csv(self):
+    def load_user_entries(self, user_id: str, start=None, end=None, columns=None) -> pd.DataFrame:
         """
-        Ensure the data CSV file exists. If not, create it with the required columns.
+        Load a single user's entries without reading other users' data.
+
+        The CSV backend serves this from a per-user offset index that is
+        rebuilt automatically when the data file changes; the SQLite backend
+        uses its (user_id, date) primary key.
+
+        Args:
+            user_id (str): The user whose entries to load.
+            start (optional): First date to return (inclusive).
+            end (optional): Last date to return (inclusive).
+            columns (list, optional): Only return these columns.
+
+        Returns:
+            pd.DataFrame: Typed DataFrame (see schema.DTYPES) containing the user's wellness data.
         """
-        parent = os.path.dirname(self.data_csv)
-        if parent and not os.path.exists(parent):
-            os.makedirs(parent)
-        if not os.path.exists(self.data_csv):
-            pd.DataFrame(columns=COLUMNS).to_csv(self.data_csv, index=False)
+        if self.use_cache:
+            cached = self._peek_cache()
+            if cached is not None:
+                return project_columns(_filter_typed(cached, user_id, start, end), columns)
+        return to_typed_frame(self.backend.read_user(user_id, start=start, end=end, columns=columns))
 
-    def load_entries(self) -> pd.DataFrame:
+    def query(self, user_id: str = None, start=None, end=None, columns=None) -> pd.DataFrame:
         """
-        Load all entries from the data CSV file.
+        Load the entries of a user and/or an inclusive date range, e.g. "the last 30 days".
+
+        Unlike load_entries() with a cold cache, this does not parse the whole
+        store and filter afterwards: the CSV backend binary-searches a sorted
+        date index and reads only the matching records, SQLite uses its
+        (user_id, date) and date indexes and Parquet skips row groups by their
+        date statistics. A warm cache is still used as is.
+
+        Args:
+            user_id (str, optional): Only return this user's entries.
+            start (optional): First date to return (inclusive).
+            end (optional): Last date to return (inclusive).
+            columns (list, optional): Only return these columns.
 
         Returns:
-            pd.DataFrame: DataFrame containing all user wellness data.
+            pd.DataFrame: Typed DataFrame (see schema.DTYPES) with the matching entries.
         """
-        try:
-            df = pd.read_csv(self.data_csv, dtype=str)
-        except pd.errors.EmptyDataError:
-            df = pd.DataFrame(columns=COLUMNS)
-            df.to_csv(self.data_csv, index=False)
-        for c in COLUMNS:
-            if c not in df.columns:
-                df[c] = pd.NA
-        return df[COLUMNS].copy()
+        if self.use_cache:
+            cached = self._peek_cache()
+            if cached is not None:
+                return project_columns(_filter_typed(cached, user_id, start, end), columns)
+        return to_typed_frame(self.backend.query(user_id=user_id, start=start, end=end, columns=columns))
+
+    def iter_entries(self, chunksize: int = 100000, columns=None, user_ids=None):
+        """
+        Stream entries in typed chunks with bounded memory.
+
+        Meant for offline jobs over histories that do not fit in memory; the
+        process-wide cache is bypassed. Each entry appears exactly once, but
+        chunks are not sorted by user or date.
+
+        Args:
+            chunksize (int): Maximum number of rows per chunk.
+            columns (list, optional): Only return these columns, e.g. ["user_id", "date"] + NUMERIC_COLS.
+            user_ids (list, optional): Only return these users' entries.
+
+        Yields:
+            pd.DataFrame: Typed chunks (see schema.DTYPES).
+        """
+        for chunk in self.backend.iter_chunks(chunksize=chunksize, columns=columns, user_ids=user_ids):
+            yield to_typed_frame(chunk)
 
     def save_entry(self, entry: dict) -> pd.DataFrame:
         """
@@ -69,29 +187,262 @@ class DataManager(BaseManager):
             entry (dict): A dictionary containing the user's wellness data.
 
         Returns:
-            pd.DataFrame: Updated DataFrame containing all user wellness data.
+            pd.DataFrame: The record that was written, or the full updated
+                DataFrame when the CSV backend rewrites the file.
         """
-        df = self.load_entries()
-
-        today_str = date.today().isoformat()
-        entry_date = today_str  # Force today's date
         entry_copy = entry.copy()
-        entry_copy["date"] = entry_date
+        entry_copy["date"] = date.today().isoformat()  # Force today's date
+        return self._write(pd.DataFrame([entry_copy]).reindex(columns=COLUMNS))
 
-        # Check if an entry for the user and date already exists
-        if not df.empty:
-            mask = (df["user_id"].astype(str) == str(entry_copy["user_id"])) & (df["date"].astype(str) == entry_date)
-        else:
-            mask = pd.Series([False] * 0)
+    def save_entries(self, entries) -> pd.DataFrame:
+        """
+        Save or overwrite many entries at once, keeping their own dates.
 
-        if mask.any():
-            # Overwrite specific columns for the existing entry
-            idx = df.index[mask][0]
-            for col in ["sleep_hours", "mood", "stress", "activity_min", "notes"]:
-                df.at[idx, col] = entry_copy.get(col)
-        else:
-            # Append a new entry
-            df = pd.concat([df, pd.DataFrame([entry_copy])], ignore_index=True)
+        Dates are normalized to ISO strings, records without a user or a valid
+        date are dropped, and duplicates within the batch are resolved on
+        (user_id, date) with the last record winning. The batch is then
+        written to storage in a single operation.
+
+        Args:
+            entries (pd.DataFrame or iterable of dict): Records with the COLUMNS fields.
+
+        Returns:
+            pd.DataFrame: The deduplicated records that were written.
+        """
+        rows = entries if isinstance(entries, pd.DataFrame) else pd.DataFrame(list(entries))
+        rows = rows.reindex(columns=COLUMNS)
+        rows["date"] = pd.to_datetime(rows["date"], errors="coerce").dt.strftime("%Y-%m-%d")
+        rows["user_id"] = rows["user_id"].where(rows["user_id"].isna(), rows["user_id"].astype(str).str.strip())
+        valid = rows["date"].notna() & rows["user_id"].notna() & (rows["user_id"] != "")
+        if not valid.all():
+            self.log(f"Skipping {int((~valid).sum())} records without a user or a valid date.")
+        rows = rows[valid].drop_duplicates(subset=KEY_COLUMNS, keep="last").reset_index(drop=True)
+        if rows.empty:
+            return rows
+        self._write(rows)
+        return rows
+
+    def _write(self, rows: pd.DataFrame) -> pd.DataFrame:
+        """
+        Upsert records through the backend and keep the cache in step.
+
+        Args:
+            rows (pd.DataFrame): Records with the COLUMNS schema.
+
+        Returns:
+            pd.DataFrame: The backend's upsert result.
+        """
+        result, before, after = self.backend.write(rows, after_write=self._notify_listeners)
+        self._update_cache(before, after, rows)
+        return result
+
+    def add_save_listener(self, listener):
+        """
+        Register a callable to run after every save and compaction.
+
+        Listeners are called as listener(rows, before, after) with the saved
+        records (COLUMNS schema, as strings) and the storage signatures right
+        before and after the write, while the storage lock is still held. A
+        listener that fails is logged and does not fail the save; stores
+        that record the signature can detect the gap and are rebuilt later.
+
+        Args:
+            listener (callable): The function to call.
+        """
+        self._save_listeners.append(listener)
+
+    def _notify_listeners(self, rows: pd.DataFrame, before: tuple, after: tuple):
+        """
+        Call the save listeners with freshly written records.
+
+        Args:
+            rows (pd.DataFrame): The records that were written.
+            before (tuple): Storage signature right before the write.
+            after (tuple): Storage signature right after the write.
+        """
+        for listener in self._save_listeners:
+            try:
+                listener(rows, before, after)
+            except Exception as e:
+                self.log(f"Save listener {getattr(listener, '__qualname__', listener)} failed: {e}")
+
+    def compact(self) -> pd.DataFrame:
+        """
+        Fold pending appended records back into clean storage.
+
+        Returns:
+            pd.DataFrame: The compacted DataFrame containing all user wellness data.
+        """
+        df = self.backend.compact(after_write=self._notify_listeners)
+        # Another process may have written right after the compaction, so the
+        # new files are re-read on the next load rather than re-keyed here
+        self.clear_cache()
+        return df
 
-        df.to_csv(self.data_csv, index=False)
+    def _seed_aggregates(self):
+        """
+        Mark a new aggregate store as in sync with storage that holds no entries yet,
+        so saves keep it current from the first one without a rebuild.
+        """
+        if self.aggregates.source_signature() is not None:
+            return
+        chunks = self.backend.iter_chunks(1, columns=["date"])
+        has_entries = any(len(chunk) for chunk in chunks)
+        chunks.close()
+        if not has_entries:
+            df, signature = self.backend.snapshot()
+            self.aggregates.rebuild(df, signature)
+
+    def aggregates_current(self) -> bool:
+        """
+        Check whether the aggregate store is in sync with the storage.
+
+        Writes that bypass DataManager, an interrupted save or a writer without
+        aggregates leave the store stale until `rebuild_aggregates()` runs.
+        Readers fall back to computing from the entries meanwhile.
+
+        Returns:
+            bool: True if aggregates are maintained and up to date.
+        """
+        if self.aggregates is None:
+            return False
+        return self.aggregates.source_signature() == json.dumps(self.backend.signature())
+
+    def rebuild_aggregates(self) -> bool:
+        """
+        Recompute the aggregate store from all entries if it is stale.
+
+        This reads the whole storage, so it belongs in a script
+        (rebuild_aggregates.py) or a step after a bulk write, not on a read.
+
+        Returns:
+            bool: True if the store was rebuilt.
+        """
+        if self.aggregates is None or self.aggregates_current():
+            return False
+        df, signature = self.backend.snapshot()
+        self.aggregates.rebuild(df, signature)
+        return True
+
+    def aggregate_stats(self, user_id: str) -> pd.DataFrame:
+        """
+        Read a user's running totals per metric from the aggregate store.
+        Check `aggregates_current()` first; a stale store is not rebuilt here.
+
+        Args:
+            user_id (str): The user whose aggregates to read.
+
+        Returns:
+            pd.DataFrame: See AggregateStore.user_stats(); pass it to
+                AnalysisEngine.summary_from_aggregates().
+        """
+        return self.aggregates.user_stats(user_id)
+
+    def aggregate_weekly(self, user_id: str) -> pd.DataFrame:
+        """
+        Read a user's weekly buckets from the aggregate store.
+        Check `aggregates_current()` first; a stale store is not rebuilt here.
+
+        Args:
+            user_id (str): The user whose weekly buckets to read.
+
+        Returns:
+            pd.DataFrame: See AggregateStore.user_weekly(); pass it to
+                AnalysisEngine.weekly_from_aggregates().
+        """
+        return self.aggregates.user_weekly(user_id)
+
+    def aggregate_sketch(self, user_ids=None):
+        """
+        Read the quantile sketch of one user, several users or everyone from the aggregate store.
+        Check `aggregates_current()` first; a stale store is not rebuilt here.
+
+        Args:
+            user_ids (str or list, optional): A user id or a list of them; None for all users.
+
+        Returns:
+            QuantileSketch: See AggregateStore.sketch(); pass it to
+                AnalysisEngine.summary_from_aggregates() or call its quantiles().
+        """
+        return self.aggregates.sketch(user_ids)
+
+    @property
+    def _cache_key(self) -> str:
+        """
+        Identify this data set in the process-wide cache.
+
+        Returns:
+            str: The backend's primary data file.
+        """
+        return os.path.abspath(self.backend.files()[0])
+
+    def _peek_cache(self) -> pd.DataFrame:
+        """
+        Return the cached frame if it is still current, without loading anything.
+
+        Returns:
+            pd.DataFrame: The cached typed frame, or None on a miss.
+        """
+        signature = self.backend.signature()
+        with _CACHE_LOCK:
+            cached = _ENTRY_CACHE.get(self._cache_key)
+            if cached is not None and cached[0] == signature:
+                _CACHE_STATS["hits"] += 1
+                return cached[1]
+        return None
+
+    def _cached_entries(self) -> pd.DataFrame:
+        """
+        Return all typed entries, re-reading storage only if its files changed.
+
+        Returns:
+            pd.DataFrame: The cached typed frame.
+        """
+        cached = self._peek_cache()
+        if cached is not None:
+            return cached
+        signature = self.backend.signature()
+        df = to_typed_frame(self.backend.read())
+        with _CACHE_LOCK:
+            _CACHE_STATS["misses"] += 1
+            _ENTRY_CACHE[self._cache_key] = (signature, df)
         return df
+
+    def _update_cache(self, before: tuple, after: tuple, rows: pd.DataFrame):
+        """
+        Apply freshly written records to the cached frame instead of dropping it.
+
+        The cache is only updated if it matched the storage right before the
+        write; otherwise it is left to be re-read on the next load.
+
+        Args:
+            before (tuple): Storage signature taken right before the write.
+            after (tuple): Storage signature taken right after the write.
+            rows (pd.DataFrame): The records that were written.
+        """
+        with _CACHE_LOCK:
+            cached = _ENTRY_CACHE.get(self._cache_key)
+            if cached is None or cached[0] != before:
+                _ENTRY_CACHE.pop(self._cache_key, None)
+                return
+            df = merge_entries(cached[1], to_typed_frame(rows))
+            _ENTRY_CACHE[self._cache_key] = (after, df)
+            _CACHE_STATS["updates"] += 1
+
+    def clear_cache(self):
+        """
+        Drop this data set from the process-wide cache.
+        """
+        with _CACHE_LOCK:
+            _ENTRY_CACHE.pop(self._cache_key, None)
+
+    @staticmethod
+    def cache_stats() -> dict:
+        """
+        Report process-wide cache counters.
+
+        Returns:
+            dict: Number of cache hits, misses (full reads) and in-place updates on save.
+        """
+        with _CACHE_LOCK:
+            return dict(_CACHE_STATS, entries=len(_ENTRY_CACHE))
@@ -0,0 +1,162 @@
+# managers/file_io.py
+import pandas as pd
+import json
+import os
+import tempfile
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    """
+    Advisory inter-process lock backed by a lock file.
+
+    Uses flock() on POSIX and msvcrt.locking() on Windows. Every `with`
+    block opens its own descriptor, so the lock also serializes threads of
+    the same process. Shared locks let readers run together while a writer
+    holds the lock exclusively (Windows only supports exclusive locks).
+    """
+
+    def __init__(self, path: str, shared: bool = False):
+        """
+        Initialize the FileLock.
+
+        Args:
+            path (str): Path of the lock file (created if missing).
+            shared (bool): Take a shared (read) lock instead of an exclusive one.
+        """
+        self.path = path
+        self.shared = shared
+        self._fd = None
+
+    def __enter__(self):
+        parent = os.path.dirname(self.path)
+        if parent and not os.path.exists(parent):
+            os.makedirs(parent, exist_ok=True)
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_SH if self.shared else fcntl.LOCK_EX)
+        else:
+            while True:
+                try:
+                    msvcrt.locking(self._fd, msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    time.sleep(0.05)  # LK_LOCK gives up after ~10s; keep waiting
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+
+def lock_path_for(path: str) -> str:
+    """
+    Build the path of the lock file that guards a data file.
+
+    Args:
+        path (str): Path to the data file.
+
+    Returns:
+        str: Path to the lock file, e.g. "data/saved_data.lock".
+    """
+    return os.path.splitext(path)[0] + ".lock"
+
+
+def atomic_write_csv(df: pd.DataFrame, path: str):
+    """
+    Write a DataFrame to CSV so readers never see a half-written file.
+
+    The data is written and fsynced to a temporary file in the same folder,
+    which then replaces the target with an atomic rename.
+
+    Args:
+        df (pd.DataFrame): The data to write.
+        path (str): Destination CSV file.
+    """
+    parent = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=parent, prefix=".tmp-", suffix=".csv")
+    try:
+        with os.fdopen(fd, "w", newline="", encoding="utf-8") as f:
+            df.to_csv(f, index=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class WriteJournal:
+    """
+    Small write-ahead journal for storage writes.
+
+    A batch is recorded (and fsynced) before it is applied and the journal
+    is cleared once the write completed. If the process dies in between,
+    the batch is still in the journal and is replayed the next time the
+    storage is opened. Replays must therefore be idempotent, which upserts
+    keyed on (user_id, date) are. Callers hold the storage lock around
+    record/apply/clear, so the journal holds at most one pending batch.
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize the WriteJournal.
+
+        Args:
+            path (str): Path of the journal file.
+        """
+        self.path = path
+
+    def record(self, rows: pd.DataFrame):
+        """
+        Durably record a batch that is about to be applied.
+
+        Args:
+            rows (pd.DataFrame): The records to be written.
+        """
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(rows.to_json(orient="records") + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def pending(self) -> pd.DataFrame:
+        """
+        Read batches that were recorded but never cleared.
+
+        A torn last line (a crash while recording) is ignored, as that
+        batch was never applied.
+
+        Returns:
+            pd.DataFrame: The pending records in write order (empty if none).
+        """
+        if not os.path.exists(self.path):
+            return pd.DataFrame()
+        records = []
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.extend(json.loads(line))
+                except ValueError:
+                    continue
+        return pd.DataFrame(records)
+
+    def clear(self):
+        """
+        Mark all recorded batches as applied.
+        """
+        if os.path.exists(self.path):
+            os.remove(self.path)
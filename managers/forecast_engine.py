@@ -0,0 +1,479 @@
+# managers/forecast_engine.py
+import numpy as np
+import pandas as pd
+import os
+import tempfile
+from .analysis_engine import AnalysisEngine
+from .base_manager import BaseManager
+from .schema import METRIC_RANGES, NUMERIC_COLS, is_typed_frame
+
+# Day number of metrics that were never observed
+_NEVER = np.iinfo(np.int64).min
+
+
+def _day_numbers(dates) -> np.ndarray:
+    """
+    Convert dates to days since 1970-01-01.
+
+    Args:
+        dates (array-like): Datetime values.
+
+    Returns:
+        np.ndarray: int64 day numbers, _NEVER for missing dates.
+    """
+    # NaT converts to the smallest int64, which is _NEVER
+    return np.asarray(dates, dtype="datetime64[D]").astype(np.int64)
+
+
+def _metric_values(column: pd.Series) -> np.ndarray:
+    """
+    np.ndarray: A metric column as float64, NaN where missing or not numeric.
+    """
+    return pd.to_numeric(column, errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+
+
+class ForecastState:
+    """
+    Fitted Holt state of every user and metric.
+
+    Holds each user's smoothed level and trend per metric, together with the
+    day of the last value folded in, so forecasts are a closed formula and
+    new entries can be folded in without replaying the history.
+
+    It also records what was read from storage, so a later run can resume
+    from the store alone: each user's latest entry, the `window` from the
+    oldest of those, and a digest of each user's stored entries within the
+    window. Re-reading the window then finds new entries (after a user's
+    latest) as well as edited or back-dated ones (a changed digest).
+
+    Attributes:
+        users (pd.Index): User ids, one row of the arrays each.
+        level (np.ndarray): (user, metric) smoothed levels, NaN if never observed.
+        trend (np.ndarray): (user, metric) smoothed daily trends.
+        last (np.ndarray): (user, metric) day number of the last value, or _NEVER.
+        seen (np.ndarray): Day number of each user's latest entry read, or _NEVER.
+        digest (np.ndarray): uint64 XOR of the hashes of each user's entries on or
+            after `window`.
+        window (int): Day number from which the digests were computed, or _NEVER
+            if they are unknown.
+        stale (set): Users with edits of past days that need `ForecastEngine.refit()`.
+    """
+
+    def __init__(self, users, cols=NUMERIC_COLS):
+        """
+        Initialize an empty state for the given users.
+
+        Args:
+            users (array-like): User ids.
+            cols (list): The metrics to track.
+        """
+        self.users = pd.Index(np.asarray(users, dtype=object), name="user_id")
+        self.cols = list(cols)
+        shape = (len(self.users), len(self.cols))
+        self.level = np.full(shape, np.nan)
+        self.trend = np.zeros(shape)
+        self.last = np.full(shape, _NEVER, dtype=np.int64)
+        self.seen = np.full(len(self.users), _NEVER, dtype=np.int64)
+        self.digest = np.zeros(len(self.users), dtype=np.uint64)
+        self.window = _NEVER
+        self.stale = set()
+
+    @property
+    def as_of(self) -> pd.Timestamp:
+        """
+        pd.Timestamp: The latest day folded into the state, or NaT.
+        """
+        observed = self.last[self.last != _NEVER]
+        return pd.Timestamp(np.datetime64(int(observed.max()), "D")) if len(observed) else pd.NaT
+
+    @property
+    def resume_from(self) -> pd.Timestamp:
+        """
+        pd.Timestamp: First day `ForecastEngine.catch_up()` needs all stored entries from,
+            or NaT if the state cannot resume and needs a full fit.
+        """
+        return pd.Timestamp(np.datetime64(int(self.window), "D")) if self.window != _NEVER else pd.NaT
+
+    def add_users(self, users) -> np.ndarray:
+        """
+        Add rows for users not in the state yet.
+
+        Args:
+            users (array-like): User ids, known or new.
+
+        Returns:
+            np.ndarray: Each user's row in the arrays.
+        """
+        users = pd.Index(np.asarray(users, dtype=object))
+        new = users.unique().difference(self.users)
+        if len(new):
+            grown = ForecastState(new, self.cols)
+            self.users = self.users.append(grown.users).rename("user_id")
+            self.level = np.vstack([self.level, grown.level])
+            self.trend = np.vstack([self.trend, grown.trend])
+            self.last = np.vstack([self.last, grown.last])
+            self.seen = np.concatenate([self.seen, grown.seen])
+            self.digest = np.concatenate([self.digest, grown.digest])
+        return self.users.get_indexer(users)
+
+    def save(self, path: str):
+        """
+        Write the state to an .npz file atomically.
+
+        Args:
+            path (str): Destination path.
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".tmp-", suffix=".npz")
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, users=self.users.to_numpy(dtype=str), cols=np.array(self.cols), level=self.level,
+                     trend=self.trend, last=self.last, seen=self.seen, digest=self.digest,
+                     window=np.int64(self.window), stale=np.array(sorted(self.stale), dtype=str))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "ForecastState":
+        """
+        Read a state written by `save()`.
+
+        Args:
+            path (str): Path of the .npz file.
+
+        Returns:
+            ForecastState: The loaded state.
+        """
+        with np.load(path, allow_pickle=False) as npz:
+            state = cls(npz["users"].astype(object), list(npz["cols"]))
+            state.level, state.trend, state.last = npz["level"], npz["trend"], npz["last"]
+            state.stale = set(npz["stale"].tolist())
+            # States saved without digests cannot resume and are fitted again
+            if "window" in npz.files:
+                state.seen, state.digest, state.window = npz["seen"], npz["digest"], int(npz["window"])
+        return state
+
+
+class ForecastEngine(BaseManager):
+    """
+    Forecasts every user's metrics for the coming days with damped Holt smoothing.
+
+    Holt's linear method keeps a smoothed level and trend per user and
+    metric; the damping factor makes the trend fade over the forecast
+    horizon, which suits bounded daily metrics. Fitting walks through the
+    calendar once, updating the users who logged on each day together, so
+    all users are fitted in one vectorized pass. Days without a value are
+    bridged in closed form: the level follows the damped trend.
+
+    The fitted ForecastState can be saved. In the same process `update()`
+    folds in newly saved entries; a later run calls `catch_up()` with the
+    stored entries from `state.resume_from`. Either way, entries on or
+    before a user's latest absorbed entry mark that user stale until
+    `refit()`.
+    """
+
+    def __init__(self, analysis_engine: AnalysisEngine = None, alpha: float = 0.3, beta: float = 0.1,
+                 damping: float = 0.9, horizon: int = 7):
+        """
+        Initialize the ForecastEngine.
+
+        Args:
+            analysis_engine (AnalysisEngine, optional): Used to preprocess raw entries.
+            alpha (float): Smoothing of the level, between 0 and 1.
+            beta (float): Smoothing of the trend, between 0 and 1.
+            damping (float): Daily damping of the trend, between 0 and 1 (1 for no damping).
+            horizon (int): Number of days forecast by default.
+        """
+        self.analysis_engine = analysis_engine or AnalysisEngine()
+        self.alpha = alpha
+        self.beta = beta
+        self.damping = damping
+        self.horizon = horizon
+        self.state = None
+
+    def _trend_sum(self, gaps: np.ndarray) -> np.ndarray:
+        """
+        Sum of damping ** i for i = 1..gap: how much trend a level gains over `gap` days.
+        """
+        phi = self.damping
+        if phi == 1:
+            return gaps.astype(float)
+        return phi * (1 - phi ** gaps) / (1 - phi)
+
+    def _entries(self, df):
+        """
+        Preprocess entries and compute their day numbers.
+
+        Returns:
+            tuple: (entries with a date, their day numbers).
+        """
+        if not is_typed_frame(df):
+            df = self.analysis_engine.preprocess(df)
+        days = _day_numbers(df["date"].to_numpy())
+        valid = days != _NEVER
+        if not valid.all():
+            df, days = df[valid], days[valid]
+        return df, days
+
+    def _row_hashes(self, df: pd.DataFrame, days: np.ndarray, cols) -> np.ndarray:
+        """
+        Hash each entry's day and metric values, independently of the column dtypes.
+
+        Returns:
+            np.ndarray: uint64 hash per entry.
+        """
+        hashes = pd.util.hash_array(days)
+        for c in cols:
+            values = _metric_values(df[c]) if c in df.columns else np.full(len(days), np.nan)
+            # Column by column keeps one float copy in memory; uint64 arithmetic wraps around
+            hashes = hashes * np.uint64(1000003) ^ pd.util.hash_array(values)
+        return hashes
+
+    @staticmethod
+    def _digests(n_users: int, rows: np.ndarray, hashes: np.ndarray) -> np.ndarray:
+        """
+        XOR the entry hashes of each user.
+
+        Returns:
+            np.ndarray: uint64 digest per state row, 0 for users without entries.
+        """
+        digest = np.zeros(n_users, dtype=np.uint64)
+        if len(rows):
+            order = np.argsort(rows, kind="stable")
+            rows, hashes = rows[order], hashes[order]
+            starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+            digest[rows[starts]] = np.bitwise_xor.reduceat(hashes, starts)
+        return digest
+
+    def _track(self, state: ForecastState, rows: np.ndarray, days: np.ndarray, hashes: np.ndarray):
+        """
+        Record the entries read from storage: latest entry per user, window and digests.
+
+        The entries must include every stored entry on or after the new window,
+        which holds for a full history and for the re-read window of `catch_up()`.
+        """
+        np.maximum.at(state.seen, rows, days)
+        observed = state.seen[state.seen != _NEVER]
+        state.window = int(observed.min()) if len(observed) else _NEVER
+        keep = days >= state.window
+        state.digest = self._digests(len(state.users), rows[keep], hashes[keep])
+
+    def _advance(self, state: ForecastState, rows: np.ndarray, days: np.ndarray, df: pd.DataFrame):
+        """
+        Fold entries into the state, one day at a time, all users of a day at once.
+
+        Values on or before a metric's last day in the state are skipped.
+
+        Args:
+            state (ForecastState): The state to update in place.
+            rows (np.ndarray): State row of each entry's user.
+            days (np.ndarray): Day number of each entry.
+            df (pd.DataFrame): The entries' metric columns.
+        """
+        if not len(days):
+            return
+        alpha, beta, phi = self.alpha, self.beta, self.damping
+        # Small integer keys let NumPy use a radix sort
+        offsets = days - days.min()
+        order = np.argsort(offsets.astype(np.min_scalar_type(int(offsets.max()))), kind="stable")
+        del offsets
+        rows, days = rows[order], days[order]
+        bounds = np.flatnonzero(np.r_[True, days[1:] != days[:-1], True])
+        for j, c in enumerate(state.cols):
+            if c not in df.columns:
+                continue
+            # One metric at a time keeps a single float copy of the column in memory
+            v = _metric_values(df[c])[order]
+            level, trend, last = state.level[:, j], state.trend[:, j], state.last[:, j]
+            for lo, hi in zip(bounds[:-1], bounds[1:]):
+                day = days[lo]
+                r, y = rows[lo:hi], v[lo:hi]
+                keep = ~np.isnan(y) & (last[r] < day)
+                r, y = r[keep], y[keep]
+                if not len(r):
+                    continue
+                first = last[r] == _NEVER
+                gap = np.where(first, 1, day - last[r])
+                b = np.where(first, 0.0, trend[r])
+                # Level on the day before, and the forecast for today, following the damped trend
+                l_before = np.where(first, y, level[r] + b * self._trend_sum(gap - 1))
+                predicted = np.where(first, y, level[r] + b * self._trend_sum(gap))
+                new_level = alpha * y + (1 - alpha) * predicted
+                trend[r] = np.where(first, 0.0, beta * (new_level - l_before) + (1 - beta) * b * phi ** gap)
+                level[r] = np.where(first, y, new_level)
+                last[r] = day
+
+    def fit(self, df) -> ForecastState:
+        """
+        Fit the state of every user in the entries.
+
+        Args:
+            df (pd.DataFrame): Entries of any number of users, at most one per user and day
+                (as DataManager returns them).
+
+        Returns:
+            ForecastState: The fitted state, also kept as `self.state`.
+        """
+        df, days = self._entries(df)
+        codes, unique = pd.factorize(df["user_id"], sort=True)
+        state = ForecastState(unique.astype(str))
+        self._advance(state, codes, days, df)
+        self._track(state, codes, days, self._row_hashes(df, days, state.cols))
+        self.state = state
+        self.log(f"Fitted forecasts for {len(unique)} users from {len(days)} entries.")
+        return state
+
+    def update(self, new_rows: pd.DataFrame, state: ForecastState = None) -> ForecastState:
+        """
+        Fold newly saved entries into a fitted state.
+
+        Entries after a user's latest absorbed entry are applied directly. Entries on
+        or before it rewrite history the state has already absorbed; their users are
+        marked stale and keep their current state until `refit()`.
+
+        Args:
+            new_rows (pd.DataFrame): The saved records.
+            state (ForecastState, optional): The state to update; defaults to `self.state`.
+
+        Returns:
+            ForecastState: The updated state.
+        """
+        state = state or self.state
+        if state is None:
+            raise ValueError("Fit a state before updating it")
+        df, days = self._entries(new_rows)
+        if not len(days):
+            return state
+        rows = state.add_users(df["user_id"].astype(str))
+        late = days <= state.seen[rows]
+        state.stale.update(state.users[rows[late]])
+        self._advance(state, rows, days, df)
+        hashes = self._row_hashes(df, days, state.cols)
+        new = ~late
+        # Later entries extend the digests; stale users get theirs back from refit()
+        state.digest ^= self._digests(len(state.users), rows[new], hashes[new])
+        np.maximum.at(state.seen, rows, days)
+        return state
+
+    def catch_up(self, entries: pd.DataFrame, state: ForecastState = None) -> ForecastState:
+        """
+        Bring a saved state up to date with the storage.
+
+        Entries after a user's latest absorbed entry are folded in. For the
+        absorbed part of the window, each user's digest is compared with the
+        one recorded: a difference means entries were edited or back-dated,
+        and the user is marked stale for `refit()`. Edits of days before the
+        window are not read and need a full fit.
+
+        Args:
+            entries (pd.DataFrame): All stored entries from `state.resume_from` on, e.g.
+                from `DataManager.query(start=state.resume_from)`.
+            state (ForecastState, optional): The state to update; defaults to `self.state`.
+
+        Returns:
+            ForecastState: The updated state.
+
+        Raises:
+            ValueError: If the state has no window to resume from; fit it instead.
+        """
+        state = state or self.state
+        if state is None or state.window == _NEVER:
+            raise ValueError("The state cannot resume; fit it from the full history")
+        df, days = self._entries(entries)
+        in_window = days >= state.window
+        if not in_window.all():
+            df, days = df[in_window], days[in_window]
+        rows = state.add_users(df["user_id"].astype(str))
+        hashes = self._row_hashes(df, days, state.cols)
+
+        absorbed = days <= state.seen[rows]
+        found = self._digests(len(state.users), rows[absorbed], hashes[absorbed])
+        changed = state.users[found != state.digest]
+        state.stale.update(changed)
+
+        new = ~absorbed
+        self._advance(state, rows[new], days[new], df[new])
+        self._track(state, rows, days, hashes)
+        self.log(f"Caught up with {int(new.sum())} new entries; {len(changed)} users have changed history.")
+        return state
+
+    def on_save(self, rows: pd.DataFrame, before=None, after=None):
+        """
+        Save listener for `DataManager.add_save_listener()`: keep the cached state current.
+
+        Args:
+            rows (pd.DataFrame): The saved records.
+            before (optional): Storage signature before the save (unused).
+            after (optional): Storage signature after the save (unused).
+        """
+        if self.state is not None:
+            self.update(rows)
+
+    def refit(self, history: pd.DataFrame, users=None, state: ForecastState = None) -> ForecastState:
+        """
+        Refit some users from their full history, by default the stale ones.
+
+        Args:
+            history (pd.DataFrame): Stored entries, including the users to refit.
+            users (list, optional): The users to refit; defaults to the stale users.
+            state (ForecastState, optional): The state to update; defaults to `self.state`.
+
+        Returns:
+            ForecastState: The updated state.
+        """
+        state = state or self.state
+        users = sorted(state.stale if users is None else {str(u) for u in users})
+        if not users:
+            return state
+        subset = history[history["user_id"].isin(users)]
+        subset, days = self._entries(subset)
+        rows = state.add_users(users)
+        state.level[rows], state.trend[rows], state.last[rows] = np.nan, 0.0, _NEVER
+        subset_rows = state.users.get_indexer(subset["user_id"].astype(str))
+        self._advance(state, subset_rows, days, subset)
+        if state.window != _NEVER:
+            # The window stays; the refit users' digests are rebuilt from their history
+            keep = days >= state.window
+            hashes = self._row_hashes(subset[keep], days[keep], state.cols)
+            state.digest[rows] = self._digests(len(state.users), subset_rows[keep], hashes)[rows]
+            np.maximum.at(state.seen, subset_rows, days)
+        state.stale.difference_update(users)
+        return state
+
+    def forecast(self, state: ForecastState = None, horizon: int = None, start=None, users=None) -> pd.DataFrame:
+        """
+        Forecast each user's metrics for `horizon` days.
+
+        Args:
+            state (ForecastState, optional): The fitted state; defaults to `self.state`.
+            horizon (int, optional): Number of days; defaults to the engine's horizon.
+            start (optional): First forecast day; defaults to the day after the
+                state's latest value.
+            users (list, optional): Only forecast these users.
+
+        Returns:
+            pd.DataFrame: One row per user and day with user_id, date and a forecast per
+                metric, clipped to schema.METRIC_RANGES; NaN for metrics a user never logged.
+        """
+        state = state or self.state
+        if state is None:
+            raise ValueError("Fit a state before forecasting")
+        horizon = horizon or self.horizon
+        if start is None:
+            as_of = state.as_of
+            start = (as_of if pd.notna(as_of) else pd.Timestamp.today().normalize()) + pd.Timedelta(days=1)
+        first_day = int(np.datetime64(pd.Timestamp(start).date(), "D").astype(np.int64))
+        rows = np.arange(len(state.users)) if users is None else state.users.get_indexer([str(u) for u in users])
+        rows = rows[rows >= 0]
+
+        days = first_day + np.arange(horizon)
+        result = {}
+        for j, c in enumerate(state.cols):
+            last = state.last[rows, j][:, None]
+            gap = np.maximum(days[None, :] - last, 0)
+            values = state.level[rows, j][:, None] + state.trend[rows, j][:, None] * self._trend_sum(gap)
+            values[np.broadcast_to(last == _NEVER, values.shape)] = np.nan
+            low, high = METRIC_RANGES.get(c, (-np.inf, np.inf))
+            result[c] = np.clip(values, low, high).ravel()
+        return pd.DataFrame({
+            "user_id": np.repeat(state.users.to_numpy()[rows], horizon),
+            "date": pd.DatetimeIndex(np.tile(days, len(rows)).astype("datetime64[D]").astype("datetime64[ns]")),
+            **result,
+        })
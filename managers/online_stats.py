@@ -0,0 +1,157 @@
+# managers/online_stats.py
+import numpy as np
+import pandas as pd
+from .schema import NUMERIC_COLS
+
+
+class OnlineStats:
+    """
+    Mergeable running statistics for the numeric columns.
+
+    Entries are fed chunk by chunk with `update()`, and accumulators built on
+    different chunks or shards are combined with `merge()`, so summary
+    statistics and correlations never need the whole history in memory.
+
+    Like pandas, correlations use the rows where both metrics are present.
+    Every pair of columns therefore keeps its own count, means, sums of
+    squared deviations and co-deviation; a column's own statistics are the
+    diagonal. Each chunk is reduced with NumPy after centering on its column
+    means, and chunks are combined with the pairwise update of Chan et al.,
+    the batched form of Welford's algorithm, which stays accurate where
+    running sums of squares would not.
+    """
+
+    def __init__(self, cols=NUMERIC_COLS):
+        """
+        Initialize empty accumulators.
+
+        Args:
+            cols (list): The numeric columns to track.
+        """
+        self.cols = list(cols)
+        k = len(self.cols)
+        # n[i, j]: rows where columns i and j are both present
+        self.n = np.zeros((k, k))
+        # mean[i, j] and m2[i, j]: mean and sum of squared deviations of column i over those rows
+        self.mean = np.zeros((k, k))
+        self.m2 = np.zeros((k, k))
+        # co[i, j]: sum of (x_i - mean[i, j]) * (x_j - mean[j, i]) over those rows
+        self.co = np.zeros((k, k))
+        self.min = np.full(k, np.nan)
+        self.max = np.full(k, np.nan)
+
+    def update(self, chunk: pd.DataFrame) -> "OnlineStats":
+        """
+        Add a chunk of entries.
+
+        Args:
+            chunk (pd.DataFrame): Entries with the tracked columns; values that are
+                missing or not numeric are skipped.
+
+        Returns:
+            OnlineStats: self, for chaining.
+        """
+        if chunk.empty:
+            return self
+        numeric = chunk.reindex(columns=self.cols).apply(pd.to_numeric, errors="coerce")
+        values = numeric.to_numpy(dtype=float, na_value=np.nan)
+        present = ~np.isnan(values)
+        weights = present.astype(float)
+        count = weights.sum(axis=0)
+        center = np.where(present, values, 0.0).sum(axis=0) / np.maximum(count, 1)
+        centered = np.where(present, values - center, 0.0)
+
+        n = weights.T @ weights
+        sums = centered.T @ weights
+        shift = np.divide(sums, n, out=np.zeros_like(n), where=n > 0)
+        other = self._chunk(
+            n=n,
+            mean=center[:, None] + shift,
+            m2=(centered * centered).T @ weights - sums * shift,
+            co=centered.T @ centered - sums * shift.T,
+            min=np.where(present, values, np.inf).min(axis=0),
+            max=np.where(present, values, -np.inf).max(axis=0),
+        )
+        return self.merge(other)
+
+    def _chunk(self, **arrays) -> "OnlineStats":
+        """
+        Build accumulators for the same columns from ready-made arrays.
+        """
+        other = OnlineStats(self.cols)
+        n = arrays["n"]
+        for name, value in arrays.items():
+            if name in ("min", "max"):
+                value = np.where(np.diag(n) > 0, value, np.nan)
+            else:
+                value = np.where(n > 0, value, 0.0)
+            setattr(other, name, value)
+        return other
+
+    def merge(self, other: "OnlineStats") -> "OnlineStats":
+        """
+        Fold the accumulators of another chunk or shard into these.
+
+        Args:
+            other (OnlineStats): Accumulators over the same columns.
+
+        Returns:
+            OnlineStats: self, for chaining.
+        """
+        if other.cols != self.cols:
+            raise ValueError("Cannot merge statistics over different columns")
+        n = self.n + other.n
+        share = np.divide(other.n, n, out=np.zeros_like(n), where=n > 0)
+        weight = self.n * share
+        delta = other.mean - self.mean
+        self.mean = self.mean + delta * share
+        self.m2 = self.m2 + other.m2 + delta * delta * weight
+        self.co = self.co + other.co + delta * delta.T * weight
+        self.n = n
+        self.min = np.fmin(self.min, other.min)
+        self.max = np.fmax(self.max, other.max)
+        return self
+
+    def summary(self) -> pd.DataFrame:
+        """
+        Summary statistics in the shape of `AnalysisEngine.summary_stats()`.
+
+        The quartiles cannot be computed from running moments and are NaN.
+
+        Returns:
+            pd.DataFrame: count, mean, std (sample), min, 25%, 50%, 75% and max per column.
+        """
+        columns = ["count", "mean", "std", "min", "25%", "50%", "75%", "max"]
+        count = np.diag(self.n)
+        if not count.any():
+            return pd.DataFrame(columns=columns, index=self.cols)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            std = np.sqrt(np.diag(self.m2) / (count - 1))
+        quartile = np.full(len(self.cols), np.nan)
+        return pd.DataFrame({
+            "count": count,
+            "mean": np.where(count > 0, np.diag(self.mean), np.nan),
+            "std": np.where(count > 1, std, np.nan),
+            "min": self.min,
+            "25%": quartile,
+            "50%": quartile,
+            "75%": quartile,
+            "max": self.max,
+        }, index=self.cols)
+
+    def correlations(self) -> pd.DataFrame:
+        """
+        Pairwise correlations in the shape of `AnalysisEngine.correlations()`.
+
+        Returns:
+            pd.DataFrame: The correlation matrix; NaN where a pair has fewer than two
+                rows or one of the columns is constant over them.
+        """
+        if not self.n.any():
+            return pd.DataFrame(columns=self.cols, index=self.cols)
+        sxx, syy = self.m2, self.m2.T
+        with np.errstate(invalid="ignore", divide="ignore"):
+            r = np.clip(self.co / np.sqrt(sxx * syy), -1.0, 1.0)
+        # Constant columns have no correlation, as in pandas
+        r[(self.n < 2) | (sxx <= 1e-12 * self.n) | (syy <= 1e-12 * self.n)] = np.nan
+        return pd.DataFrame(r, index=self.cols, columns=self.cols)
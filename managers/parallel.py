@@ -0,0 +1,177 @@
+# managers/parallel.py
+"""
+Helpers for running an analysis on shards of users in worker processes.
+
+The parent process puts the (user-sorted) arrays in shared memory and every
+worker maps its own slice of them, so the data is never pickled; only the
+small per-shard results travel back.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Below this many rows starting worker processes costs more than it saves
+PARALLEL_MIN_ROWS = 200_000
+
+
+def resolve_workers(n_workers) -> int:
+    """
+    Turn a worker-count setting into a number of processes.
+
+    Args:
+        n_workers (int or None): The setting; None or 0 means one per CPU.
+
+    Returns:
+        int: The number of worker processes, at least 1.
+    """
+    if not n_workers:
+        return os.cpu_count() or 1
+    return max(1, int(n_workers))
+
+
+def shard_bounds(starts: np.ndarray, n_rows: int, n_shards: int) -> list:
+    """
+    Split user-sorted rows into shards of roughly equal size at user boundaries.
+
+    Args:
+        starts (np.ndarray): First row of each user.
+        n_rows (int): Total number of rows.
+        n_shards (int): The wanted number of shards; fewer are returned when
+            there are not enough users.
+
+    Returns:
+        list: (first user, end user) index pairs, one per shard, in user order.
+    """
+    cuts = np.searchsorted(starts, np.linspace(0, n_rows, n_shards + 1)[1:-1])
+    bounds = np.unique(np.r_[0, cuts, len(starts)])
+    return list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+
+
+def _close_block(block: shared_memory.SharedMemory):
+    """
+    Close a shared block, leaving the mapping to be released with the last array
+    still using it (e.g. one held by an exception traceback).
+    """
+    try:
+        block.close()
+    except BufferError:
+        pass
+
+
+class SharedArrays:
+    """
+    A set of NumPy arrays backed by named shared memory blocks.
+
+    Create the arrays with `empty()` in the parent, hand `spec()` to the
+    workers and `attach()` to it there. Use as a context manager in the
+    parent so the blocks are released even if a worker fails.
+    """
+
+    def __init__(self):
+        """
+        Initialize an empty set of shared arrays.
+        """
+        self._blocks = []
+        self._layout = {}
+
+    def empty(self, name: str, shape, dtype) -> np.ndarray:
+        """
+        Allocate an uninitialized shared array.
+
+        Args:
+            name (str): Key of the array in `spec()`.
+            shape (int or tuple): Array shape.
+            dtype: NumPy dtype.
+
+        Returns:
+            np.ndarray: A writable view of the shared block.
+        """
+        shape = (shape,) if np.isscalar(shape) else tuple(shape)
+        size = max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1)
+        block = shared_memory.SharedMemory(create=True, size=size)
+        self._blocks.append(block)
+        self._layout[name] = (block.name, shape, np.dtype(dtype).str)
+        return np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+    def spec(self) -> dict:
+        """
+        dict: Picklable description of the arrays, for `attach()`.
+        """
+        return dict(self._layout)
+
+    @staticmethod
+    def attach(spec: dict) -> tuple:
+        """
+        Map shared arrays created in another process.
+
+        Args:
+            spec (dict): The creator's `spec()`.
+
+        Returns:
+            tuple: (dict of name -> np.ndarray, list of blocks to close when done).
+        """
+        arrays, blocks = {}, []
+        for name, (block_name, shape, dtype) in spec.items():
+            block = shared_memory.SharedMemory(name=block_name)
+            blocks.append(block)
+            arrays[name] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+        return arrays, blocks
+
+    def close(self):
+        """
+        Release and remove all shared blocks. Arrays returned by `empty()` must not be used afterwards.
+        """
+        for block in self._blocks:
+            _close_block(block)
+            block.unlink()
+        self._blocks, self._layout = [], {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _run_shard(func, spec: dict, users, starts: np.ndarray, lo: int, hi: int):
+    """
+    Worker entry point: apply `func` to rows lo:hi of the shared arrays.
+    """
+    arrays, blocks = SharedArrays.attach(spec)
+    try:
+        return func(users, starts - lo, {name: a[..., lo:hi] for name, a in arrays.items()})
+    finally:
+        arrays.clear()
+        for block in blocks:
+            _close_block(block)
+
+
+def map_user_shards(func, shared: SharedArrays, users, starts: np.ndarray, n_rows: int,
+                    n_workers: int, shards_per_worker: int = 4) -> list:
+    """
+    Run `func` over user shards of shared, user-sorted arrays in a process pool.
+
+    Args:
+        func (callable): Called in a worker as func(users, starts, arrays) for one shard,
+            where starts are relative to the shard and every array is sliced along its
+            last axis. It must be picklable (a module-level function or a bound method)
+            and return a result that does not reference the arrays.
+        shared (SharedArrays): The arrays, with rows along the last axis.
+        users (pd.Index): User ids in row order.
+        starts (np.ndarray): First row of each user.
+        n_rows (int): Total number of rows.
+        n_workers (int): Number of worker processes.
+        shards_per_worker (int): Extra shards even out users of different sizes.
+
+    Returns:
+        list: The shard results, in user order.
+    """
+    bounds = shard_bounds(starts, n_rows, n_workers * shards_per_worker)
+    ends = np.r_[starts, n_rows]
+    spec = shared.spec()
+    with ProcessPoolExecutor(max_workers=min(n_workers, len(bounds))) as pool:
+        futures = [pool.submit(_run_shard, func, spec, users[a:b], starts[a:b], int(ends[a]), int(ends[b]))
+                   for a, b in bounds]
+        return [f.result() for f in futures]
@@ -0,0 +1,173 @@
+# managers/quantile_sketch.py
+import numpy as np
+import pandas as pd
+from .schema import METRIC_RANGES, NUMERIC_COLS
+
+# Grid step of the quantile sketch per metric. It matches the finest step the
+# entry form and the sample data produce, so those values are stored exactly.
+SKETCH_RESOLUTION = {
+    "sleep_hours": 0.05,
+    "mood": 1,
+    "stress": 1,
+    "activity_min": 1,
+}
+
+# The quartiles reported by summary_stats(), as in DataFrame.describe()
+QUARTILES = (0.25, 0.5, 0.75)
+
+
+def sketch_bins(metric: str, values) -> np.ndarray:
+    """
+    Map metric values to their bin on the sketch grid.
+
+    Values are rounded to the nearest grid point; values outside the metric's
+    range (see schema.METRIC_RANGES) go to the first or last bin.
+
+    Args:
+        metric (str): One of NUMERIC_COLS.
+        values (array-like): Float values without NaN.
+
+    Returns:
+        np.ndarray: Bin numbers, 0 for the lower end of the range.
+    """
+    low, high = METRIC_RANGES[metric]
+    step = SKETCH_RESOLUTION[metric]
+    clipped = np.clip(np.asarray(values, dtype=float), low, high)
+    return np.rint((clipped - low) / step).astype(np.int64)
+
+
+def quantile_labels(qs) -> list:
+    """
+    list: Column labels for the quantiles, as DataFrame.describe() names them ("25%", ...).
+    """
+    return [f"{q * 100:g}%" for q in qs]
+
+
+class QuantileSketch:
+    """
+    Mergeable approximate quantiles of the numeric columns.
+
+    The sketch is a histogram on a fixed grid per metric: the metrics have a
+    known, bounded range, so a grid of SKETCH_RESOLUTION steps holds at most
+    a few thousand counts however many values are added. Sketches merge by
+    adding counts, so per-user sketches combine into cohort sketches, and
+    values can be removed again, which entries being overwritten on save
+    requires (t-digest or KLL sketches cannot do that).
+
+    Error bound: every value is moved to the nearest grid point, which moves
+    it by at most half a step and never reorders values. The sketch's
+    quantiles, interpolated between order statistics like pandas' "linear"
+    method, are therefore within half a step of the exact ones:
+    0.025 hours for sleep and 0.5 for the integer metrics. Values already on
+    the grid (all integers, and sleep in multiples of 0.05) give exact
+    results. Values outside METRIC_RANGES are clamped into range, so the
+    bound only holds for in-range values.
+    """
+
+    def __init__(self, cols=NUMERIC_COLS):
+        """
+        Initialize an empty sketch.
+
+        Args:
+            cols (list): The numeric columns to track.
+        """
+        self.cols = list(cols)
+        self.counts = {c: np.zeros(sketch_bins(c, METRIC_RANGES[c][1]) + 1, dtype=np.int64) for c in self.cols}
+
+    def update(self, chunk: pd.DataFrame, sign: int = 1) -> "QuantileSketch":
+        """
+        Add a chunk of entries, or remove them again.
+
+        Args:
+            chunk (pd.DataFrame): Entries with the tracked columns; values that are
+                missing or not numeric are skipped.
+            sign (int): 1 to add the values, -1 to remove values added before.
+
+        Returns:
+            QuantileSketch: self, for chaining.
+        """
+        for c in self.cols:
+            if c not in chunk.columns:
+                continue
+            values = pd.to_numeric(chunk[c], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+            values = values[~np.isnan(values)]
+            if len(values):
+                counts = self.counts[c]
+                counts += sign * np.bincount(sketch_bins(c, values), minlength=len(counts))
+        return self
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        """
+        Fold another sketch over the same columns into this one.
+
+        Args:
+            other (QuantileSketch): The sketch to add.
+
+        Returns:
+            QuantileSketch: self, for chaining.
+        """
+        if other.cols != self.cols:
+            raise ValueError("Cannot merge sketches over different columns")
+        for c in self.cols:
+            self.counts[c] += other.counts[c]
+        return self
+
+    @classmethod
+    def from_counts(cls, counts: pd.DataFrame, cols=NUMERIC_COLS) -> "QuantileSketch":
+        """
+        Build a sketch from stored bin counts.
+
+        Args:
+            counts (pd.DataFrame): Columns metric, bin and count, as `to_counts()` returns.
+            cols (list): The numeric columns to track.
+
+        Returns:
+            QuantileSketch: The sketch.
+        """
+        sketch = cls(cols)
+        for metric, group in counts.groupby("metric"):
+            if metric in sketch.counts:
+                np.add.at(sketch.counts[metric], group["bin"].to_numpy(dtype=np.int64),
+                          group["count"].to_numpy(dtype=np.int64))
+        return sketch
+
+    def to_counts(self) -> pd.DataFrame:
+        """
+        Return the non-empty bins, for storing the sketch.
+
+        Returns:
+            pd.DataFrame: Columns metric, bin and count.
+        """
+        parts = []
+        for c in self.cols:
+            bins = np.flatnonzero(self.counts[c])
+            parts.append(pd.DataFrame({"metric": c, "bin": bins, "count": self.counts[c][bins]}))
+        return pd.concat(parts, ignore_index=True)
+
+    def quantiles(self, qs=QUARTILES) -> pd.DataFrame:
+        """
+        Estimate quantiles of each column.
+
+        Args:
+            qs (tuple): Quantiles between 0 and 1.
+
+        Returns:
+            pd.DataFrame: One row per column and one column per quantile ("25%", ...);
+                NaN for columns without values.
+        """
+        qs = np.asarray(qs, dtype=float)
+        result = np.full((len(self.cols), len(qs)), np.nan)
+        for i, c in enumerate(self.cols):
+            cumulative = np.cumsum(self.counts[c])
+            n = cumulative[-1]
+            if n <= 0:
+                continue
+            # Ranks of the order statistics around each quantile, as in numpy's "linear" method
+            rank = (n - 1) * qs
+            below, above = np.floor(rank), np.ceil(rank)
+            step, low = SKETCH_RESOLUTION[c], METRIC_RANGES[c][0]
+            v_below = low + step * np.searchsorted(cumulative, below, side="right")
+            v_above = low + step * np.searchsorted(cumulative, above, side="right")
+            result[i] = v_below + (rank - below) * (v_above - v_below)
+        # Drop the float noise of the grid arithmetic, e.g. 142 * 0.05
+        return pd.DataFrame(result.round(9), index=self.cols, columns=quantile_labels(qs))
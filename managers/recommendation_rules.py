@@ -0,0 +1,216 @@
+# managers/recommendation_rules.py
+import bisect
+import hashlib
+import json
+import numpy as np
+import pandas as pd
+
+# Recommendation levels; level codes index into this list
+LEVELS = ["healthy", "moderate", "high"]
+
+# Level code (and rule index) of a metric without a matching rule: no tip
+NO_TIP = -1
+
+# Shown when no metric has a tip
+DEFAULT_TIP = "✅ All metrics look within healthy ranges — keep it up!"
+
+# Columns of a rule table. A rule matches values between low and high, where
+# `closed` says which ends are included ("both", "left", "right" or "neither",
+# as in pd.Interval) and an empty bound is unbounded. The first matching rule
+# of a metric wins; a rule without bounds matches everything, including NaN.
+# Messages are str.format() templates over the rule's columns.
+RULE_COLUMNS = ["metric", "low", "high", "closed", "level", "message"]
+
+# The built-in rules, in the order the tips are listed
+DEFAULT_RULES = pd.DataFrame([
+    ("sleep_hours", 7, 9, "both", "healthy", "💤 **Sleep:** Healthy — 7–9 hours."),
+    ("sleep_hours", 6, 7, "left", "moderate", "💤 **Sleep:** Moderate — slightly below recommended."),
+    ("sleep_hours", None, None, "both", "high", "💤 **Sleep:** High risk ⚠️ Adjust sleep schedule to 7–9 hrs."),
+    ("activity_min", 30, None, "both", "healthy", "🏃‍♂️ **Activity:** Healthy — meets recommended activity."),
+    ("activity_min", 15, 30, "left", "moderate", "🏃‍♀️ **Activity:** Moderate — add short walks."),
+    ("activity_min", None, None, "both", "high", "⚠️ **Activity:** High risk — aim for 30+ mins daily."),
+    ("mood", 7, 10, "both", "healthy", "🙂 **Mood:** Healthy — keep doing what works."),
+    ("mood", 4, 6, "both", "moderate", "😐 **Mood:** Moderate — schedule enjoyable activities."),
+    ("mood", None, None, "both", "high", "😞 **Mood:** High risk — consider reaching out for support."),
+    ("stress", 1, 3, "both", "healthy", "😌 **Stress:** Healthy — continue current coping strategies."),
+    ("stress", 4, 6, "both", "moderate", "😰 **Stress:** Moderate — relaxation may help."),
+    ("stress", None, None, "both", "high", "⚠️ **Stress:** High — try short breathing exercises."),
+], columns=RULE_COLUMNS).astype({"low": float, "high": float})
+
+# Up to this many distinct bounds per metric, comparing against each is faster than a binary search
+_COMPARE_EDGES = 8
+
+
+def load_rules(path: str) -> pd.DataFrame:
+    """
+    Read a rule table from CSV.
+
+    Args:
+        path (str): CSV file with the RULE_COLUMNS; low and high may be empty.
+
+    Returns:
+        pd.DataFrame: The rule table.
+    """
+    rules = pd.read_csv(path, dtype=str, keep_default_na=False)
+    missing = set(RULE_COLUMNS) - set(rules.columns)
+    if missing:
+        raise ValueError(f"Rule table '{path}' lacks the columns {sorted(missing)}")
+    for bound in ("low", "high"):
+        rules[bound] = pd.to_numeric(rules[bound].str.strip().replace("", np.nan), errors="raise")
+    return rules[RULE_COLUMNS]
+
+
+def _matches(low: float, high: float, closed: str, value: float) -> bool:
+    """
+    bool: Whether a rule's range includes a (non-NaN) value; NaN bounds are unbounded.
+    """
+    if not np.isnan(low) and not (value >= low if closed in ("both", "left") else value > low):
+        return False
+    if not np.isnan(high) and not (value <= high if closed in ("both", "right") else value < high):
+        return False
+    return True
+
+
+class CompiledRules:
+    """
+    A rule table compiled into lookup arrays and pre-rendered tips.
+
+    The bounds of a metric's rules split the number line into pieces: each
+    bound itself and the open intervals between them. No rule boundary falls
+    inside a piece, so the first matching rule is resolved once per piece at
+    compile time, and classifying a value is a binary search for its piece
+    plus an array lookup. The HTML of every tip is rendered once as well.
+
+    Instances are immutable, so a reload can swap them while other threads
+    still evaluate the previous rules.
+
+    Attributes:
+        metrics (list): Metrics with rules, in the order their tips are listed.
+        levels (np.ndarray): Level code (index into LEVELS) of each rule.
+        html (list): Rendered tip of each rule.
+        default_html (str): Rendered DEFAULT_TIP.
+        fingerprint (str): Hash of the compiled behaviour; equal for rule sets that
+            give the same tips for every value.
+    """
+
+    def __init__(self, rules: pd.DataFrame, render):
+        """
+        Validate and compile a rule table.
+
+        Args:
+            rules (pd.DataFrame): Table with the RULE_COLUMNS, e.g. DEFAULT_RULES.
+            render (callable): render(text, level) -> HTML of a tip.
+
+        Raises:
+            ValueError: If a rule has an unknown level or `closed` value, an empty
+                range or a message template that does not format.
+        """
+        rules = rules.reset_index(drop=True)
+        self.metrics = list(dict.fromkeys(rules["metric"]))
+        self.levels = np.zeros(len(rules), dtype=np.int8)
+        self.html = []
+        self._edges, self._edge_lists, self._piece_rules, self._nan_rule = {}, {}, {}, {}
+        for i, rule in rules.iterrows():
+            low, high = float(rule["low"]), float(rule["high"])
+            if rule["level"] not in LEVELS:
+                raise ValueError(f"Rule {i}: unknown level '{rule['level']}', expected one of {LEVELS}")
+            if rule["closed"] not in ("both", "left", "right", "neither"):
+                raise ValueError(f"Rule {i}: unknown closed value '{rule['closed']}'")
+            if low > high:
+                raise ValueError(f"Rule {i}: low {low:g} is above high {high:g}")
+            try:
+                message = str(rule["message"]).format(**rule.to_dict())
+            except (KeyError, IndexError, ValueError) as e:
+                raise ValueError(f"Rule {i}: invalid message template: {e}") from e
+            self.levels[i] = LEVELS.index(rule["level"])
+            self.html.append(render(message, rule["level"]))
+        self.default_html = render(DEFAULT_TIP, "healthy")
+
+        for metric in self.metrics:
+            own = [(i, float(r["low"]), float(r["high"]), r["closed"])
+                   for i, r in rules[rules["metric"] == metric].iterrows()]
+            edges = np.unique([b for _, low, high, _ in own for b in (low, high) if not np.isnan(b)])
+            # A value inside each piece: the open interval below edges[k] (2k), then edges[k] itself (2k + 1)
+            below = np.r_[edges[:1] - 1, (edges[:-1] + edges[1:]) / 2, edges[-1:] + 1] if len(edges) else [0.0]
+            samples = np.empty(2 * len(edges) + 1)
+            samples[0::2], samples[1::2] = below, edges
+            self._edges[metric] = edges
+            self._edge_lists[metric] = edges.tolist()
+            self._piece_rules[metric] = np.array(
+                [next((i for i, low, high, closed in own if _matches(low, high, closed, x)), NO_TIP)
+                 for x in samples], dtype=np.int16)
+            self._nan_rule[metric] = next((i for i, low, high, _ in own if np.isnan(low) and np.isnan(high)),
+                                          NO_TIP)
+        compiled = {m: [self._edge_lists[m], self._piece_rules[m].tolist(), int(self._nan_rule[m])]
+                    for m in self.metrics}
+        self.fingerprint = hashlib.sha1(
+            json.dumps([self.html, self.default_html, compiled]).encode("utf-8")).hexdigest()
+
+    def lookup(self, metric: str, values: np.ndarray) -> np.ndarray:
+        """
+        Find the matching rule of many values of a metric.
+
+        Args:
+            metric (str): One of `metrics`.
+            values (np.ndarray): float64 values.
+
+        Returns:
+            np.ndarray: Index of each value's rule, NO_TIP where none matches.
+        """
+        edges = self._edges[metric]
+        # The piece is 2k between edges[k - 1] and edges[k], 2k + 1 on edges[k]
+        if len(edges) <= _COMPARE_EDGES:
+            piece = np.zeros(len(values), dtype=np.intp)
+            with np.errstate(invalid="ignore"):
+                for edge in edges:
+                    piece += values > edge
+                    piece += values >= edge
+            nan_piece = 0  # NaN compares False to every edge
+        else:
+            piece = np.searchsorted(edges, values, side="left") + np.searchsorted(edges, values, side="right")
+            nan_piece = -1  # NaN sorts after every edge
+        rule = self._piece_rules[metric][piece]
+        if self._nan_rule[metric] != self._piece_rules[metric][nan_piece]:
+            rule[np.isnan(values)] = self._nan_rule[metric]
+        return rule
+
+    def lookup_one(self, metric: str, value: float) -> int:
+        """
+        Find the matching rule of a single value.
+
+        Args:
+            metric (str): One of `metrics`.
+            value (float): The value.
+
+        Returns:
+            int: Index of the rule, NO_TIP if none matches.
+        """
+        if value != value:
+            return self._nan_rule[metric]
+        edges = self._edge_lists[metric]
+        k = bisect.bisect_left(edges, value)
+        return int(self._piece_rules[metric][2 * k + (k < len(edges) and edges[k] == value)])
+
+    def level_codes(self, matched: np.ndarray) -> np.ndarray:
+        """
+        Turn matched rule indices into level codes.
+
+        Args:
+            matched (np.ndarray): Rule indices, NO_TIP where no rule matched.
+
+        Returns:
+            np.ndarray: int8 level codes (index into LEVELS), NO_TIP where no rule matched.
+        """
+        return np.r_[self.levels, NO_TIP].astype(np.int8)[matched]
+
+    def tips(self, matched) -> list:
+        """
+        Build the list of tips for one entry's matched rules.
+
+        Args:
+            matched (iterable): The entry's rule index per metric, NO_TIP for none.
+
+        Returns:
+            list: The rendered tips, or the default tip if no rule matched.
+        """
+        return [self.html[rule] for rule in matched if rule != NO_TIP] or [self.default_html]
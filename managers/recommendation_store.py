@@ -0,0 +1,350 @@
+# managers/recommendation_store.py
+import json
+import os
+import sqlite3
+from contextlib import closing
+
+import numpy as np
+import pandas as pd
+from .base_manager import BaseManager
+from .recommendation_rules import LEVELS, NO_TIP
+from .recommendations_engine import RecommendationsEngine, unique_rows
+from .schema import KEY_COLUMNS, NUMERIC_COLS, is_typed_frame, to_typed_frame
+
+# Bumped when tables change, so stores written by older versions are rebuilt
+SCHEMA_VERSION = "1"
+
+
+def recommendation_path_for(data_file: str) -> str:
+    """
+    Build the path of the recommendation store that sits next to a data file.
+
+    Args:
+        data_file (str): Path to the main data file (CSV, SQLite or Parquet).
+
+    Returns:
+        str: Path to the recommendation database, e.g. "data/saved_data.recs.sqlite".
+    """
+    return os.path.splitext(data_file)[0] + ".recs.sqlite"
+
+
+class RecommendationStore(BaseManager):
+    """
+    Materialized recommendations, one row per user and date.
+
+    Every saved entry's recommendations are computed once, by a save
+    listener or the backfill job, and stored with the level of each metric.
+    The dashboard then reads them instead of evaluating the rules on every
+    rerun, and past advice can be queried by user and date range.
+
+    Tips are stored once in a `tips` table and referenced by id, and every
+    row records the rule set it was computed with, identified by the
+    compiled rules' fingerprint. Rows computed with other rules stay as the
+    advice given at the time; `latest()` skips them so the dashboard shows
+    advice under the current rules.
+
+    Saved entries are always stored, so the advice of every save through
+    the listener is kept. Like AggregateStore, the store also records the
+    storage signature up to which it covers every entry; after writes that
+    bypassed it the signature stays behind, and `sync()` (run by
+    backfill_recommendations.py) rebuilds the store.
+    """
+
+    def __init__(self, db_path="data/saved_data.recs.sqlite", recs_engine: RecommendationsEngine = None):
+        """
+        Initialize the RecommendationStore.
+
+        Args:
+            db_path (str): Path to the SQLite database holding the recommendations.
+            recs_engine (RecommendationsEngine, optional): Engine whose rules are applied.
+        """
+        self.db_path = db_path
+        self.recs_engine = recs_engine or RecommendationsEngine()
+        self._ensure_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Open a new connection with explicit transaction control.
+
+        Returns:
+            sqlite3.Connection: An open database connection.
+        """
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+
+    def _ensure_db(self):
+        """
+        Ensure the database and its tables exist.
+        """
+        parent = os.path.dirname(self.db_path)
+        if parent and not os.path.exists(parent):
+            os.makedirs(parent)
+        level_columns = ", ".join(f"{c} INTEGER" for c in NUMERIC_COLS)
+        with closing(self._connect()) as conn:
+            conn.executescript(
+                f"""
+                CREATE TABLE IF NOT EXISTS recommendations (
+                    user_id TEXT NOT NULL, date TEXT NOT NULL, {level_columns},
+                    tip_ids TEXT NOT NULL, rule_set INTEGER NOT NULL,
+                    PRIMARY KEY (user_id, date)
+                );
+                CREATE INDEX IF NOT EXISTS recommendations_date ON recommendations (date);
+                CREATE TABLE IF NOT EXISTS tips (tip_id INTEGER PRIMARY KEY, html TEXT NOT NULL UNIQUE);
+                CREATE TABLE IF NOT EXISTS rule_sets (
+                    rule_set INTEGER PRIMARY KEY, fingerprint TEXT NOT NULL UNIQUE
+                );
+                CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+                """
+            )
+            version = conn.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+            if version is None or version[0] != SCHEMA_VERSION:
+                # Forgetting the signature makes sync() rebuild the table
+                conn.execute("DELETE FROM meta WHERE key = 'source_signature'")
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('schema_version', ?)",
+                             (SCHEMA_VERSION,))
+
+    def source_signature(self) -> str:
+        """
+        Return the storage signature the recommendations were last synced with.
+
+        Returns:
+            str: The signature as JSON, or None if the store was never synced.
+        """
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'source_signature'").fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def _set_signature(conn: sqlite3.Connection, signature):
+        """
+        Record the storage signature inside the current transaction.
+        """
+        if signature is not None:
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('source_signature', ?)",
+                (json.dumps(signature),),
+            )
+
+    @staticmethod
+    def _id_of(conn: sqlite3.Connection, table: str, column: str, value: str) -> int:
+        """
+        Look up the id of a tip or rule set, adding it if it is new.
+        """
+        conn.execute(f"INSERT OR IGNORE INTO {table} ({column}) VALUES (?)", (value,))
+        key = "tip_id" if table == "tips" else "rule_set"
+        return conn.execute(f"SELECT {key} FROM {table} WHERE {column} = ?", (value,)).fetchone()[0]
+
+    def _upsert(self, conn: sqlite3.Connection, rows: pd.DataFrame):
+        """
+        Compute and write the recommendations of entries inside an open transaction.
+
+        Raw records are converted to the typed schema first, so missing and
+        unparseable values give no tip, as on the dashboard, whichever form
+        the storage returned them in.
+
+        Args:
+            conn (sqlite3.Connection): Connection with an open write transaction.
+            rows (pd.DataFrame): Entries with the COLUMNS schema, as strings or typed.
+        """
+        if not is_typed_frame(rows):
+            rows = to_typed_frame(rows)
+        rows = rows[rows["date"].notna()].drop_duplicates(subset=KEY_COLUMNS, keep="last")
+        if rows.empty:
+            return
+        rules, matched = self.recs_engine.match_batch(rows)
+        rule_set = self._id_of(conn, "rule_sets", "fingerprint", rules.fingerprint)
+
+        # Rows share a handful of combinations of rules; encode each combination once
+        combos, inverse = unique_rows(matched)
+        encoded = np.array([
+            json.dumps([self._id_of(conn, "tips", "html", html) for html in rules.tips(combo)])
+            for combo in combos
+        ], dtype=object)
+
+        codes = rules.level_codes(matched)
+        columns = [
+            rows["user_id"].astype(str).tolist(),
+            rows["date"].dt.strftime("%Y-%m-%d").tolist(),
+        ]
+        for c in NUMERIC_COLS:
+            if c in rules.metrics:
+                level = codes[:, rules.metrics.index(c)].astype(object)
+                level[level == NO_TIP] = None
+                columns.append(level.tolist())
+            else:
+                columns.append([None] * len(rows))
+        columns += [encoded[inverse].tolist(), [rule_set] * len(rows)]
+        conn.executemany(
+            f"INSERT OR REPLACE INTO recommendations (user_id, date, {', '.join(NUMERIC_COLS)}, tip_ids, rule_set) "
+            f"VALUES ({', '.join('?' * len(columns))})",
+            zip(*columns),
+        )
+
+    def apply(self, rows: pd.DataFrame, before=None, after=None):
+        """
+        Store the recommendations of newly saved records.
+
+        The records are always stored. The recorded signature only moves to
+        `after` if the store was in sync with the storage right before the
+        save; otherwise it stays behind until `sync()`.
+
+        Args:
+            rows (pd.DataFrame): The saved records with the COLUMNS schema.
+            before (optional): The storage signature right before the save.
+            after (optional): The storage signature right after the save.
+        """
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                synced = conn.execute("SELECT value FROM meta WHERE key = 'source_signature'").fetchone()
+                self._upsert(conn, rows)
+                if before is not None and synced is not None and synced[0] == json.dumps(before):
+                    self._set_signature(conn, after)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def seed(self, data_manager) -> bool:
+        """
+        Mark a new, empty store as in sync with storage that holds no entries yet,
+        so saves keep it in sync from the first one without a backfill.
+
+        Args:
+            data_manager (DataManager): The data manager whose storage the store mirrors.
+
+        Returns:
+            bool: True if the signature was seeded.
+        """
+        if self.source_signature() is not None:
+            return False
+        signature = data_manager.backend.signature()
+        chunks = data_manager.backend.iter_chunks(1, columns=["date"])
+        has_entries = any(len(chunk) for chunk in chunks)
+        chunks.close()
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                empty = conn.execute("SELECT 1 FROM recommendations LIMIT 1").fetchone() is None
+                synced = conn.execute("SELECT value FROM meta WHERE key = 'source_signature'").fetchone()
+                seeded = empty and synced is None and not has_entries
+                if seeded:
+                    self._set_signature(conn, signature)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return seeded
+
+    def put(self, rows: pd.DataFrame):
+        """
+        Recompute the recommendations of stored entries, e.g. under new rules,
+        without changing the storage signature.
+
+        Args:
+            rows (pd.DataFrame): Entries that are already in the storage.
+        """
+        self.apply(rows)
+
+    def backfill(self, chunks, signature=None) -> int:
+        """
+        Recompute the recommendations of all entries, replacing the whole table.
+
+        Args:
+            chunks (iterable of pd.DataFrame): All entries, e.g. from a backend's iter_chunks().
+            signature (optional): The storage signature taken before the entries were read.
+
+        Returns:
+            int: Number of entries processed.
+        """
+        total = 0
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM recommendations")
+                # Building the date index once at the end is faster than maintaining it per row
+                conn.execute("DROP INDEX IF EXISTS recommendations_date")
+                for chunk in chunks:
+                    self._upsert(conn, chunk)
+                    total += len(chunk)
+                conn.execute("CREATE INDEX recommendations_date ON recommendations (date)")
+                self._set_signature(conn, signature)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        self.log(f"Backfilled recommendations for {total} entries.")
+        return total
+
+    def sync(self, data_manager, chunksize: int = 100000):
+        """
+        Backfill the store if the storage changed behind its back, e.g. through a
+        crash, another tool or a writer without this store's save listener.
+
+        Args:
+            data_manager (DataManager): The data manager whose storage the store mirrors.
+            chunksize (int): Entries read and processed per batch when backfilling.
+        """
+        signature = data_manager.backend.signature()
+        if self.source_signature() != json.dumps(signature):
+            self.backfill(data_manager.backend.iter_chunks(chunksize), signature)
+
+    def _read(self, where: str, params: list) -> pd.DataFrame:
+        """
+        Read recommendations with their tips and the fingerprint of their rules.
+        """
+        with closing(self._connect()) as conn:
+            df = pd.read_sql_query(
+                f"SELECT r.date, {', '.join('r.' + c for c in NUMERIC_COLS)}, r.tip_ids, s.fingerprint "
+                f"FROM recommendations r JOIN rule_sets s ON r.rule_set = s.rule_set WHERE {where}",
+                conn, params=params,
+            )
+            tips = dict(conn.execute("SELECT tip_id, html FROM tips").fetchall()) if not df.empty else {}
+        df["date"] = pd.to_datetime(df["date"], format="%Y-%m-%d")
+        df["tips"] = [[tips[i] for i in json.loads(ids)] for ids in df.pop("tip_ids")]
+        labels = pd.CategoricalDtype(LEVELS)
+        for c in NUMERIC_COLS:
+            codes = pd.to_numeric(df[c]).fillna(NO_TIP).astype(int)
+            df[c] = pd.Categorical.from_codes(codes, dtype=labels)
+        return df
+
+    def latest(self, user_id: str) -> dict:
+        """
+        Read a user's most recent recommendations under the current rules.
+
+        Args:
+            user_id (str): The user whose recommendations to read.
+
+        Returns:
+            dict: date, the level per metric (None without a tip) and the list of tips;
+                None if the user's latest entry has no stored recommendations under
+                the current rules.
+        """
+        df = self._read(
+            "r.user_id = ? AND r.date = (SELECT MAX(date) FROM recommendations WHERE user_id = ?)",
+            [str(user_id), str(user_id)],
+        )
+        if df.empty or df["fingerprint"].iat[0] != self.recs_engine.rules.fingerprint:
+            return None
+        row = df.drop(columns="fingerprint").iloc[0].to_dict()
+        return {k: (None if k in NUMERIC_COLS and pd.isna(v) else v) for k, v in row.items()}
+
+    def history(self, user_id: str, start=None, end=None) -> pd.DataFrame:
+        """
+        Read the recommendations a user was given, optionally within a date range.
+
+        Args:
+            user_id (str): The user whose recommendations to read.
+            start (optional): First date to return (inclusive).
+            end (optional): Last date to return (inclusive).
+
+        Returns:
+            pd.DataFrame: One row per date, oldest first, with the level per metric
+                (categorical over LEVELS, NaN without a tip), the list of tips and the
+                fingerprint of the rules they were computed with.
+        """
+        where, params = "r.user_id = ?", [str(user_id)]
+        if start is not None:
+            where, params = where + " AND r.date >= ?", params + [pd.Timestamp(start).strftime("%Y-%m-%d")]
+        if end is not None:
+            where, params = where + " AND r.date <= ?", params + [pd.Timestamp(end).strftime("%Y-%m-%d")]
+        return self._read(where + " ORDER BY r.date", params).reset_index(drop=True)
@@ -1,5 +1,71 @@
 # managers/recommendations_engine.py
+import numpy as np
+import pandas as pd
 from .base_manager import BaseManager
+from .csv_index import file_signature
+from .recommendation_rules import DEFAULT_RULES, NO_TIP, CompiledRules, load_rules
+
+def _float_values(column: pd.Series) -> tuple:
+    """
+    Convert a column the way generate() converts each value, with float().
+
+    Numeric columns convert directly. Other columns apply float() once per
+    distinct value, so strings such as " 7", "1_000" or "nan" parse exactly
+    as in generate(); missing values are handled one by one because float()
+    accepts NaN but rejects None, pd.NA and NaT.
+
+    Args:
+        column (pd.Series): A metric column.
+
+    Returns:
+        tuple: (bool array, True where float() succeeds; float64 array of the results).
+    """
+    dtype = column.dtype
+    if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype) \
+            or pd.api.types.is_float_dtype(dtype):
+        # Masked (nullable) arrays hold pd.NA, which float() rejects; NumPy NaN parses
+        valid = ~column.isna().to_numpy() if pd.api.types.is_extension_array_dtype(dtype) \
+            else np.ones(len(column), dtype=bool)
+        return valid, column.to_numpy(dtype=float, na_value=np.nan)
+
+    def parse(value):
+        try:
+            return float(value)
+        except Exception:
+            return None
+
+    try:
+        codes, uniques = pd.factorize(column)
+    except TypeError:
+        # Unhashable values, e.g. lists: parse every value
+        parsed = [parse(value) for value in column]
+        return (np.array([value is not None for value in parsed], dtype=bool),
+                np.array([np.nan if value is None else value for value in parsed], dtype=float))
+    parsed = [parse(value) for value in uniques]
+    valid = np.array([value is not None for value in parsed] + [False], dtype=bool)[codes]
+    values = np.array([np.nan if value is None else value for value in parsed] + [np.nan])[codes]
+    for i in np.flatnonzero(codes == -1):
+        value = parse(column.iat[i])
+        if value is not None:
+            valid[i], values[i] = True, value
+    return valid, values
+
+
+def unique_rows(matched: np.ndarray) -> tuple:
+    """
+    Find the distinct rows of a matrix of small non-negative-or-NO_TIP integers.
+
+    Args:
+        matched (np.ndarray): Output of RecommendationsEngine.match_batch().
+
+    Returns:
+        tuple: (the distinct rows, index of each input row's distinct row).
+    """
+    shifted = matched.astype(np.int64) + 1
+    keys = shifted @ (int(shifted.max(initial=0)) + 1) ** np.arange(matched.shape[1], dtype=np.int64)
+    _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    return matched[first], inverse.ravel()
+
 
 class RecommendationsEngine(BaseManager):
     """
@@ -7,13 +73,29 @@ class RecommendationsEngine(BaseManager):
 
     This class analyzes user metrics such as sleep, activity, mood, and stress
     to provide actionable tips for improving overall wellness.
+
+    The thresholds and tips come from a rule table (see
+    recommendation_rules.DEFAULT_RULES), optionally read from a CSV file.
+    The table is compiled once into lookup arrays and pre-rendered tips, and
+    the file is reloaded when it changes on disk.
     """
 
-    def __init__(self):
+    def __init__(self, rules_csv: str = None):
         """
         Initialize the RecommendationsEngine with predefined color codes for recommendation levels.
+
+        Args:
+            rules_csv (str, optional): CSV rule table to use instead of the built-in
+                rules. A missing file means the built-in rules until it is created.
         """
         self.colors = {"healthy": "green", "moderate": "orange", "high": "red"}
+        self.rules_csv = rules_csv
+        self.rules_version = 0
+        self._rules_listeners = []
+        self._rules_signature = None
+        self._rules = CompiledRules(DEFAULT_RULES, self._span)
+        if rules_csv:
+            self.reload_rules()
 
     def _span(self, text: str, level: str) -> str:
         """
@@ -29,6 +111,70 @@ class RecommendationsEngine(BaseManager):
         color = self.colors.get(level, "black")
         return f"<span style='color:{color}'>{text}</span>"
 
+    @property
+    def rules(self) -> CompiledRules:
+        """
+        CompiledRules: The current rules, reloaded first if the rules file changed.
+        """
+        if self.rules_csv:
+            self.reload_rules()
+        return self._rules
+
+    def set_rules(self, rules: pd.DataFrame):
+        """
+        Compile and switch to a rule table.
+
+        Args:
+            rules (pd.DataFrame): Table with the recommendation_rules.RULE_COLUMNS.
+
+        Raises:
+            ValueError: If the table is invalid; the current rules stay in effect.
+        """
+        self._rules = CompiledRules(rules, self._span)
+        self.rules_version += 1
+        for listener in list(self._rules_listeners):
+            try:
+                listener(self.rules_version)
+            except Exception as e:
+                self.log(f"Rules listener {listener!r} failed: {e}")
+
+    def reload_rules(self, force: bool = False) -> bool:
+        """
+        Reload the rules file if it changed since it was last read.
+
+        A file that fails to load is logged and the current rules stay in
+        effect until the file changes again. A deleted file restores the
+        built-in rules.
+
+        Args:
+            force (bool): Reload even if the file looks unchanged.
+
+        Returns:
+            bool: True if new rules were compiled.
+        """
+        signature = file_signature(self.rules_csv)
+        if signature == self._rules_signature and not force:
+            return False
+        self._rules_signature = signature
+        try:
+            self.set_rules(load_rules(self.rules_csv) if signature else DEFAULT_RULES)
+        except (OSError, ValueError) as e:
+            self.log(f"Keeping the current rules; failed to load '{self.rules_csv}': {e}")
+            return False
+        self.log(f"Loaded {'rules from ' + repr(self.rules_csv) if signature else 'the built-in rules'} "
+                 f"(version {self.rules_version}).")
+        return True
+
+    def add_rules_listener(self, listener):
+        """
+        Register a callable to run whenever new rules are compiled, e.g. to invalidate
+        stored recommendations. It is called as listener(rules_version).
+
+        Args:
+            listener (callable): The function to call.
+        """
+        self._rules_listeners.append(listener)
+
     def generate(self, entry: dict) -> list:
         """
         Generate wellness recommendations based on the provided user data.
@@ -39,58 +185,63 @@ class RecommendationsEngine(BaseManager):
         Returns:
             list: A list of HTML-formatted strings containing personalized recommendations.
         """
-        tips = []
+        rules = self.rules
+        matched = []
+        for metric in rules.metrics:
+            try:
+                value = float(entry.get(metric, None))
+            except Exception:
+                continue
+            matched.append(rules.lookup_one(metric, value))
 
-        # Sleep recommendations
-        try:
-            s = float(entry.get("sleep_hours", None))
-            if 7 <= s <= 9:
-                tips.append(self._span("💤 **Sleep:** Healthy — 7–9 hours.", "healthy"))
-            elif 6 <= s < 7:
-                tips.append(self._span("💤 **Sleep:** Moderate — slightly below recommended.", "moderate"))
-            else:
-                tips.append(self._span("💤 **Sleep:** High risk ⚠️ Adjust sleep schedule to 7–9 hrs.", "high"))
-        except Exception:
-            pass
+        # Falls back to the default message if no metrics are provided
+        return rules.tips(matched)
 
-        # Activity recommendations
-        try:
-            a = float(entry.get("activity_min", None))
-            if a >= 30:
-                tips.append(self._span("🏃‍♂️ **Activity:** Healthy — meets recommended activity.", "healthy"))
-            elif 15 <= a < 30:
-                tips.append(self._span("🏃‍♀️ **Activity:** Moderate — add short walks.", "moderate"))
-            else:
-                tips.append(self._span("⚠️ **Activity:** High risk — aim for 30+ mins daily.", "high"))
-        except Exception:
-            pass
+    def generate_batch(self, df: pd.DataFrame, render: bool = True) -> pd.DataFrame:
+        """
+        Generate the recommendations of many entries at once.
 
-        # Mood recommendations
-        try:
-            m = float(entry.get("mood", None))
-            if 7 <= m <= 10:
-                tips.append(self._span("🙂 **Mood:** Healthy — keep doing what works.", "healthy"))
-            elif 4 <= m <= 6:
-                tips.append(self._span("😐 **Mood:** Moderate — schedule enjoyable activities.", "moderate"))
-            else:
-                tips.append(self._span("😞 **Mood:** High risk — consider reaching out for support.", "high"))
-        except Exception:
-            pass
+        Gives the same tips as calling generate() on every row, including its
+        handling of odd values: NaN only matches rules without bounds, while
+        missing columns and values float() cannot convert (None, pd.NA, "")
+        give no tip for that metric.
 
-        # Stress recommendations
-        try:
-            stv = float(entry.get("stress", None))
-            if 1 <= stv <= 3:
-                tips.append(self._span("😌 **Stress:** Healthy — continue current coping strategies.", "healthy"))
-            elif 4 <= stv <= 6:
-                tips.append(self._span("😰 **Stress:** Moderate — relaxation may help.", "moderate"))
-            else:
-                tips.append(self._span("⚠️ **Stress:** High — try short breathing exercises.", "high"))
-        except Exception:
-            pass
+        Args:
+            df (pd.DataFrame): Entries, raw or typed.
+            render (bool): Also build each row's list of HTML tips; the level codes
+                alone are much cheaper for large batches.
 
-        # Default message if no metrics are provided
-        if not tips:
-            tips.append(self._span("✅ All metrics look within healthy ranges — keep it up!", "healthy"))
+        Returns:
+            pd.DataFrame: Indexed like `df`, with an int8 level code per metric
+                (index into LEVELS, NO_TIP without a tip) and, if `render`,
+                a "tips" column holding the list generate() returns for the row.
+        """
+        rules, matched = self.match_batch(df)
+        result = pd.DataFrame(rules.level_codes(matched), index=df.index, columns=rules.metrics)
+        if not render:
+            return result
 
-        return tips
+        # Few combinations of rules occur; assemble the tips of each once
+        combos, inverse = unique_rows(matched)
+        combined = [rules.tips(row) for row in combos]
+        result["tips"] = [list(combined[i]) for i in inverse]
+        return result
+
+    def match_batch(self, df: pd.DataFrame) -> tuple:
+        """
+        Find the matching rule of every row and metric.
+
+        Args:
+            df (pd.DataFrame): Entries, raw or typed.
+
+        Returns:
+            tuple: (the CompiledRules used, int16 array of rule indices with one row per
+                entry and one column per rules.metrics entry, NO_TIP where no rule matched).
+        """
+        rules = self.rules
+        matched = np.full((len(df), len(rules.metrics)), NO_TIP, dtype=np.int16)
+        for j, metric in enumerate(rules.metrics):
+            if metric in df.columns:
+                valid, values = _float_values(df[metric])
+                matched[:, j] = np.where(valid, rules.lookup(metric, values), NO_TIP)
+        return rules, matched
@@ -4,6 +4,8 @@ import numpy as np
 from datetime import date, timedelta
 import os
 from .base_manager import BaseManager
+from .schema import METRIC_RANGES, NUMERIC_COLS
+from .storage import make_backend
 
 class SampleDataGenerator(BaseManager):
     """
@@ -25,6 +27,17 @@ class SampleDataGenerator(BaseManager):
         self.users_csv = users_csv
         self.output_csv = output_csv
         self.days = days
+        self._write_listeners = []
+
+    def add_write_listener(self, listener):
+        """
+        Register a callable to run after generate_all() replaced the output file,
+        e.g. to invalidate caches of its entries. It is called as listener(output_csv).
+
+        Args:
+            listener (callable): The function to call.
+        """
+        self._write_listeners.append(listener)
 
     def generate_for_user(self, user_id: str, days: int = None) -> pd.DataFrame:
         """
@@ -78,5 +91,41 @@ class SampleDataGenerator(BaseManager):
             print("No users found.")
             return
         df_all = pd.concat(all_rows, ignore_index=True)
-        df_all.to_csv(self.output_csv, index=False)
+        # Through the backend, so a leftover append log or journal cannot override the new rows
+        make_backend("csv", self.output_csv, compact_threshold=None).replace(df_all)
         print(f"Generated {len(df_all)} rows to '{self.output_csv}'.")
+        for listener in list(self._write_listeners):
+            try:
+                listener(self.output_csv)
+            except Exception as e:
+                self.log(f"Write listener {getattr(listener, '__qualname__', listener)} failed: {e}")
+
+    def validate_data(self, data) -> pd.DataFrame:
+        """
+        Check wellness data for missing and out-of-range metric values.
+
+        The data can be a single DataFrame or an iterable of chunks, such as
+        `DataManager.backend.iter_chunks()`, so files larger than memory can be
+        validated one chunk at a time. Pass the raw values: the typed chunks of
+        `DataManager.iter_entries()` have already turned values that do not fit
+        their integer dtype into <NA>, which would count them as missing.
+
+        Args:
+            data (pd.DataFrame or iterable of pd.DataFrame): Entries to validate.
+
+        Returns:
+            pd.DataFrame: Per metric, the number of rows, missing values and
+                values outside METRIC_RANGES.
+        """
+        chunks = [data] if isinstance(data, pd.DataFrame) else data
+        report = pd.DataFrame(0, index=NUMERIC_COLS, columns=["rows", "missing", "out_of_range"])
+        for chunk in chunks:
+            chunk = chunk.reindex(columns=NUMERIC_COLS)
+            for c in NUMERIC_COLS:
+                low, high = METRIC_RANGES[c]
+                # One float column at a time keeps memory bounded without narrowing the values
+                values = pd.to_numeric(chunk[c], errors="coerce")
+                report.loc[c, "rows"] += len(values)
+                report.loc[c, "missing"] += int(values.isna().sum())
+                report.loc[c, "out_of_range"] += int(((values < low) | (values > high)).fillna(False).sum())
+        return report
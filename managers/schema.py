@@ -0,0 +1,120 @@
+# managers/schema.py
+import numpy as np
+import pandas as pd
+
+# Define the columns for the data CSV file
+COLUMNS = [
+    "date",
+    "user_id",
+    "sleep_hours",
+    "mood",
+    "stress",
+    "activity_min",
+    "notes"
+]
+
+# Columns that identify a single daily entry
+KEY_COLUMNS = ["user_id", "date"]
+
+# Columns that can be overwritten for an existing entry
+VALUE_COLUMNS = ["sleep_hours", "mood", "stress", "activity_min", "notes"]
+
+# Define the numeric columns used for analysis
+NUMERIC_COLS = ["sleep_hours", "mood", "stress", "activity_min"]
+
+# Valid range of each metric, matching the limits of the entry form
+METRIC_RANGES = {
+    "sleep_hours": (0.0, 24.0),
+    "mood": (1, 10),
+    "stress": (1, 10),
+    "activity_min": (0, 1440),
+}
+
+# Compact in-memory dtypes for loaded entries. The numeric types are pandas'
+# nullable types so missing values stay <NA> instead of forcing float64/object.
+# Mood, stress and activity are whole numbers on the entry form; see
+# to_typed_frame() for values that are not.
+DTYPES = {
+    "user_id": "category",
+    "sleep_hours": "Float32",
+    "mood": "Int8",
+    "stress": "Int8",
+    "activity_min": "Int16",
+}
+
+
+def is_typed_frame(df: pd.DataFrame) -> bool:
+    """
+    Check whether a frame already has a datetime date column and numeric metric columns.
+
+    Args:
+        df (pd.DataFrame): The frame to check.
+
+    Returns:
+        bool: True if no further date or numeric coercion is needed.
+    """
+    if "date" not in df.columns or not pd.api.types.is_datetime64_any_dtype(df["date"]):
+        return False
+    return all(c in df.columns and pd.api.types.is_numeric_dtype(df[c]) for c in NUMERIC_COLS)
+
+
+def to_typed_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convert raw string entries to the compact typed schema.
+
+    Dates become datetime64 (midnight), user_id becomes categorical and the
+    metrics use the nullable DTYPES. Unparseable values, and values an integer
+    metric cannot hold exactly (fractional or outside its dtype's range, e.g. a
+    mood of 6.5), become <NA> rather than being rounded. Empty notes become missing.
+
+    Args:
+        df (pd.DataFrame): Entries with the COLUMNS schema, typically read as strings.
+
+    Returns:
+        pd.DataFrame: A new DataFrame with typed columns.
+    """
+    df = df.copy()
+    if "date" in df.columns:
+        df["date"] = pd.to_datetime(df["date"], errors="coerce").dt.normalize()
+    if "user_id" in df.columns:
+        df["user_id"] = df["user_id"].astype(DTYPES["user_id"])
+    if "notes" in df.columns:
+        # Empty notes read back from CSV as missing; treat them the same everywhere
+        df["notes"] = df["notes"].mask(df["notes"] == "")
+    for c in NUMERIC_COLS:
+        if c not in df.columns:
+            continue
+        values = pd.to_numeric(df[c], errors="coerce")
+        dtype = DTYPES[c]
+        if dtype.startswith("Int"):
+            info = np.iinfo(dtype.lower())
+            values = values.where((values >= info.min) & (values <= info.max) & (values % 1 == 0))
+        df[c] = values.astype(dtype)
+    return df
+
+
+def merge_entries(df: pd.DataFrame, rows: pd.DataFrame) -> pd.DataFrame:
+    """
+    Apply new records on top of existing entries, the last record per
+    (user_id, date) winning.
+
+    Both frames should use the same schema (raw strings or typed). For typed
+    frames the categorical user_id keeps a shared set of categories so the
+    result stays categorical.
+
+    Args:
+        df (pd.DataFrame): Existing entries.
+        rows (pd.DataFrame): New or updated records.
+
+    Returns:
+        pd.DataFrame: The merged entries, with updated records moved to the end.
+    """
+    if rows.empty:
+        return df
+    rows = rows.drop_duplicates(subset=KEY_COLUMNS, keep="last")
+    if isinstance(df["user_id"].dtype, pd.CategoricalDtype):
+        categories = df["user_id"].cat.categories.union(pd.Index(rows["user_id"].dropna().unique()))
+        df = df.assign(user_id=df["user_id"].cat.set_categories(categories))
+        rows = rows.assign(user_id=pd.Categorical(rows["user_id"], categories=categories))
+    replaced = pd.MultiIndex.from_frame(df[KEY_COLUMNS]).isin(pd.MultiIndex.from_frame(rows[KEY_COLUMNS]))
+    return pd.concat([df[~replaced], rows], ignore_index=True)
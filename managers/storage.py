@@ -0,0 +1,1000 @@
+# managers/storage.py
+import pandas as pd
+import os
+import sqlite3
+from contextlib import closing
+from .base_manager import BaseManager
+from .csv_index import CsvDateIndex, CsvUserIndex
+from .file_io import FileLock, WriteJournal, atomic_write_csv, lock_path_for
+from .schema import COLUMNS, KEY_COLUMNS, VALUE_COLUMNS, merge_entries, to_typed_frame
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional, only needed for the Parquet backend
+    pa = pq = None
+
+# Compact the append log automatically once it grows past this size (bytes)
+COMPACT_THRESHOLD = 256 * 1024
+
+
+def log_path_for(data_csv: str) -> str:
+    """
+    Build the path of the append log that sits next to a data CSV file.
+
+    Args:
+        data_csv (str): Path to the main data CSV file.
+
+    Returns:
+        str: Path to the append log, e.g. "data/saved_data.log.csv".
+    """
+    root, ext = os.path.splitext(data_csv)
+    return f"{root}.log{ext or '.csv'}"
+
+
+def to_iso_date(value) -> str:
+    """
+    Normalize a date-like value to an ISO "YYYY-MM-DD" string.
+
+    Args:
+        value: A date, datetime, Timestamp or date string.
+
+    Returns:
+        str: The ISO date string, or None if value is None.
+    """
+    if value is None:
+        return None
+    return pd.Timestamp(value).date().isoformat()
+
+
+def stat_signature(paths: list) -> tuple:
+    """
+    Describe the current version of a set of files.
+
+    Args:
+        paths (list): File paths to describe.
+
+    Returns:
+        tuple: (path, inode, size, mtime_ns) per file, with None fields for missing files.
+    """
+    signature = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            signature.append((os.path.abspath(path), st.st_ino, st.st_size, st.st_mtime_ns))
+        except FileNotFoundError:
+            signature.append((os.path.abspath(path), None, None, None))
+    return tuple(signature)
+
+
+def project_columns(df: pd.DataFrame, columns=None) -> pd.DataFrame:
+    """
+    Keep only the requested columns, in the requested order.
+
+    Args:
+        df (pd.DataFrame): Entries with the COLUMNS schema.
+        columns (list, optional): Columns to keep. None keeps all of them.
+
+    Returns:
+        pd.DataFrame: The projected entries.
+    """
+    if columns is None:
+        return df
+    return df[list(columns)]
+
+
+def filter_entries(df: pd.DataFrame, user_id: str = None, start=None, end=None) -> pd.DataFrame:
+    """
+    Filter raw entries by user and an inclusive date range.
+
+    Args:
+        df (pd.DataFrame): Entries with ISO date strings in the "date" column.
+        user_id (str, optional): Keep only this user's entries.
+        start (optional): First date to keep.
+        end (optional): Last date to keep.
+
+    Returns:
+        pd.DataFrame: The matching entries.
+    """
+    mask = pd.Series(True, index=df.index)
+    if user_id is not None:
+        mask &= df["user_id"].astype(str) == str(user_id)
+    if start is not None:
+        mask &= df["date"].astype(str) >= to_iso_date(start)
+    if end is not None:
+        mask &= df["date"].astype(str) <= to_iso_date(end)
+    if mask.all():
+        return df
+    return df[mask].reset_index(drop=True)
+
+
+def filter_users(df: pd.DataFrame, user_ids=None) -> pd.DataFrame:
+    """
+    Keep only the entries of the given users.
+
+    Args:
+        df (pd.DataFrame): Entries with a "user_id" column.
+        user_ids (list, optional): Users to keep. None keeps everyone.
+
+    Returns:
+        pd.DataFrame: The matching entries.
+    """
+    if user_ids is None:
+        return df
+    return df[df["user_id"].astype(str).isin([str(u) for u in user_ids])]
+
+
+class StorageBackend(BaseManager):
+    """
+    Base class for the storage backends used by DataManager.
+
+    A backend stores one record per (user_id, date) and exposes reads with
+    optional user and date filters plus an upsert for new records.
+
+    Writes are serialized across threads and processes with an advisory lock
+    file next to the data, and reads take the same lock in shared mode so
+    they never see a half-applied write. Journaled backends first record
+    each batch in a write-ahead journal, which is replayed when the storage
+    is opened again after a crash. Subclasses implement the unlocked
+    `_read`, `_upsert` and `_compact` methods and call `_open_storage()` once
+    their files exist.
+    """
+
+    # Whether writes go through the write-ahead journal
+    journaled = True
+
+    def _open_storage(self):
+        """
+        Set up the lock and journal for files()[0] and replay any pending journal.
+        """
+        self.lock_path = lock_path_for(self.files()[0])
+        # Keep the full file name, so the CSV and Parquet stores of one data set never replay each other's journal
+        self.journal = WriteJournal(self.files()[0] + ".journal") if self.journaled else None
+        if self.journal is None:
+            return
+        with FileLock(self.lock_path):
+            pending = self.journal.pending()
+            if not pending.empty:
+                self._upsert(pending.reindex(columns=COLUMNS))
+                self.log(f"Replayed {len(pending)} journaled records.")
+            self.journal.clear()
+
+    def files(self) -> list:
+        """
+        List the files that hold this backend's data.
+
+        Returns:
+            list: File paths; the first one identifies the data set.
+        """
+        raise NotImplementedError
+
+    def signature(self) -> tuple:
+        """
+        Describe the current version of the stored data, used to validate caches.
+
+        Returns:
+            tuple: The stat signature of every file in files().
+        """
+        return stat_signature(self.files())
+
+    def read(self, user_id: str = None, start=None, end=None, columns=None) -> pd.DataFrame:
+        """
+        Read entries, optionally filtered by user and inclusive date range.
+
+        Args:
+            user_id (str, optional): Only return this user's entries.
+            start (optional): First date to return.
+            end (optional): Last date to return.
+            columns (list, optional): Only return these columns.
+
+        Returns:
+            pd.DataFrame: Entries with the COLUMNS schema (or the requested columns).
+        """
+        with FileLock(self.lock_path, shared=True):
+            return self._read(user_id=user_id, start=start, end=end, columns=columns)
+
+    def read_user(self, user_id: str, start=None, end=None, columns=None) -> pd.DataFrame:
+        """
+        Read one user's entries without touching other users' data where the backend allows it.
+
+        Args:
+            user_id (str): The user whose entries to return.
+            start (optional): First date to return.
+            end (optional): Last date to return.
+            columns (list, optional): Only return these columns.
+
+        Returns:
+            pd.DataFrame: Entries with the COLUMNS schema (or the requested columns).
+        """
+        with FileLock(self.lock_path, shared=True):
+            return self._read_user(user_id, start=start, end=end, columns=columns)
+
+    def _read_user(self, user_id: str, start=None, end=None, columns=None) -> pd.DataFrame:
+        """
+        Read one user's entries. Backends override this when they can avoid
+        touching other users' data.
+        """
+        return self._read(user_id=user_id, start=start, end=end, columns=columns)
+
+    def query(self, user_id: str = None, start=None, end=None, columns=None) -> pd.DataFrame:
+        """
+        Read entries of a user and/or an inclusive date range, touching only the matching data.
+
+        Args:
+            user_id (str, optional): Only return this user's entries.
+            start (optional): First date to return.
+            end (optional): Last date to return.
+            columns (list, optional): Only return these columns.
+
+        Returns:
+            pd.DataFrame: Entries with the COLUMNS schema (or the requested columns).
+        """
+        with FileLock(self.lock_path, shared=True):
+            return self._query(user_id=user_id, start=start, end=end, columns=columns)
+
+    def _query(self, user_id: str = None, start=None, end=None, columns=None) -> pd.DataFrame:
+        """
+        Read a user and/or date range. Backends whose reads already seek by key
+        (the SQLite indexes, Parquet row group statistics) use their filtered read.
+        """
+        return self._read(user_id=user_id, start=start, end=end, columns=columns)
+
+    def upsert(self, rows: pd.DataFrame) -> pd.DataFrame:
+        """
+        Insert records, overwriting existing ones with the same user and date.
+
+        Args:
+            rows (pd.DataFrame): Records with the COLUMNS schema.
+
+        Returns:
+            pd.DataFrame: The backend's write result (see the subclass).
+        """
+        return self.write(rows)[0]
+
+    def write(self, rows: pd.DataFrame, after_write=None) -> tuple:
+        """
+        Upsert records under the exclusive lock, journaling them first.
+
+        Args:
+            rows (pd.DataFrame): Records with the COLUMNS schema.
+            after_write (callable, optional): Called as after_write(rows, before, after)
+                with the signatures around the write once the records are stored,
+                still under the lock, so derived stores are updated in the same
+                order as the storage.
+
+        Returns:
+            tuple: (result, signature before the write, signature after the write).
+                The signatures are taken under the lock, so no other writer
+                can slip in between them.
+        """
+        rows = rows.reindex(columns=COLUMNS)
+        with FileLock(self.lock_path):
+            before = self.signature()
+            if self.journal is not None:
+                self.journal.record(rows)
+            result = self._upsert(rows)
+            if self.journal is not None:
+                self.journal.clear()
+            after = self.signature()
+            if after_write is not None:
+                after_write(rows, before, after)
+            return result, before, after
+
+    def compact(self, after_write=None) -> pd.DataFrame:
+        """
+        Reorganize the underlying storage under the exclusive lock.
+
+        Args:
+            after_write (callable, optional): Called as after_write(rows, before, after)
+                with no rows once the compaction is done, still under the lock.
+
+        Returns:
+            pd.DataFrame: All entries after compaction.
+        """
+        with FileLock(self.lock_path):
+            before = self.signature()
+            df = self._compact()
+            if after_write is not None:
+                after_write(pd.DataFrame(columns=COLUMNS), before, self.signature())
+            return df
+
+    def replace(self, rows: pd.DataFrame) -> tuple:
+        """
+        Replace all stored entries with the given records under the exclusive lock.
+
+        Any append log is dropped along with the old entries. Save listeners
+        are not called, as the records are no increment over the previous
+        data; derived stores see the changed signature and stay stale until
+        they are rebuilt (see rebuild_aggregates.py and backfill_recommendations.py).
+
+        Args:
+            rows (pd.DataFrame): The new entries with the COLUMNS schema.
+
+        Returns:
+            tuple: (signature before the write, signature after the write).
+        """
+        rows = rows.reindex(columns=COLUMNS).drop_duplicates(subset=KEY_COLUMNS, keep="last")
+        with FileLock(self.lock_path):
+            before = self.signature()
+            if self.journal is not None:
+                self.journal.clear()
+            self._replace(rows.reset_index(drop=True))
+            return before, self.signature()
+
+    def _replace(self, rows: pd.DataFrame):
+        """
+        Replace all stored entries; see replace().
+        """
+        raise NotImplementedError
+
+    def snapshot(self) -> tuple:
+        """
+        Read all entries together with the signature they were read at.
+
+        Returns:
+            tuple: (entries with the COLUMNS schema, storage signature).
+        """
+        with FileLock(self.lock_path, shared=True):
+            return self._read(), self.signature()
+
+    def _compact(self) -> pd.DataFrame:
+        """
+        Reorganize the underlying storage. Backends without a log do nothing.
+        """
+        return self._read()
+
+    def iter_chunks(self, chunksize: int = 100000, columns=None, user_ids=None):
+        """
+        Yield entries in chunks of at most `chunksize` rows.
+
+        This default implementation reads everything first; backends override
+        it to stream with bounded memory.
+
+        Args:
+            chunksize (int): Maximum number of rows per chunk.
+            columns (list, optional): Only return these columns.
+            user_ids (list, optional): Only return these users' entries.
+
+        Yields:
+            pd.DataFrame: Chunks of entries.
+        """
+        df = filter_users(self.read(), user_ids)
+        for i in range(0, len(df), chunksize):
+            yield project_columns(df.iloc[i:i + chunksize], columns)
+
+
+class CsvStorage(StorageBackend):
+    """
+    Stores entries in a flat CSV file.
+
+    In append-only mode (the default) writes are appended to a small log file
+    next to the main CSV instead of rewriting it. Later records supersede
+    earlier ones for the same user and date, and `compact()` folds the log
+    back into a clean main file.
+
+    Per-user reads go through a persistent byte-offset index over the main
+    file (see CsvUserIndex), so they only parse that user's records. Range
+    queries use a sorted date index (see CsvDateIndex) in the same way.
+    """
+
+    def __init__(self, data_csv="data/saved_data.csv", append_only=True, compact_threshold=COMPACT_THRESHOLD):
+        """
+        Initialize the CsvStorage.
+
+        Args:
+            data_csv (str): Path to the CSV file storing user wellness data.
+            append_only (bool): Append writes to the log instead of rewriting the CSV.
+            compact_threshold (int): Log size in bytes that triggers an automatic compaction.
+                Use None to only compact on demand.
+        """
+        self.data_csv = data_csv
+        self.log_csv = log_path_for(data_csv)
+        self.append_only = append_only
+        self.compact_threshold = compact_threshold
+        self.user_index = CsvUserIndex(data_csv)
+        self.date_index = CsvDateIndex(data_csv)
+        self._ensure_csv()
+        self._open_storage()
+
+    def files(self) -> list:
+        """
+        List the main CSV and its append log.
+
+        Returns:
+            list: File paths.
+        """
+        return [self.data_csv, self.log_csv]
+
+    def _ensure_csv(self):
+        """
+        Ensure the data CSV file exists. If not, create it with the required columns.
+        """
+        parent = os.path.dirname(self.data_csv)
+        if parent and not os.path.exists(parent):
+            os.makedirs(parent)
+        if not os.path.exists(self.data_csv):
+            atomic_write_csv(pd.DataFrame(columns=COLUMNS), self.data_csv)
+
+    def _read_log(self) -> pd.DataFrame:
+        """
+        Read the append log, if any.
+
+        Returns:
+            pd.DataFrame: Logged records in write order (empty if there is no log).
+        """
+        if not os.path.exists(self.log_csv):
+            return pd.DataFrame(columns=COLUMNS)
+        try:
+            return pd.read_csv(self.log_csv, dtype=str)
+        except pd.errors.EmptyDataError:
+            return pd.DataFrame(columns=COLUMNS)
+
+    def _read(self, user_id: str = None, start=None, end=None, columns=None) -> pd.DataFrame:
+        """
+        Read entries from the main CSV with the append log applied on top.
+
+        Args:
+            user_id (str, optional): Only return this user's entries.
+            start (optional): First date to return.
+            end (optional): Last date to return.
+            columns (list, optional): Only return these columns. The key
+                columns are always parsed so the log can be applied.
+
+        Returns:
+            pd.DataFrame: Entries with the COLUMNS schema (or the requested columns).
+        """
+        wanted = set(COLUMNS if columns is None else list(columns) + KEY_COLUMNS)
+        try:
+            df = pd.read_csv(self.data_csv, dtype=str, usecols=lambda c: c in wanted)
+        except pd.errors.EmptyDataError:
+            df = pd.DataFrame(columns=COLUMNS)
+        df = self._apply_log(df, self._read_log())
+        return project_columns(filter_entries(df, user_id, start, end), columns)
+
+    def _read_user(self, user_id: str, start=None, end=None, columns=None) -> pd.DataFrame:
+        """
+        Read one user's entries using the per-user index over the main CSV.
+
+        Args:
+            user_id (str): The user whose entries to return.
+            start (optional): First date to return.
+            end (optional): Last date to return.
+            columns (list, optional): Only return these columns.
+
+        Returns:
+            pd.DataFrame: Entries with the COLUMNS schema (or the requested columns).
+        """
+        df = self.user_index.read_user(user_id)
+        log = self._read_log()
+        if not log.empty:
+            log = log[log["user_id"].astype(str) == str(user_id)]
+        df = self._apply_log(df, log)
+        return project_columns(filter_entries(df, user_id, start, end), columns)
+
+    def _query(self, user_id: str = None, start=None, end=None, columns=None) -> pd.DataFrame:
+        """
+        Read a user and/or date range using the sorted date index over the main CSV.
+
+        Only the matching records of the main file are parsed; the append log
+        is small and filtered in memory. A logged record can only override a
+        main-file record with the same user and date, so both sides can be
+        filtered before the log is applied.
+
+        Args:
+            user_id (str, optional): Only return this user's entries.
+            start (optional): First date to return.
+            end (optional): Last date to return.
+            columns (list, optional): Only return these columns.
+
+        Returns:
+            pd.DataFrame: Entries with the COLUMNS schema (or the requested columns).
+        """
+        if user_id is None and start is None and end is None:
+            return self._read(columns=columns)
+        df = self.date_index.read_range(user_id, start, end)
+        log = filter_entries(self._read_log(), user_id, start, end)
+        df = self._apply_log(df, log)
+        return project_columns(filter_entries(df, user_id, start, end), columns)
+
+    def _apply_log(self, df: pd.DataFrame, log: pd.DataFrame) -> pd.DataFrame:
+        """
+        Apply logged records on top of entries from the main CSV.
+
+        Args:
+            df (pd.DataFrame): Entries read from the main CSV.
+            log (pd.DataFrame): Logged records in write order.
+
+        Returns:
+            pd.DataFrame: Merged entries with the COLUMNS schema, last record winning.
+        """
+        if not log.empty:
+            df = pd.concat([df, log], ignore_index=True)
+            df = df.drop_duplicates(subset=KEY_COLUMNS, keep="last").reset_index(drop=True)
+        for c in COLUMNS:
+            if c not in df.columns:
+                df[c] = pd.NA
+        return df[COLUMNS].copy()
+
+    def _upsert(self, rows: pd.DataFrame) -> pd.DataFrame:
+        """
+        Write records, either by appending them to the log or by rewriting the CSV.
+
+        Args:
+            rows (pd.DataFrame): Records with the COLUMNS schema.
+
+        Returns:
+            pd.DataFrame: In append-only mode, the records that were written.
+                Otherwise, the updated DataFrame containing all entries.
+        """
+        rows = rows.reindex(columns=COLUMNS)
+        if self.append_only:
+            return self._append(rows)
+
+        # One vectorized merge for the whole batch instead of a lookup per record
+        df = merge_entries(self._read(), rows.astype(object))
+        atomic_write_csv(df, self.data_csv)
+        # The rewrite already includes any logged records
+        if os.path.exists(self.log_csv):
+            os.remove(self.log_csv)
+        return df
+
+    def _append(self, rows: pd.DataFrame) -> pd.DataFrame:
+        """
+        Append records to the log, compacting it if it has grown too large.
+
+        Args:
+            rows (pd.DataFrame): Records with the COLUMNS schema.
+
+        Returns:
+            pd.DataFrame: The records that were written.
+        """
+        size = os.path.getsize(self.log_csv) if os.path.exists(self.log_csv) else 0
+        with open(self.log_csv, "a+b") as f:
+            if size:
+                # Terminate a record torn by a crash so it cannot swallow this one
+                f.seek(size - 1)
+                if f.read(1) != b"\n":
+                    f.write(b"\n")
+            f.write(rows.to_csv(header=not size, index=False).encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+
+        if self.compact_threshold is not None and os.path.getsize(self.log_csv) >= self.compact_threshold:
+            self._compact()
+        return rows
+
+    def _replace(self, rows: pd.DataFrame):
+        """
+        Write a new main CSV, sorted by user and date, and drop the append log.
+
+        The log goes first: its records must never be applied on top of the
+        new file, even if the process dies in between.
+
+        Args:
+            rows (pd.DataFrame): The new entries with the COLUMNS schema.
+        """
+        if os.path.exists(self.log_csv):
+            os.remove(self.log_csv)
+        atomic_write_csv(rows.sort_values(KEY_COLUMNS, kind="stable"), self.data_csv)
+
+    def _compact(self) -> pd.DataFrame:
+        """
+        Fold the append log back into the main CSV file.
+
+        The merged data is sorted by user and date and written once, after which
+        the log is removed.
+
+        Returns:
+            pd.DataFrame: The compacted DataFrame containing all entries.
+        """
+        df = self._read()
+        if not os.path.exists(self.log_csv):
+            return df
+        df = df.sort_values(KEY_COLUMNS, kind="stable").reset_index(drop=True)
+        atomic_write_csv(df, self.data_csv)
+        os.remove(self.log_csv)
+        self.log(f"Compacted {len(df)} rows into '{self.data_csv}'.")
+        return df
+
+    def iter_chunks(self, chunksize: int = 100000, columns=None, user_ids=None):
+        """
+        Stream the main CSV in chunks, with the append log applied.
+
+        The log is read up front and the main file opened under the shared
+        lock; a concurrent compaction replaces the file by rename, so the open
+        handle keeps reading a consistent snapshot. Main-file rows that the
+        log overrides are dropped and the logged records are yielded last.
+
+        Args:
+            chunksize (int): Maximum number of rows per chunk.
+            columns (list, optional): Only return these columns.
+            user_ids (list, optional): Only return these users' entries.
+
+        Yields:
+            pd.DataFrame: Chunks of entries as strings.
+        """
+        wanted = set(COLUMNS if columns is None else list(columns) + KEY_COLUMNS)
+        with FileLock(self.lock_path, shared=True):
+            log = filter_users(self._apply_log(pd.DataFrame(columns=COLUMNS), self._read_log()), user_ids)
+            f = open(self.data_csv, "r", newline="", encoding="utf-8")
+        overridden = pd.MultiIndex.from_frame(log[KEY_COLUMNS].astype(str))
+        try:
+            try:
+                reader = pd.read_csv(f, dtype=str, usecols=lambda c: c in wanted, chunksize=chunksize)
+            except pd.errors.EmptyDataError:
+                reader = []
+            for chunk in reader:
+                chunk = filter_users(chunk, user_ids)
+                if len(overridden):
+                    chunk = chunk[~pd.MultiIndex.from_frame(chunk[KEY_COLUMNS]).isin(overridden)]
+                if not chunk.empty:
+                    yield project_columns(chunk.reindex(columns=COLUMNS), columns)
+        finally:
+            f.close()
+        for i in range(0, len(log), chunksize):
+            yield project_columns(log.iloc[i:i + chunksize], columns)
+
+
+class SqliteStorage(StorageBackend):
+    """
+    Stores entries in an embedded SQLite database.
+
+    The entries table has a composite primary key on (user_id, date), so a
+    save is a single UPSERT and reads push user and date filters down to
+    the database. SQLite already makes each write atomic, so this backend
+    does not use the write journal.
+    """
+
+    journaled = False
+
+    def __init__(self, db_path="data/saved_data.sqlite", seed_csv=None):
+        """
+        Initialize the SqliteStorage.
+
+        Args:
+            db_path (str): Path to the SQLite database file.
+            seed_csv (str, optional): CSV file to import when the database is first created.
+        """
+        self.db_path = db_path
+        self._open_storage()
+        self._ensure_db(seed_csv)
+
+    def files(self) -> list:
+        """
+        List the database file.
+
+        Returns:
+            list: File paths.
+        """
+        return [self.db_path]
+
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Open a new connection. Connections are short-lived so the backend can
+        be shared across Streamlit script threads.
+
+        Returns:
+            sqlite3.Connection: An open database connection.
+        """
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _ensure_db(self, seed_csv=None):
+        """
+        Ensure the database and the entries table exist, importing seed_csv
+        into a newly created database.
+
+        Args:
+            seed_csv (str, optional): CSV file with existing entries.
+        """
+        parent = os.path.dirname(self.db_path)
+        if parent and not os.path.exists(parent):
+            os.makedirs(parent)
+        is_new = not os.path.exists(self.db_path)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS entries (
+                    date TEXT NOT NULL,
+                    user_id TEXT NOT NULL,
+                    sleep_hours REAL,
+                    mood INTEGER,
+                    stress INTEGER,
+                    activity_min INTEGER,
+                    notes TEXT,
+                    PRIMARY KEY (user_id, date)
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_date ON entries (date)")
+        if is_new and seed_csv and os.path.exists(seed_csv):
+            seed = CsvStorage(seed_csv, append_only=True, compact_threshold=None).read()
+            if not seed.empty:
+                self.upsert(seed)
+                self.log(f"Imported {len(seed)} rows from '{seed_csv}'.")
+
+    def _read(self, user_id: str = None, start=None, end=None, columns=None) -> pd.DataFrame:
+        """
+        Read entries with user and date filters and the column list applied in SQL.
+
+        Args:
+            user_id (str, optional): Only return this user's entries.
+            start (optional): First date to return.
+            end (optional): Last date to return.
+            columns (list, optional): Only return these columns.
+
+        Returns:
+            pd.DataFrame: Entries with the COLUMNS schema (or the requested columns).
+        """
+        columns = COLUMNS if columns is None else [c for c in columns if c in COLUMNS]
+        clauses, params = [], []
+        if user_id is not None:
+            clauses.append("user_id = ?")
+            params.append(str(user_id))
+        if start is not None:
+            clauses.append("date >= ?")
+            params.append(to_iso_date(start))
+        if end is not None:
+            clauses.append("date <= ?")
+            params.append(to_iso_date(end))
+        # Read everything back as text to match the CSV backend
+        select = ", ".join(f"CAST({c} AS TEXT) AS {c}" for c in columns)
+        sql = f"SELECT {select} FROM entries"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY user_id, date"
+        with closing(self._connect()) as conn:
+            df = pd.read_sql_query(sql, conn, params=params)
+        return df[columns]
+
+    def _upsert(self, rows: pd.DataFrame) -> pd.DataFrame:
+        """
+        Insert records, overwriting existing ones with the same user and date.
+
+        Args:
+            rows (pd.DataFrame): Records with the COLUMNS schema.
+
+        Returns:
+            pd.DataFrame: The records that were written.
+        """
+        rows = rows.reindex(columns=COLUMNS)
+        values = rows.astype(object).where(rows.notna(), None).values.tolist()
+        updates = ", ".join(f"{c} = excluded.{c}" for c in VALUE_COLUMNS)
+        sql = (
+            f"INSERT INTO entries ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))}) "
+            f"ON CONFLICT (user_id, date) DO UPDATE SET {updates}"
+        )
+        with closing(self._connect()) as conn, conn:
+            conn.executemany(sql, values)
+        return rows
+
+    def _replace(self, rows: pd.DataFrame):
+        """
+        Swap the table's contents in a single transaction.
+
+        Args:
+            rows (pd.DataFrame): The new entries with the COLUMNS schema.
+        """
+        values = rows.astype(object).where(rows.notna(), None).values.tolist()
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM entries")
+            conn.executemany(
+                f"INSERT INTO entries ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})", values)
+
+    def iter_chunks(self, chunksize: int = 100000, columns=None, user_ids=None):
+        """
+        Stream entries from the database with a chunked cursor.
+
+        Args:
+            chunksize (int): Maximum number of rows per chunk.
+            columns (list, optional): Only return these columns.
+            user_ids (list, optional): Only return these users' entries.
+
+        Yields:
+            pd.DataFrame: Chunks of entries as strings.
+        """
+        columns = COLUMNS if columns is None else [c for c in columns if c in COLUMNS]
+        select = ", ".join(f"CAST({c} AS TEXT) AS {c}" for c in columns)
+        sql, params = f"SELECT {select} FROM entries", []
+        if user_ids is not None:
+            params = [str(u) for u in user_ids]
+            sql += f" WHERE user_id IN ({', '.join('?' * len(params))})"
+        sql += " ORDER BY user_id, date"
+        with closing(self._connect()) as conn:
+            for chunk in pd.read_sql_query(sql, conn, params=params, chunksize=chunksize):
+                yield chunk[columns]
+
+
+class ParquetStorage(StorageBackend):
+    """
+    Stores entries in a columnar Parquet file (requires pyarrow).
+
+    Entries are kept typed and sorted either by date or by user, and written
+    in row groups of `row_group_size` rows. Reads push user and date filters
+    down to pyarrow, which skips row groups using their min/max statistics,
+    and only decode the requested columns, so analytics over NUMERIC_COLS
+    never touch the notes text. Every write rewrites the file, so this
+    backend suits bulk and analytics workloads rather than frequent single saves.
+    """
+
+    PARTITIONS = {"date": ["date", "user_id"], "user": ["user_id", "date"]}
+
+    def __init__(self, parquet_path="data/saved_data.parquet", partition_by="date", row_group_size=65536, seed_csv=None):
+        """
+        Initialize the ParquetStorage.
+
+        Args:
+            parquet_path (str): Path to the Parquet file.
+            partition_by (str): "date" or "user"; the sort order that defines the row groups.
+            row_group_size (int): Maximum number of rows per row group.
+            seed_csv (str, optional): CSV file to convert when the Parquet file does not exist yet.
+        """
+        if pq is None:
+            raise ImportError("The Parquet storage backend requires pyarrow (pip install pyarrow).")
+        if partition_by not in self.PARTITIONS:
+            raise ValueError(f"partition_by must be one of {sorted(self.PARTITIONS)}, got {partition_by!r}")
+        self.parquet_path = parquet_path
+        self.partition_by = partition_by
+        self.row_group_size = row_group_size
+        seed = pd.DataFrame(columns=COLUMNS)
+        if not os.path.exists(parquet_path) and seed_csv and os.path.exists(seed_csv):
+            # The seed CSV may share this store's lock file, so read it before locking
+            seed = CsvStorage(seed_csv, append_only=True, compact_threshold=None).read()
+        with FileLock(lock_path_for(parquet_path)):
+            if not os.path.exists(parquet_path):
+                if len(seed):
+                    self.log(f"Converting {len(seed)} rows from '{seed_csv}'.")
+                self._write(to_typed_frame(seed))
+        self._open_storage()
+
+    def files(self) -> list:
+        """
+        List the Parquet file.
+
+        Returns:
+            list: File paths.
+        """
+        return [self.parquet_path]
+
+    def _write(self, df: pd.DataFrame):
+        """
+        Sort typed entries by the partition key and atomically replace the Parquet file.
+
+        Args:
+            df (pd.DataFrame): Typed entries with the COLUMNS schema.
+        """
+        parent = os.path.dirname(self.parquet_path)
+        if parent and not os.path.exists(parent):
+            os.makedirs(parent)
+        df = df.reindex(columns=COLUMNS)
+        df = df.assign(user_id=df["user_id"].astype("string"), notes=df["notes"].astype("string"))
+        df = df.sort_values(self.PARTITIONS[self.partition_by], kind="stable")
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        tmp_path = self.parquet_path + ".tmp"
+        pq.write_table(table, tmp_path, row_group_size=self.row_group_size)
+        os.replace(tmp_path, self.parquet_path)
+
+    def _read(self, user_id: str = None, start=None, end=None, columns=None) -> pd.DataFrame:
+        """
+        Read typed entries, pruning row groups by user and date and decoding only the requested columns.
+
+        Args:
+            user_id (str, optional): Only return this user's entries.
+            start (optional): First date to return.
+            end (optional): Last date to return.
+            columns (list, optional): Only return these columns.
+
+        Returns:
+            pd.DataFrame: Typed entries with the COLUMNS schema (or the requested columns).
+        """
+        filters = []
+        if user_id is not None:
+            filters.append(("user_id", "==", str(user_id)))
+        if start is not None:
+            filters.append(("date", ">=", pd.Timestamp(to_iso_date(start))))
+        if end is not None:
+            filters.append(("date", "<=", pd.Timestamp(to_iso_date(end))))
+        table = pq.read_table(
+            self.parquet_path,
+            columns=list(COLUMNS if columns is None else columns),
+            filters=filters or None,
+        )
+        return table.to_pandas()
+
+    def _upsert(self, rows: pd.DataFrame) -> pd.DataFrame:
+        """
+        Merge records into the stored entries and rewrite the file once.
+
+        Args:
+            rows (pd.DataFrame): Records with the COLUMNS schema.
+
+        Returns:
+            pd.DataFrame: The records that were written.
+        """
+        rows = rows.reindex(columns=COLUMNS)
+        self._write(merge_entries(to_typed_frame(self._read()), to_typed_frame(rows)))
+        return rows
+
+    def _replace(self, rows: pd.DataFrame):
+        """
+        Rewrite the file with the given entries only.
+
+        Args:
+            rows (pd.DataFrame): The new entries with the COLUMNS schema.
+        """
+        self._write(to_typed_frame(rows))
+
+    def iter_chunks(self, chunksize: int = 100000, columns=None, user_ids=None):
+        """
+        Stream record batches from the Parquet file, decoding only the requested columns.
+
+        Args:
+            chunksize (int): Maximum number of rows per chunk.
+            columns (list, optional): Only return these columns.
+            user_ids (list, optional): Only return these users' entries.
+
+        Yields:
+            pd.DataFrame: Chunks of typed entries.
+        """
+        columns = list(COLUMNS if columns is None else columns)
+        read_columns = columns if user_ids is None or "user_id" in columns else columns + ["user_id"]
+        with FileLock(self.lock_path, shared=True):
+            parquet_file = pq.ParquetFile(self.parquet_path)
+        for batch in parquet_file.iter_batches(batch_size=chunksize, columns=read_columns):
+            chunk = filter_users(batch.to_pandas(), user_ids)
+            if not chunk.empty:
+                yield chunk[columns]
+
+
+def convert_csv_to_parquet(data_csv="data/saved_data.csv", parquet_path=None, partition_by="date",
+                           row_group_size=65536) -> str:
+    """
+    Convert an existing data CSV (including its append log) to a Parquet file in one pass.
+
+    Args:
+        data_csv (str): Path to the CSV data file.
+        parquet_path (str, optional): Output path. Defaults to the CSV path with a ".parquet" extension.
+        partition_by (str): "date" or "user"; the sort order that defines the row groups.
+        row_group_size (int): Maximum number of rows per row group.
+
+    Returns:
+        str: The path of the written Parquet file.
+    """
+    if parquet_path is None:
+        parquet_path = os.path.splitext(data_csv)[0] + ".parquet"
+    if not os.path.exists(parquet_path):
+        ParquetStorage(parquet_path, partition_by=partition_by, row_group_size=row_group_size, seed_csv=data_csv)
+    else:
+        storage = ParquetStorage(parquet_path, partition_by=partition_by, row_group_size=row_group_size)
+        df = CsvStorage(data_csv, append_only=True, compact_threshold=None).read()
+        storage.log(f"Converting {len(df)} rows from '{data_csv}'.")
+        with FileLock(storage.lock_path):
+            storage._write(to_typed_frame(df))
+    return parquet_path
+
+
+def make_backend(kind="csv", data_csv="data/saved_data.csv", db_path=None, **options) -> StorageBackend:
+    """
+    Build a storage backend by name.
+
+    Args:
+        kind (str): "csv", "sqlite" or "parquet".
+        data_csv (str): Path to the CSV data file (also the seed file for new
+            SQLite or Parquet stores).
+        db_path (str, optional): Path to the SQLite database or Parquet file.
+            Defaults to the CSV path with a ".sqlite" or ".parquet" extension.
+        **options: Extra keyword arguments for the backend constructor.
+
+    Returns:
+        StorageBackend: The configured backend.
+    """
+    if kind == "csv":
+        return CsvStorage(data_csv, **options)
+    if kind == "sqlite":
+        if db_path is None:
+            db_path = os.path.splitext(data_csv)[0] + ".sqlite"
+        return SqliteStorage(db_path, seed_csv=data_csv, **options)
+    if kind == "parquet":
+        if db_path is None:
+            db_path = os.path.splitext(data_csv)[0] + ".parquet"
+        return ParquetStorage(db_path, seed_csv=data_csv, **options)
+    raise ValueError(f"Unknown storage backend: {kind!r}")
@@ -0,0 +1,186 @@
+# managers/trend_recommender.py
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from .analysis_engine import AnalysisEngine, _window_starts
+from .anomaly_detector import MIN_SCALE
+from .base_manager import BaseManager
+from .recommendations_engine import RecommendationsEngine
+from .schema import NUMERIC_COLS
+
+# +1 where higher values are better, -1 where lower values are better
+GOOD_DIRECTION = {
+    "sleep_hours": 1,
+    "mood": 1,
+    "stress": -1,
+    "activity_min": 1,
+}
+
+# Display name and emoji of each metric in trend tips
+TREND_LABELS = {
+    "sleep_hours": ("💤", "Sleep"),
+    "mood": ("🙂", "Mood"),
+    "stress": ("😰", "Stress"),
+    "activity_min": ("🏃", "Activity"),
+}
+
+
+class TrendRecommender(BaseManager):
+    """
+    Recommendations from how a user's metrics have been moving, not just their latest entry.
+
+    Two kinds of trends are reported, as of each user's latest entry:
+
+    - "streak": a metric got worse on each of the last `min_streak` or more
+      consecutive days, e.g. "Sleep has dropped for 5 days in a row".
+    - "baseline": the metric's `short` rolling mean is worse than its `long`
+      rolling mean by more than anomaly_detector.MIN_SCALE, e.g. "Stress is
+      above your 30-day average"; twice that margin is "high".
+
+    The rolling means come from `AnalysisEngine.rolling_means()` over all
+    users in one pass, so `trends()` serves notification jobs over the
+    whole user base. A user's trends only need the entries of the last
+    `long` window, so `user_trends()` reads just those instead of the full
+    history.
+    """
+
+    def __init__(self, analysis_engine: AnalysisEngine = None, recs_engine: RecommendationsEngine = None,
+                 short: str = "7D", long: str = "30D", min_streak: int = 3, min_periods: int = 7):
+        """
+        Initialize the TrendRecommender.
+
+        Args:
+            analysis_engine (AnalysisEngine, optional): Computes the rolling means.
+            recs_engine (RecommendationsEngine, optional): Renders the tips' HTML.
+            short (str): Recent window, a time span such as "7D".
+            long (str): Baseline window, a longer time span such as "30D".
+            min_streak (int): Fewest consecutive worsening days reported as a streak.
+            min_periods (int): Fewest entries in the baseline window before it is compared.
+        """
+        self.analysis_engine = analysis_engine or AnalysisEngine()
+        self.recs_engine = recs_engine or RecommendationsEngine()
+        self.short = short
+        self.long = long
+        self.min_streak = min_streak
+        self.min_periods = min_periods
+
+    def lookback(self) -> pd.Timedelta:
+        """
+        pd.Timedelta: How far before a user's latest entry `trends()` looks.
+        """
+        return pd.Timedelta(self.long)
+
+    def trends(self, df, cols=NUMERIC_COLS, since=None) -> pd.DataFrame:
+        """
+        Find the trends of every user in the entries, as of their latest entry.
+
+        Args:
+            df (pd.DataFrame or PreparedFrame): Entries of any number of users; entries
+                older than `lookback()` before a user's latest entry do not matter.
+            cols (list): The metrics to check.
+            since (optional): Skip users whose latest entry is before this date.
+
+        Returns:
+            pd.DataFrame: One row per trend, with user_id, date (of the latest entry),
+                metric, kind ("streak" or "baseline"), level, value (latest value or
+                `short` mean), baseline (`long` mean), days (streak length), message
+                and html (the rendered tip).
+        """
+        columns = ["user_id", "date", "metric", "kind", "level", "value", "baseline", "days", "message", "html"]
+        cols = list(cols)
+        prepared = self.analysis_engine.prepare(df)
+        if prepared.empty or not cols:
+            return pd.DataFrame(columns=columns)
+        means = self.analysis_engine.rolling_means(prepared, cols, windows=(self.short, self.long), per_user=True)
+
+        # rolling_means() orders rows by user, then date; put the raw values in the same order
+        data = prepared.data
+        codes, users = pd.factorize(data["user_id"], sort=True)
+        order = np.argsort(codes.astype(np.min_scalar_type(max(len(users) - 1, 0))), kind="stable")
+        codes = codes[order]
+        dates = data["date"].to_numpy(dtype="datetime64[D]")[order]
+        n = len(codes)
+        last = np.flatnonzero(np.r_[codes[1:] != codes[:-1], True])
+        if since is not None:
+            last = last[dates[last] >= np.datetime64(pd.Timestamp(since).date(), "D")]
+
+        # Entries in each user's baseline window, to skip users with too little history
+        seconds = (dates - dates.min()).astype("timedelta64[s]").astype(np.int64)
+        in_window = np.arange(n) - _window_starts(codes, seconds, self.long) + 1
+        follows = np.r_[False, (codes[1:] == codes[:-1]) & (np.diff(dates) == np.timedelta64(1, "D"))]
+
+        parts = []
+        for c in cols:
+            sign = GOOD_DIRECTION.get(c, 1)
+            values = prepared.numeric[c].to_numpy(dtype=float)[order]
+            # Consecutive days on which the metric got worse, ending at each row
+            with np.errstate(invalid="ignore"):
+                worse = follows & (sign * np.diff(values, prepend=np.nan) < 0)
+            run = np.arange(n) - np.maximum.accumulate(np.where(worse, -1, np.arange(n)))
+            streak = last[run[last] >= self.min_streak]
+            parts.append(pd.DataFrame({
+                "row": streak, "metric": c, "kind": "streak", "level": "moderate",
+                "value": values[streak], "baseline": np.nan, "days": run[streak],
+            }))
+
+            recent = means[f"{c}_{self.short}"].to_numpy()[last]
+            baseline = means[f"{c}_{self.long}"].to_numpy()[last]
+            with np.errstate(invalid="ignore"):
+                drift = sign * (baseline - recent)
+            margin = MIN_SCALE.get(c, 0.0)
+            drifted = (drift > margin) & (in_window[last] >= self.min_periods)
+            parts.append(pd.DataFrame({
+                "row": last[drifted], "metric": c, "kind": "baseline",
+                "level": np.where(drift[drifted] > 2 * margin, "high", "moderate"),
+                "value": recent[drifted], "baseline": baseline[drifted], "days": np.nan,
+            }))
+
+        found = pd.concat(parts, ignore_index=True).sort_values(["row", "kind"], kind="stable")
+        rows = found.pop("row").to_numpy()
+        found.insert(0, "user_id", np.asarray(users, dtype=object)[codes[rows]])
+        found.insert(1, "date", pd.DatetimeIndex(dates[rows].astype("datetime64[ns]")))
+        found["days"] = found["days"].astype("Int64")
+        found["message"] = self._messages(found)
+        found["html"] = [self.recs_engine._span(m, level) for m, level in zip(found["message"], found["level"])]
+        return found[columns].reset_index(drop=True)
+
+    def _messages(self, found: pd.DataFrame) -> list:
+        """
+        Word the trends found by `trends()`.
+        """
+        long_days, short_days = pd.Timedelta(self.long).days, pd.Timedelta(self.short).days
+        messages = []
+        for metric, kind, value, baseline, days in zip(found["metric"], found["kind"], found["value"],
+                                                       found["baseline"], found["days"]):
+            emoji, name = TREND_LABELS.get(metric, ("📈", metric))
+            better_high = GOOD_DIRECTION.get(metric, 1) > 0
+            if kind == "streak":
+                messages.append(f"{emoji} **{name}:** Has {'dropped' if better_high else 'risen'} "
+                                f"for {days} days in a row.")
+            else:
+                messages.append(f"{emoji} **{name}:** {'Below' if better_high else 'Above'} your "
+                                f"{long_days}-day average — {value:.1f} over the last {short_days} days "
+                                f"vs {baseline:.1f}.")
+        return messages
+
+    def user_trends(self, data_manager, user_id: str, today=None, cols=NUMERIC_COLS) -> pd.DataFrame:
+        """
+        Find one user's current trends, reading only the entries they depend on.
+
+        Trends are reported while the user's latest entry is at most `long`
+        old, so entries from twice `long` before today cover every window.
+
+        Args:
+            data_manager (DataManager): Source of the user's entries.
+            user_id (str): The user whose trends to find.
+            today (optional): The current date; defaults to today.
+            cols (list): The metrics to check.
+
+        Returns:
+            pd.DataFrame: Like `trends()`, for this user.
+        """
+        today = pd.Timestamp(today or date.today()).normalize()
+        since = today - self.lookback()
+        entries = data_manager.query(user_id=user_id, start=since - self.lookback(), end=today)
+        return self.trends(entries, cols=cols, since=since)
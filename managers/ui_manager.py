@@ -4,7 +4,9 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 from datetime import date
+from .analysis_engine import PreparedFrame
 from .base_manager import BaseManager
+from .schema import NUMERIC_COLS, is_typed_frame
 
 class UIManager(BaseManager):
     """
@@ -40,8 +42,7 @@ class UIManager(BaseManager):
         st.write("")  # spacer
 
         # Load user entries
-        df_all = self.app.data_manager.load_entries()
-        user_df = df_all[df_all["user_id"] == username].copy() if not df_all.empty else pd.DataFrame()
+        user_df = self.app.data_manager.load_user_entries(username)
 
         # Display welcome message
         if user_df.empty:
@@ -50,23 +51,22 @@ class UIManager(BaseManager):
             st.success(f"Welcome back, {username}! 🌟 Keep logging daily — small steps add up. 💪")
 
         # Render the daily entry form
-        self._render_entry_form(username, df_all, user_df)
+        self._render_entry_form(username, user_df)
 
         # Render the dashboard components
-        self._render_dashboard_components(user_df)
+        self._render_dashboard_components(username, user_df)
 
-    def _render_entry_form(self, username: str, df_all: pd.DataFrame, user_df: pd.DataFrame):
+    def _render_entry_form(self, username: str, user_df: pd.DataFrame):
         """
         Render the daily wellness entry form.
 
         Args:
             username (str): The username of the authenticated user.
-            df_all (pd.DataFrame): DataFrame containing all user entries.
             user_df (pd.DataFrame): DataFrame containing entries for the authenticated user.
         """
         st.header("Daily Wellness Entry")
         today_str = date.today().isoformat()
-        logged_today = (not user_df.empty) and (user_df["date"].astype(str) == today_str).any()
+        logged_today = (not user_df.empty) and (user_df["date"] == pd.Timestamp(today_str)).any()
 
         with st.form("entry_form"):
             st.text_input("Date (auto)", value=today_str, disabled=True, key="entry_date_display")
@@ -88,9 +88,7 @@ class UIManager(BaseManager):
                 "notes": notes or ""
             }
 
-            mask = (df_all["user_id"] == username) & (df_all["date"].astype(str) == today_str) if not df_all.empty else pd.Series([False])
-
-            if mask.any():
+            if logged_today:
                 st.warning("You already logged data today. Overwriting the entry...")
                 try:
                     self.app.data_manager.save_entry(entry)
@@ -106,94 +104,161 @@ class UIManager(BaseManager):
                 except Exception as e:
                     st.error(f"Failed to save entry: {e}")
 
-    def _render_dashboard_components(self, user_df: pd.DataFrame):
+    def _render_dashboard_components(self, username: str, user_df: pd.DataFrame):
         """
         Render the dashboard components, including statistics, recommendations, and visualizations.
 
         Args:
+            username (str): The username of the authenticated user.
             user_df (pd.DataFrame): DataFrame containing entries for the authenticated user.
         """
         st.header("Your Dashboard")
         if not user_df.empty:
             display_df = user_df.sort_values("date", ascending=False).reset_index(drop=True)
             st.subheader("Entries (latest first)")
-            st.dataframe(display_df)
+            st.dataframe(display_df.assign(date=display_df["date"].dt.date))
 
             # Render key statistics
-            self._render_statistics(user_df)
+            self._render_statistics(username, user_df)
 
             # Render recommendations
-            self._render_recommendations(display_df)
+            self._render_recommendations(username, display_df)
+            self._render_trend_recommendations(username)
+
+            # Preprocess once for all the charts below
+            prepared = self.app.analysis_engine.prepare(user_df)
+
+            # Render alerts
+            self._render_alerts(prepared)
 
             # Render correlations
-            self._render_correlations(user_df)
+            self._render_correlations(prepared)
 
             # Render trends
-            self._render_trends(user_df)
+            self._render_trends(prepared)
 
             # Render weekly averages
-            self._render_weekly_averages(user_df)
+            self._render_weekly_averages(username, prepared)
         else:
             st.subheader("Entries (latest first)")
             st.info("No data to display yet. Use the entry form above to add your first entry.")
 
-    def _render_statistics(self, user_df: pd.DataFrame):
+    def _render_statistics(self, username: str, user_df: pd.DataFrame):
         """
         Render key statistics for the user's entries, such as average, minimum, and maximum values.
 
+        When the data manager's aggregates are current they are read from there,
+        so the cost does not depend on the length of the user's history.
+        Otherwise they are computed from the user's entries.
+
         Args:
+            username (str): The username of the authenticated user.
             user_df (pd.DataFrame): DataFrame containing entries for the authenticated user.
         """
         st.subheader("Key statistics")
         try:
+            if self.app.data_manager.aggregates_current():
+                summary = self.app.analysis_engine.summary_from_aggregates(
+                    self.app.data_manager.aggregate_stats(username))
+                average, minimum, maximum = summary["mean"], summary["min"], summary["max"]
+            else:
+                numeric = user_df[NUMERIC_COLS]
+                if not is_typed_frame(user_df):
+                    numeric = numeric.apply(pd.to_numeric, errors="coerce")
+                numeric = numeric.astype(float)
+                average, minimum, maximum = numeric.mean(), numeric.min(), numeric.max()
             stats = pd.DataFrame({
-                "Average": [
-                    pd.to_numeric(user_df["sleep_hours"], errors="coerce").mean(),
-                    pd.to_numeric(user_df["mood"], errors="coerce").mean(),
-                    pd.to_numeric(user_df["stress"], errors="coerce").mean(),
-                    pd.to_numeric(user_df["activity_min"], errors="coerce").mean()
-                ],
-                "Minimum": [
-                    pd.to_numeric(user_df["sleep_hours"], errors="coerce").min(),
-                    pd.to_numeric(user_df["mood"], errors="coerce").min(),
-                    pd.to_numeric(user_df["stress"], errors="coerce").min(),
-                    pd.to_numeric(user_df["activity_min"], errors="coerce").min()
-                ],
-                "Maximum": [
-                    pd.to_numeric(user_df["sleep_hours"], errors="coerce").max(),
-                    pd.to_numeric(user_df["mood"], errors="coerce").max(),
-                    pd.to_numeric(user_df["stress"], errors="coerce").max(),
-                    pd.to_numeric(user_df["activity_min"], errors="coerce").max()
-                ]
+                "Average": average.values,
+                "Minimum": minimum.values,
+                "Maximum": maximum.values
             }, index=["Sleep (hrs)", "Mood (1-10)", "Stress (1-10)", "Physical Activity (min)"])
             st.table(stats.round(2))
         except Exception:
             st.info("Not enough numeric data to compute stats.")
 
-    def _render_recommendations(self, display_df: pd.DataFrame):
+    def _render_alerts(self, prepared: PreparedFrame, days: int = 30):
+        """
+        Render recent stress spikes and broken logging streaks.
+
+        Args:
+            prepared (PreparedFrame): Preprocessed entries for the authenticated user.
+            days (int): How far back to report.
+        """
+        detector = getattr(self.app, "anomaly_detector", None)
+        if detector is None:
+            return
+        since = pd.Timestamp(date.today()) - pd.Timedelta(days=days)
+        spikes = detector.stress_spikes(prepared)
+        spikes = spikes[spikes["date"] >= since]
+        breaks = detector.streak_breaks(prepared, today=date.today())
+        breaks = breaks[breaks["end"] >= since]
+        if spikes.empty and breaks.empty:
+            return
+        st.subheader("Alerts")
+        for row in spikes.itertuples():
+            st.markdown(f"- Stress spike on {row.date:%b %d}: {row.value:.0f}, "
+                        f"usually around {row.baseline:.1f}.")
+        for row in breaks.itertuples():
+            st.markdown(f"- Your {row.days}-day logging streak ended on {row.end:%b %d}.")
+
+    def _render_recommendations(self, username: str, display_df: pd.DataFrame):
         """
         Render personalized recommendations based on the latest entry.
 
+        When the app has a recommendation store they are read from there; the
+        rules are only evaluated if the latest entry has no stored
+        recommendations under the current rules, and that one row is stored.
+        Catching up the whole store is left to the save listener and
+        backfill_recommendations.py, never to a render.
+
         Args:
+            username (str): The username of the authenticated user.
             display_df (pd.DataFrame): DataFrame containing the sorted user entries for display.
         """
         st.subheader("Latest entry recommendations")
-        latest = display_df.iloc[0].to_dict()
-        recs = self.app.recs_engine.generate(latest)
+        store = getattr(self.app, "recs_store", None)
+        recs = None
+        if store is not None:
+            latest = store.latest(username)
+            if latest is not None and latest["date"] == display_df["date"].iloc[0]:
+                recs = latest["tips"]
+        if recs is None:
+            recs = self.app.recs_engine.generate(display_df.iloc[0].to_dict())
+            if store is not None:
+                store.put(display_df.head(1))
         for r in recs:
             st.markdown(f"- {r}", unsafe_allow_html=True)
 
-    def _render_correlations(self, user_df: pd.DataFrame):
+    def _render_trend_recommendations(self, username: str):
+        """
+        Render recommendations from the user's recent trends, e.g. several days of falling sleep.
+
+        Only the entries of the trend windows are read, not the whole history.
+
+        Args:
+            username (str): The username of the authenticated user.
+        """
+        recommender = getattr(self.app, "trend_recommender", None)
+        if recommender is None:
+            return
+        trends = recommender.user_trends(self.app.data_manager, username)
+        if trends.empty:
+            return
+        st.subheader("Recent trends")
+        for html in trends["html"]:
+            st.markdown(f"- {html}", unsafe_allow_html=True)
+
+    def _render_correlations(self, prepared: PreparedFrame):
         """
         Render correlation heatmaps for the user's entries to identify potential relationships
         between different wellness metrics.
 
         Args:
-            user_df (pd.DataFrame): DataFrame containing entries for the authenticated user.
+            prepared (PreparedFrame): Preprocessed entries for the authenticated user.
         """
         st.subheader("Correlations")
         try:
-            corr = self.app.analysis_engine.correlations(user_df)
+            corr = self.app.analysis_engine.correlations(prepared)
             if corr.empty:
                 st.info("Not enough data to compute correlations.")
             else:
@@ -204,24 +269,22 @@ class UIManager(BaseManager):
         except Exception as e:
             st.error(f"Could not compute correlations: {e}")
 
-    def _render_trends(self, user_df: pd.DataFrame):
+    def _render_trends(self, prepared: PreparedFrame):
         """
         Render rolling 7-day trends for the user's wellness metrics to visualize changes
         over time.
 
         Args:
-            user_df (pd.DataFrame): DataFrame containing entries for the authenticated user.
+            prepared (PreparedFrame): Preprocessed entries for the authenticated user.
         """
         st.subheader("Trends (rolling 7-day mean)")
-        if len(user_df) >= 7:
+        if len(prepared) >= 7:
             try:
-                rm_sleep = self.app.analysis_engine.rolling_mean(user_df, "sleep_hours", window=7)
-                rm_mood  = self.app.analysis_engine.rolling_mean(user_df, "mood", window=7)
-                rm_stress = self.app.analysis_engine.rolling_mean(user_df, "stress", window=7)
-                rm_activity = self.app.analysis_engine.rolling_mean(user_df, "activity_min", window=7)
+                # All four metrics in one pass; a 7-day time window so missed days don't stretch it
+                rolling = self.app.analysis_engine.rolling_means(prepared, NUMERIC_COLS, windows=("7D",))
 
                 fig2, axes = plt.subplots(4, 1, figsize=(9, 12), sharex=True)
-                series_list = [rm_sleep, rm_mood, rm_stress, rm_activity]
+                series_list = [rolling[f"{c}_7D"] for c in NUMERIC_COLS]
                 colors = ["blue", "orange", "red", "green"]
                 titles = ["Sleep (hrs)", "Mood (1-10)", "Stress (1-10)", "Activity (min)"]
 
@@ -239,17 +302,18 @@ class UIManager(BaseManager):
         else:
             st.info("At least 7 entries required to show rolling trends.")
 
-    def _render_weekly_averages(self, user_df: pd.DataFrame):
+    def _render_weekly_averages(self, username: str, prepared: PreparedFrame):
         """
         Render weekly averages for the user's wellness metrics to provide insights into
         long-term trends and patterns.
 
         Args:
-            user_df (pd.DataFrame): DataFrame containing entries for the authenticated user.
+            username (str): The username of the authenticated user.
+            prepared (PreparedFrame): Preprocessed entries for the authenticated user.
         """
         st.subheader("Weekly averages")
         try:
-            weekly = self.app.analysis_engine.weekly_summary(user_df)
+            weekly = self.app.analysis_engine.weekly_summary(prepared, user_id=username)
             if weekly is not None and weekly.shape[0] > 0:
                 weekly = weekly.set_index("date")
                 fig3, ax1 = plt.subplots(figsize=(10, 5))
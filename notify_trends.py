@@ -0,0 +1,27 @@
+# notify_trends.py
+import argparse
+from datetime import date
+
+import pandas as pd
+
+from managers.data_manager import DataManager
+from managers.file_io import atomic_write_csv
+from managers.trend_recommender import TrendRecommender
+
+parser = argparse.ArgumentParser(description="Notification job: find every active user's trends, e.g. falling sleep.")
+parser.add_argument("--data-csv", default="data/saved_data.csv", help="Data CSV of the store")
+parser.add_argument("--backend", choices=["csv", "sqlite", "parquet"], default="csv", help="Storage backend")
+parser.add_argument("--output", default="data/trend_notifications.csv", help="CSV file for the trends found")
+parser.add_argument("--active-days", type=int, default=1,
+                    help="Only users with an entry in this many days before today")
+args = parser.parse_args()
+
+data_manager = DataManager(data_csv=args.data_csv, backend=args.backend)
+recommender = TrendRecommender()
+
+# The trends of users active since `since` only depend on the entries of one window before it
+since = pd.Timestamp(date.today()) - pd.Timedelta(days=args.active_days)
+entries = data_manager.query(start=since - recommender.lookback())
+trends = recommender.trends(entries, since=since)
+atomic_write_csv(trends.drop(columns="html"), args.output)
+print(f"Done: {len(trends)} trends for {trends['user_id'].nunique()} users written to '{args.output}'.")
@@ -0,0 +1,16 @@
+# rebuild_aggregates.py
+import argparse
+
+from managers.data_manager import DataManager
+
+parser = argparse.ArgumentParser(
+    description="Rebuild the per-user aggregates after writes that bypassed the app, e.g. imports or restores.")
+parser.add_argument("--data-csv", default="data/saved_data.csv", help="Data CSV of the store")
+parser.add_argument("--backend", choices=["csv", "sqlite", "parquet"], default="csv", help="Storage backend")
+args = parser.parse_args()
+
+data_manager = DataManager(data_csv=args.data_csv, backend=args.backend, aggregates=True)
+if data_manager.rebuild_aggregates():
+    print(f"Done: aggregates rebuilt in '{data_manager.aggregates.db_path}'.")
+else:
+    print(f"Aggregates in '{data_manager.aggregates.db_path}' are already up to date.")
@@ -0,0 +1,263 @@
+# run_benchmarks.py
+"""
+Benchmark the data and analysis paths on a large synthetic data set.
+
+Suites:
+    query     range queries against the full-scan-and-filter path
+    analysis  per-method analysis timings on raw frames and on a PreparedFrame
+    cohort    per-user cohort analytics over all users (try --users 100000 --days 365)
+    parallel  cohort analytics sharded over 1, 2, 4, ... up to --workers processes
+    forecast  nightly forecast fit, catch-up with a new day and forecast of all users
+    recommendations  per-entry generate() against generate_batch() over all entries
+
+Usage:
+    python run_benchmarks.py [--suite all|query|analysis|cohort|parallel|forecast|recommendations] [--backend csv|sqlite|parquet]
+                             [--users 1000] [--days 1100] [--repeat 3] [--workers N]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from managers.analysis_engine import AnalysisEngine
+from managers.data_manager import DataManager
+from managers.file_io import atomic_write_csv
+from managers.forecast_engine import ForecastEngine
+from managers.recommendations_engine import RecommendationsEngine
+from managers.schema import COLUMNS, DTYPES, NUMERIC_COLS
+
+
+def make_entries(users: int, days: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Build `users` x `days` random entries, sorted by user and date.
+
+    Returns:
+        pd.DataFrame: Entries with the COLUMNS schema.
+    """
+    rng = np.random.default_rng(seed)
+    n = users * days
+    dates = pd.date_range(end=pd.Timestamp.today().normalize(), periods=days)
+    df = pd.DataFrame({
+        "date": np.tile(dates.strftime("%Y-%m-%d"), users),
+        "user_id": np.repeat([f"user{i}" for i in range(users)], days),
+        "sleep_hours": rng.normal(7, 1, n).clip(3, 10).round(1),
+        "mood": rng.integers(1, 11, n),
+        "stress": rng.integers(1, 11, n),
+        "activity_min": rng.integers(0, 121, n),
+        "notes": np.where(rng.random(n) < 0.1, "Felt stressed, \"busy\" day", ""),
+    })
+    return df[COLUMNS]
+
+
+def make_typed_entries(users: int, days: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Build `users` x `days` random entries directly as a typed frame (see schema.DTYPES),
+    skipping the CSV round trip so very large cohorts fit in memory.
+
+    Returns:
+        pd.DataFrame: Typed entries without notes.
+    """
+    rng = np.random.default_rng(seed)
+    n = users * days
+    user_ids = pd.Categorical.from_codes(np.repeat(np.arange(users, dtype=np.int32), days),
+                                         [f"user{i}" for i in range(users)])
+    return pd.DataFrame({
+        "date": np.tile(pd.date_range(end=pd.Timestamp.today().normalize(), periods=days).to_numpy(), users),
+        "user_id": user_ids,
+        "sleep_hours": rng.normal(7, 1, n).clip(3, 10).round(1).astype(np.float32),
+        "mood": rng.integers(1, 11, n, dtype=np.int8),
+        "stress": rng.integers(1, 11, n, dtype=np.int8),
+        "activity_min": rng.integers(0, 121, n, dtype=np.int16),
+    }).astype({c: DTYPES[c] for c in NUMERIC_COLS})
+
+
+def best_of(repeat: int, func) -> tuple:
+    """
+    Run `func` `repeat` times.
+
+    Returns:
+        tuple: (fastest run in seconds, the last result).
+    """
+    times, result = [], None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - t0)
+    return min(times), result
+
+
+def bench_queries(data_manager: DataManager, repeat: int):
+    """
+    Compare DataManager.query() with loading everything and filtering afterwards.
+    """
+    data_manager.use_cache = False
+    today = pd.Timestamp.today().normalize()
+    cases = {
+        "all users, last 30 days": dict(start=today - pd.Timedelta(days=29), end=today),
+        "one user, this month": dict(user_id="user7", start=today.replace(day=1), end=today),
+        "one user, last year": dict(user_id="user7", start=today - pd.Timedelta(days=364), end=today),
+    }
+
+    t0 = time.perf_counter()
+    data_manager.query(**cases["one user, this month"])
+    print(f"First query (builds any index): {time.perf_counter() - t0:.2f}s\n")
+
+    print(f"{'case':<26}{'rows':>10}{'full scan':>12}{'query':>10}{'speedup':>10}")
+    for name, kwargs in cases.items():
+        scan_time, scanned = best_of(repeat, lambda: data_manager.load_entries(**kwargs))
+        query_time, queried = best_of(repeat, lambda: data_manager.query(**kwargs))
+        assert len(scanned) == len(queried), f"{name}: {len(scanned)} != {len(queried)} rows"
+        print(f"{name:<26}{len(queried):>10,}{scan_time:>11.3f}s{query_time:>9.3f}s{scan_time / query_time:>9.1f}x")
+    print()
+
+
+def bench_analysis(data_manager: DataManager, repeat: int):
+    """
+    Time each AnalysisEngine method on a raw frame (preprocessed on every call)
+    and on a frame prepared once.
+    """
+    engine = AnalysisEngine()
+    methods = {
+        "summary_stats": lambda df: engine.summary_stats(df),
+        "summary_stats approx": lambda df: engine.summary_stats(df, quantiles="approx"),
+        "correlations": lambda df: engine.correlations(df),
+        "rolling_mean x4": lambda df: [engine.rolling_mean(df, c, window=7) for c in NUMERIC_COLS],
+        "rolling_means 7, 30, 7D": lambda df: engine.rolling_means(df, NUMERIC_COLS, windows=(7, 30, "7D")),
+        "weekly_summary": lambda df: engine.weekly_summary(df),
+    }
+    data_manager.use_cache = True
+    frames = {
+        "one user": data_manager.load_user_entries("user7"),
+        "all users": data_manager.load_entries(),
+    }
+    for label, df in frames.items():
+        prepare_time, prepared = best_of(repeat, lambda: engine.prepare(df))
+        print(f"{label} ({len(df):,} rows), prepare(): {prepare_time * 1000:.1f}ms")
+        print(f"{'method':<26}{'raw frame':>12}{'prepared':>12}")
+        raw_total, prepared_total = 0.0, prepare_time
+        for name, method in methods.items():
+            raw_time, _ = best_of(repeat, lambda: method(df))
+            prepared_time, _ = best_of(repeat, lambda: method(prepared))
+            raw_total += raw_time
+            prepared_total += prepared_time
+            print(f"{name:<26}{raw_time * 1000:>10.1f}ms{prepared_time * 1000:>10.1f}ms")
+        print(f"{'all, incl. prepare()':<26}{raw_total * 1000:>10.1f}ms{prepared_total * 1000:>10.1f}ms\n")
+
+
+def bench_cohort(users: int, days: int, repeat: int):
+    """
+    Time the cohort methods, which analyse every user in one pass.
+    """
+    t0 = time.perf_counter()
+    df = make_typed_entries(users, days)
+    print(f"Cohort of {users:,} users x {days} days ({len(df):,} rows) built in {time.perf_counter() - t0:.2f}s")
+    engine = AnalysisEngine()
+    print(f"{'method':<26}{'result rows':>14}{'time':>10}")
+    for name in ["cohort_summary", "cohort_weekly", "cohort_correlations"]:
+        elapsed, result = best_of(repeat, lambda: getattr(engine, name)(df))
+        print(f"{name:<26}{len(result):>14,}{elapsed:>9.2f}s")
+    print()
+
+
+def bench_parallel(users: int, days: int, repeat: int, max_workers: int):
+    """
+    Show how the cohort methods scale with the number of worker processes.
+    """
+    df = make_typed_entries(users, days)
+    counts = sorted({min(2 ** i, max_workers) for i in range(max_workers.bit_length() + 1)})
+    print(f"Parallel cohort analytics, {len(df):,} rows, {os.cpu_count()} CPUs")
+    print(f"{'method':<22}" + "".join(f"{f'{n} workers':>12}" for n in counts))
+    for name in ["cohort_summary", "cohort_weekly", "cohort_correlations"]:
+        times = [best_of(repeat, lambda: getattr(AnalysisEngine(n_workers=n), name)(df))[0] for n in counts]
+        print(f"{name:<22}" + "".join(f"{t:>11.2f}s" for t in times))
+        print(f"{'  speedup':<22}" + "".join(f"{times[0] / t:>11.1f}x" for t in times))
+    print()
+
+
+def bench_forecast(users: int, days: int, repeat: int):
+    """
+    Time the nightly forecast job: a full fit, catching up with one new day, and the forecast.
+    """
+    df = make_typed_entries(users, days)
+    last_day = df["date"].max()
+    history, new_day = df[df["date"] < last_day], df[df["date"] == last_day]
+    del df
+    print(f"Forecasts for {users:,} users x {days} days ({len(history) + len(new_day):,} rows)")
+    engine = ForecastEngine()
+    print(f"{'step':<26}{'result rows':>14}{'time':>10}")
+    elapsed, state = best_of(repeat, lambda: engine.fit(history))
+    print(f"{'fit':<26}{len(state.users):>14,}{elapsed:>9.2f}s")
+    window = pd.concat([history[history["date"] >= state.resume_from], new_day], ignore_index=True)
+    t0 = time.perf_counter()
+    engine.catch_up(window)
+    print(f"{'catch_up (one day)':<26}{len(window):>14,}{time.perf_counter() - t0:>9.2f}s")
+    elapsed, result = best_of(repeat, lambda: engine.forecast())
+    print(f"{'forecast':<26}{len(result):>14,}{elapsed:>9.2f}s")
+    print()
+
+
+def bench_recommendations(users: int, days: int, repeat: int):
+    """
+    Compare per-entry recommendations with the batch path over every entry.
+    """
+    df = make_typed_entries(users, days)
+    engine = RecommendationsEngine()
+    sample = df.head(100_000).to_dict("records")
+    print(f"Recommendations for {len(df):,} entries")
+    print(f"{'method':<34}{'time':>10}")
+    elapsed, _ = best_of(repeat, lambda: [engine.generate(entry) for entry in sample])
+    print(f"{'generate() per entry':<34}{elapsed * len(df) / len(sample):>9.2f}s (extrapolated)")
+    elapsed, _ = best_of(repeat, lambda: engine.generate_batch(df, render=False))
+    print(f"{'generate_batch(), level codes':<34}{elapsed:>9.2f}s")
+    elapsed, _ = best_of(repeat, lambda: engine.generate_batch(df))
+    print(f"{'generate_batch(), rendered tips':<34}{elapsed:>9.2f}s")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--suite", choices=["all", "query", "analysis", "cohort", "parallel", "forecast",
+                                            "recommendations"], default="all")
+    parser.add_argument("--backend", choices=["csv", "sqlite", "parquet"], default="csv")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=1100)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="largest worker count for the parallel suite")
+    args = parser.parse_args()
+
+    if args.suite == "cohort":
+        bench_cohort(args.users, args.days, args.repeat)
+        return
+    if args.suite == "parallel":
+        bench_parallel(args.users, args.days, args.repeat, args.workers)
+        return
+    if args.suite == "forecast":
+        bench_forecast(args.users, args.days, args.repeat)
+        return
+    if args.suite == "recommendations":
+        bench_recommendations(args.users, args.days, args.repeat)
+        return
+
+    data_csv = os.path.join(tempfile.mkdtemp(prefix="wellness-bench-"), "saved_data.csv")
+    t0 = time.perf_counter()
+    atomic_write_csv(make_entries(args.users, args.days), data_csv)
+    print(f"Wrote {args.users * args.days:,} rows to '{data_csv}' in {time.perf_counter() - t0:.2f}s\n")
+
+    data_manager = DataManager(data_csv=data_csv, backend=args.backend)
+    if args.suite in ("all", "query"):
+        bench_queries(data_manager, args.repeat)
+    if args.suite in ("all", "analysis"):
+        bench_analysis(data_manager, args.repeat)
+    if args.suite == "all":
+        bench_cohort(args.users, args.days, args.repeat)
+        bench_parallel(args.users, args.days, args.repeat, args.workers)
+        bench_forecast(args.users, args.days, args.repeat)
+        bench_recommendations(args.users, args.days, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+# run_forecasts.py
+import argparse
+import os
+
+import pandas as pd
+
+from managers.data_manager import DataManager
+from managers.file_io import atomic_write_csv
+from managers.forecast_engine import ForecastEngine, ForecastState
+
+parser = argparse.ArgumentParser(description="Nightly job: forecast every user's metrics for the coming days.")
+parser.add_argument("--data-csv", default="data/saved_data.csv", help="Data CSV of the store")
+parser.add_argument("--backend", choices=["csv", "sqlite", "parquet"], default="csv", help="Storage backend")
+parser.add_argument("--state", default="data/forecast_state.npz", help="Fitted state, reused on the next run")
+parser.add_argument("--output", default="data/forecasts.csv", help="CSV file for the forecasts")
+parser.add_argument("--horizon", type=int, default=7, help="Number of days to forecast")
+parser.add_argument("--refit", action="store_true",
+                    help="Refit all users instead of updating the saved state; needed after "
+                         "edits older than the state's window (its oldest user's latest entry)")
+args = parser.parse_args()
+
+data_manager = DataManager(data_csv=args.data_csv, backend=args.backend)
+engine = ForecastEngine(horizon=args.horizon)
+
+if os.path.exists(args.state) and not args.refit:
+    engine.state = ForecastState.load(args.state)
+
+if engine.state is not None and pd.notna(engine.state.resume_from):
+    # Re-read from the oldest user's latest entry: users who fell behind catch up, and
+    # entries edited or back-dated since the last run show up as changed digests
+    engine.catch_up(data_manager.query(start=engine.state.resume_from))
+    stale = sorted(engine.state.stale)
+    if stale:
+        history = data_manager.load_entries() if len(stale) > 100 else pd.concat(
+            [data_manager.load_user_entries(u) for u in stale], ignore_index=True)
+        engine.refit(history)
+        print(f"Refitted {len(stale)} users with changed history.")
+else:
+    engine.fit(data_manager.load_entries())
+
+engine.state.save(args.state)
+forecasts = engine.forecast()
+atomic_write_csv(forecasts, args.output)
+print(f"Done: {len(forecasts)} forecasts for {len(engine.state.users)} users written to '{args.output}'.")
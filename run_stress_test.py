@@ -0,0 +1,86 @@
+# run_stress_test.py
+"""
+Hammer the data store from many processes and threads at once and check
+that no saved row is lost.
+
+Usage:
+    python run_stress_test.py [--backend csv|sqlite|parquet] [--processes 4] [--threads 8] [--writes 50]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+
+from managers.data_manager import DataManager
+
+
+def _worker(data_csv: str, backend: str, process_no: int, threads: int, writes: int) -> int:
+    """
+    Save `writes` distinct entries from each of `threads` threads, while also reading.
+
+    Returns:
+        int: The number of entries this process wrote.
+    """
+    data_manager = DataManager(data_csv=data_csv, backend=backend, compact_threshold=16 * 1024)
+    errors = []
+
+    def run(thread_no):
+        try:
+            for i in range(writes):
+                entry = {
+                    "date": (date(2020, 1, 1) + timedelta(days=i)).isoformat(),
+                    "user_id": f"p{process_no}-t{thread_no}",
+                    "sleep_hours": 7.0,
+                    "mood": 6,
+                    "stress": 3,
+                    "activity_min": i,
+                    "notes": "stress, \"test\"",
+                }
+                data_manager.save_entries([entry])
+                if i % 10 == 0:
+                    data_manager.load_user_entries(entry["user_id"])
+        except Exception as e:  # reported by the parent
+            errors.append(repr(e))
+
+    pool = [threading.Thread(target=run, args=(t,)) for t in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    if errors:
+        raise RuntimeError(errors[0])
+    return threads * writes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["csv", "sqlite", "parquet"], default="csv")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--writes", type=int, default=50)
+    args = parser.parse_args()
+
+    data_csv = os.path.join(tempfile.mkdtemp(prefix="wellness-stress-"), "saved_data.csv")
+    DataManager(data_csv=data_csv, backend=args.backend)
+
+    with ProcessPoolExecutor(max_workers=args.processes) as pool:
+        futures = [pool.submit(_worker, data_csv, args.backend, p, args.threads, args.writes)
+                   for p in range(args.processes)]
+        expected = sum(f.result() for f in futures)
+
+    data_manager = DataManager(data_csv=data_csv, backend=args.backend)
+    data_manager.use_cache = False
+    df = data_manager.load_entries()
+    per_user = df.groupby("user_id", observed=True).size()
+    print(f"Backend: {args.backend}, expected rows: {expected}, stored rows: {len(df)}")
+    if len(df) != expected or (per_user != args.writes).any():
+        print("FAILED: rows were lost or duplicated.")
+        sys.exit(1)
+    print(f"OK: no rows lost ({data_csv}).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# tests/test_aggregate_store.py
+import pandas as pd
+
+from managers.analysis_engine import AnalysisEngine
+from managers.data_manager import DataManager
+
+
+def entry(user_id, day, sleep=7.5, mood=8, stress=2, activity=40):
+    return {"date": day, "user_id": user_id, "sleep_hours": sleep, "mood": mood, "stress": stress,
+            "activity_min": activity, "notes": ""}
+
+
+def test_new_store_is_current_and_follows_saves(tmp_path):
+    data_manager = DataManager(data_csv=str(tmp_path / "saved_data.csv"), aggregates=True)
+    assert data_manager.aggregates_current()
+    data_manager.save_entries([entry("a", "2024-05-01", sleep=6.0), entry("a", "2024-05-02", sleep=8.0)])
+    assert data_manager.aggregates_current()
+    stats = data_manager.aggregate_stats("a")
+    assert stats.loc["sleep_hours", "count"] == 2
+    assert stats.loc["sleep_hours", "total"] == 14.0
+
+
+def test_bypassing_write_leaves_the_store_stale_until_rebuilt(tmp_path):
+    data_csv = str(tmp_path / "saved_data.csv")
+    data_manager = DataManager(data_csv=data_csv, aggregates=True)
+    data_manager.save_entries([entry("a", "2024-05-01", sleep=6.0)])
+
+    # A writer without aggregates, like import_entries.py
+    DataManager(data_csv=data_csv).save_entries([entry("a", "2024-05-02", sleep=9.0)])
+    assert not data_manager.aggregates_current()
+
+    # Reads do not rebuild: the store still holds the old totals
+    stats = data_manager.aggregate_stats("a")
+    assert stats.loc["sleep_hours", "count"] == 1
+    assert not data_manager.aggregates_current()
+
+    # The weekly summary falls back to the entries meanwhile
+    engine = AnalysisEngine(data_manager=data_manager)
+    weekly = engine.weekly_summary(data_manager.load_user_entries("a"), user_id="a")
+    assert weekly["sleep_hours"].tolist() == [7.5]
+
+    assert data_manager.rebuild_aggregates()
+    assert data_manager.aggregates_current()
+    stats = data_manager.aggregate_stats("a")
+    assert stats.loc["sleep_hours", "count"] == 2
+    assert not data_manager.rebuild_aggregates()
+
+
+def test_store_next_to_existing_entries_starts_stale(tmp_path):
+    data_csv = str(tmp_path / "saved_data.csv")
+    DataManager(data_csv=data_csv).save_entries([entry("a", "2024-05-01")])
+    data_manager = DataManager(data_csv=data_csv, aggregates=True)
+    assert not data_manager.aggregates_current()
+    assert data_manager.rebuild_aggregates()
+    weekly = data_manager.aggregate_weekly("a")
+    assert len(weekly) > 0
+
+
+def test_min_and_max_follow_overwrites_of_the_current_extreme(tmp_path):
+    data_manager = DataManager(data_csv=str(tmp_path / "saved_data.csv"), aggregates=True)
+    data_manager.save_entries([entry("a", "2024-05-01", sleep=5.0, mood=3),
+                               entry("a", "2024-05-02", sleep=7.0, mood=6),
+                               entry("a", "2024-05-03", sleep=9.0, mood=9),
+                               entry("b", "2024-05-01", sleep=4.0, mood=1)])
+    stats = data_manager.aggregate_stats("a")
+    assert (stats.loc["sleep_hours", "min"], stats.loc["sleep_hours", "max"]) == (5.0, 9.0)
+
+    # Lower the maximum and raise the minimum
+    data_manager.save_entries([entry("a", "2024-05-03", sleep=6.0, mood=9),
+                               entry("a", "2024-05-01", sleep=8.0, mood=3)])
+    stats = data_manager.aggregate_stats("a")
+    assert (stats.loc["sleep_hours", "min"], stats.loc["sleep_hours", "max"]) == (6.0, 8.0)
+    assert stats.loc["sleep_hours", "count"] == 3
+    assert stats.loc["sleep_hours", "total"] == 21.0
+    assert (stats.loc["mood", "min"], stats.loc["mood", "max"]) == (3.0, 9.0)
+
+    # Other users are untouched, and the result matches a full rebuild
+    assert data_manager.aggregate_stats("b").loc["sleep_hours", "max"] == 4.0
+    df, signature = data_manager.backend.snapshot()
+    data_manager.aggregates.rebuild(df, signature)
+    pd.testing.assert_frame_equal(data_manager.aggregate_stats("a"), stats)
@@ -0,0 +1,75 @@
+# tests/test_data_manager.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from managers.data_manager import DataManager
+from managers.schema import COLUMNS, KEY_COLUMNS
+from managers.storage import make_backend
+
+
+def entry(user_id, day, sleep=7.5, mood=8, stress=2, activity=40):
+    return {"date": day, "user_id": user_id, "sleep_hours": sleep, "mood": mood, "stress": stress,
+            "activity_min": activity, "notes": ""}
+
+
+def sorted_entries(df):
+    df = df.assign(user_id=df["user_id"].astype(str))
+    return df.sort_values(KEY_COLUMNS).reset_index(drop=True)
+
+
+def test_cache_follows_writes_made_outside_the_data_manager(tmp_path):
+    data_csv = str(tmp_path / "saved_data.csv")
+    data_manager = DataManager(data_csv=data_csv)
+    data_manager.save_entries([entry("a", "2024-05-01", sleep=6.0)])
+    assert len(data_manager.load_entries()) == 1
+    hits = DataManager.cache_stats()["hits"]
+    data_manager.load_entries()
+    assert DataManager.cache_stats()["hits"] == hits + 1
+
+    # Another process writing straight to the storage files
+    other = make_backend("csv", data_csv)
+    other.upsert(pd.DataFrame([entry("a", "2024-05-01", sleep=9.0), entry("b", "2024-05-01")]))
+    loaded = sorted_entries(data_manager.load_entries())
+    assert loaded["user_id"].tolist() == ["a", "b"]
+    assert loaded["sleep_hours"].tolist() == [9.0, 7.5]
+
+    other.compact()
+    pd.testing.assert_frame_equal(sorted_entries(data_manager.load_entries()), loaded)
+
+    # A rewrite of the main file by hand
+    pd.DataFrame([entry("c", "2024-06-01")]).reindex(columns=COLUMNS).to_csv(data_csv, index=False)
+    assert data_manager.load_entries()["user_id"].astype(str).tolist() == ["c"]
+
+
+@pytest.mark.parametrize("kind", ["csv", "sqlite", "parquet"])
+def test_query_matches_a_filtered_full_scan(tmp_path, kind):
+    if kind == "parquet":
+        pytest.importorskip("pyarrow")
+    rng = np.random.default_rng(3)
+    days = pd.date_range("2024-01-01", periods=90).strftime("%Y-%m-%d")
+    data_manager = DataManager(data_csv=str(tmp_path / "saved_data.csv"), backend=kind)
+    for _ in range(3):
+        data_manager.save_entries([entry(str(rng.choice(["a", "b", "c"])), str(rng.choice(days)),
+                                         sleep=float(rng.integers(40, 100)) / 10) for _ in range(150)])
+    everything = data_manager.load_entries()
+    data_manager.use_cache = False
+
+    for user_id, start, end in [("a", "2024-02-01", "2024-02-29"), (None, "2024-03-15", None),
+                                ("b", None, "2024-01-10"), (None, "2024-01-05", "2024-01-05"),
+                                ("c", None, None), ("nobody", None, None)]:
+        mask = pd.Series(True, index=everything.index)
+        if user_id is not None:
+            mask &= everything["user_id"].astype(str) == user_id
+        if start is not None:
+            mask &= everything["date"] >= pd.Timestamp(start)
+        if end is not None:
+            mask &= everything["date"] <= pd.Timestamp(end)
+        expected = sorted_entries(everything[mask])
+        result = sorted_entries(data_manager.query(user_id=user_id, start=start, end=end))
+        if expected.empty:
+            # pandas may give an empty date column a different resolution
+            assert result.empty
+            continue
+        pd.testing.assert_frame_equal(result[KEY_COLUMNS + ["sleep_hours"]],
+                                      expected[KEY_COLUMNS + ["sleep_hours"]])
@@ -0,0 +1,102 @@
+# tests/test_forecast_engine.py
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+
+from managers.data_manager import DataManager
+from managers.forecast_engine import ForecastEngine, ForecastState
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def entry(user_id, day, sleep=7.0, mood=7, stress=3, activity=30):
+    return {"date": day, "user_id": user_id, "sleep_hours": sleep, "mood": mood, "stress": stress,
+            "activity_min": activity, "notes": ""}
+
+
+def seed(data_manager):
+    """
+    Two users; "slow" stops logging a week before "fast".
+    """
+    rng = np.random.default_rng(0)
+    days = pd.date_range("2024-03-01", periods=30).strftime("%Y-%m-%d")
+    rows = [entry("fast", d, sleep=round(float(rng.normal(7, 1)), 2), mood=int(rng.integers(1, 11))) for d in days]
+    rows += [entry("slow", d, activity=int(rng.integers(0, 90))) for d in days[:23]]
+    data_manager.save_entries(rows)
+
+
+def run_forecasts(tmp_path):
+    result = subprocess.run(
+        [sys.executable, os.path.join(ROOT, "run_forecasts.py"), "--data-csv", str(tmp_path / "saved_data.csv"),
+         "--state", str(tmp_path / "state.npz"), "--output", str(tmp_path / "forecasts.csv")],
+        cwd=ROOT, capture_output=True, text=True, check=True)
+    return result.stdout
+
+
+def assert_state_matches_full_fit(tmp_path):
+    state = ForecastState.load(str(tmp_path / "state.npz"))
+    full = ForecastEngine().fit(DataManager(data_csv=str(tmp_path / "saved_data.csv")).load_entries())
+    rows = full.users.get_indexer(state.users)
+    np.testing.assert_allclose(state.level, full.level[rows], equal_nan=True)
+    np.testing.assert_allclose(state.trend, full.trend[rows])
+    np.testing.assert_array_equal(state.last, full.last[rows])
+    assert not state.stale
+
+
+def test_next_run_picks_up_an_entry_saved_for_the_as_of_day(tmp_path):
+    data_manager = DataManager(data_csv=str(tmp_path / "saved_data.csv"))
+    seed(data_manager)
+    run_forecasts(tmp_path)
+    as_of = ForecastState.load(str(tmp_path / "state.npz")).as_of
+
+    data_manager.save_entries([entry("fast", as_of.strftime("%Y-%m-%d"), sleep=4.0, mood=2)])
+    output = run_forecasts(tmp_path)
+    assert "Refitted 1 users" in output
+    assert_state_matches_full_fit(tmp_path)
+
+
+def test_next_run_catches_up_users_behind_the_newest(tmp_path):
+    data_manager = DataManager(data_csv=str(tmp_path / "saved_data.csv"))
+    seed(data_manager)
+    run_forecasts(tmp_path)
+
+    # After the slow user's latest entry but before the global as_of, and a back-dated edit
+    data_manager.save_entries([entry("slow", "2024-03-25", activity=80), entry("slow", "2024-03-26", activity=5)])
+    run_forecasts(tmp_path)
+    assert_state_matches_full_fit(tmp_path)
+
+    # Back-dated edit inside the re-read window, which now starts at the slow user's latest entry
+    assert ForecastState.load(str(tmp_path / "state.npz")).resume_from == pd.Timestamp("2024-03-26")
+    data_manager.save_entries([entry("fast", "2024-03-27", sleep=9.0)])
+    output = run_forecasts(tmp_path)
+    assert "Refitted 1 users" in output
+    assert_state_matches_full_fit(tmp_path)
+
+
+def test_unchanged_storage_refits_nobody(tmp_path):
+    data_manager = DataManager(data_csv=str(tmp_path / "saved_data.csv"))
+    seed(data_manager)
+    run_forecasts(tmp_path)
+    data_manager.save_entries([entry("new", "2024-03-31")])
+    output = run_forecasts(tmp_path)
+    assert "Refitted" not in output
+    assert_state_matches_full_fit(tmp_path)
+
+
+def test_update_then_catch_up_agrees_with_a_full_fit(tmp_path):
+    data_manager = DataManager(data_csv=str(tmp_path / "saved_data.csv"))
+    seed(data_manager)
+    engine = ForecastEngine()
+    engine.fit(data_manager.load_entries())
+    data_manager.add_save_listener(engine.on_save)
+    data_manager.save_entries([entry("fast", "2024-03-31", sleep=6.0), entry("slow", "2024-03-10", stress=9)])
+    assert engine.state.stale == {"slow"}
+    engine.refit(data_manager.load_entries())
+    engine.catch_up(data_manager.query(start=engine.state.resume_from))
+    assert not engine.state.stale
+    full = ForecastEngine().fit(data_manager.load_entries())
+    rows = full.users.get_indexer(engine.state.users)
+    np.testing.assert_allclose(engine.state.level, full.level[rows], equal_nan=True)
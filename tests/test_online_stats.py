@@ -0,0 +1,101 @@
+# tests/test_online_stats.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from managers.analysis_engine import AnalysisEngine
+from managers.online_stats import OnlineStats
+from managers.schema import NUMERIC_COLS
+
+MOMENTS = ["count", "mean", "std", "min", "max"]
+
+
+def make_entries(n_users=6, days=50, seed=0, missing=0.1):
+    """
+    Random entries with a share of missing values in every metric.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("2024-01-01", periods=days).strftime("%Y-%m-%d")
+    df = pd.DataFrame({
+        "date": np.tile(dates, n_users),
+        "user_id": np.repeat([f"user{i}" for i in range(n_users)], days),
+        "sleep_hours": rng.normal(7, 1, n_users * days).round(2),
+        "mood": rng.integers(1, 11, n_users * days).astype(float),
+        "stress": rng.integers(1, 11, n_users * days).astype(float),
+        "activity_min": rng.normal(35, 20, n_users * days).round(),
+        "notes": "",
+    })
+    for c in NUMERIC_COLS:
+        df.loc[rng.random(len(df)) < missing, c] = np.nan
+    return df
+
+
+def assert_matches_pandas(stats, df):
+    """
+    Compare the accumulators with AnalysisEngine's pandas results over the same entries.
+    """
+    engine = AnalysisEngine()
+    expected = engine.summary_stats(df)
+    pd.testing.assert_frame_equal(stats.summary()[MOMENTS], expected[MOMENTS].astype(float),
+                                  check_exact=False, rtol=1e-9, atol=1e-9)
+    pd.testing.assert_frame_equal(stats.correlations(), engine.correlations(df).astype(float),
+                                  check_exact=False, rtol=1e-9, atol=1e-9)
+
+
+@pytest.mark.parametrize("chunksize", [1, 7, 64, 10000])
+def test_chunked_updates_match_pandas(chunksize):
+    df = make_entries()
+    stats = OnlineStats()
+    for start in range(0, len(df), chunksize):
+        stats.update(df.iloc[start:start + chunksize])
+    assert_matches_pandas(stats, df)
+
+
+def test_merged_shards_match_pandas():
+    df = make_entries(seed=1)
+    shards = [df[df["user_id"].isin(["user0", "user1"])], df[~df["user_id"].isin(["user0", "user1"])]]
+    left, right = (OnlineStats().update(shard) for shard in shards)
+    assert_matches_pandas(left.merge(right), df)
+
+
+def test_merge_with_empty_accumulators():
+    df = make_entries(seed=2)
+    assert_matches_pandas(OnlineStats().merge(OnlineStats().update(df)), df)
+    assert_matches_pandas(OnlineStats().update(df).merge(OnlineStats()), df)
+
+
+def test_constant_and_all_missing_columns():
+    df = make_entries(seed=3)
+    df["mood"] = 5.0
+    df["activity_min"] = np.nan
+    stats = OnlineStats()
+    for chunk in np.array_split(np.arange(len(df)), 5):
+        stats.update(df.iloc[chunk])
+    assert_matches_pandas(stats, df)
+    corr = stats.correlations()
+    assert corr.loc["mood"].isna().all()
+    assert corr.loc["activity_min"].isna().all()
+    assert stats.summary().loc["activity_min", "count"] == 0
+
+
+def test_large_offset_is_numerically_stable():
+    # Spread and correlation do not depend on the offset, so the unshifted data gives exact references
+    df = make_entries(seed=4, missing=0.0)
+    shifted = df.assign(activity_min=df["activity_min"] + 1e9)
+    stats = OnlineStats()
+    for start in range(0, len(shifted), 13):
+        stats.update(shifted.iloc[start:start + 13])
+    engine = AnalysisEngine()
+    expected = engine.summary_stats(df)
+    summary = stats.summary()
+    assert summary.loc["activity_min", "std"] == pytest.approx(expected.loc["activity_min", "std"], rel=1e-9)
+    assert summary.loc["activity_min", "mean"] - 1e9 == pytest.approx(expected.loc["activity_min", "mean"],
+                                                                      abs=1e-6)
+    pd.testing.assert_frame_equal(stats.correlations(), engine.correlations(df).astype(float),
+                                  check_exact=False, rtol=1e-8, atol=1e-8)
+
+
+def test_empty_input():
+    stats = OnlineStats().update(make_entries().iloc[:0])
+    assert stats.summary()[MOMENTS].isna().all().all()
+    assert stats.correlations().isna().all().all()
@@ -0,0 +1,59 @@
+# tests/test_recommendation_store.py
+import json
+
+import pandas as pd
+
+from managers.data_manager import DataManager
+from managers.recommendation_store import RecommendationStore, recommendation_path_for
+from managers.recommendations_engine import RecommendationsEngine
+
+
+def entry(user_id, day, sleep=7.5, mood=8, stress=2, activity=40):
+    return {"date": day, "user_id": user_id, "sleep_hours": sleep, "mood": mood, "stress": stress,
+            "activity_min": activity, "notes": ""}
+
+
+def wire(data_manager):
+    """
+    Set up the store as AppContainer does.
+    """
+    store = RecommendationStore(recommendation_path_for(data_manager.backend.files()[0]), RecommendationsEngine())
+    store.seed(data_manager)
+    data_manager.add_save_listener(store.apply)
+    return store
+
+
+def in_sync(store, data_manager):
+    return store.source_signature() == json.dumps(data_manager.backend.signature())
+
+
+def test_save_through_data_manager_lands_in_a_new_store(tmp_path):
+    data_manager = DataManager(data_csv=str(tmp_path / "saved_data.csv"))
+    store = wire(data_manager)
+    data_manager.save_entries([entry("a", "2024-05-01"), entry("a", "2024-05-02", sleep=5.0)])
+    history = store.history("a")
+    assert history["date"].dt.strftime("%Y-%m-%d").tolist() == ["2024-05-01", "2024-05-02"]
+    assert store.latest("a")["sleep_hours"] == "high"
+    assert in_sync(store, data_manager)
+
+
+def test_saves_land_in_a_store_that_missed_earlier_writes(tmp_path):
+    data_manager = DataManager(data_csv=str(tmp_path / "saved_data.csv"))
+    data_manager.save_entries([entry("a", "2024-05-01"), entry("b", "2024-05-01")])
+    store = wire(data_manager)
+    assert store.source_signature() is None  # Entries exist, so the store is not seeded
+
+    data_manager.save_entries([entry("a", "2024-05-02", mood=2)])
+    assert store.latest("a")["mood"] == "high"
+    assert not in_sync(store, data_manager)
+
+    # A write that bypasses the listener leaves the signature behind; later saves still land
+    data_manager.backend.write(pd.DataFrame([entry("b", "2024-05-02")]))
+    data_manager.save_entries([entry("a", "2024-05-03")])
+    assert len(store.history("a")) == 2
+
+    store.sync(data_manager)
+    assert in_sync(store, data_manager)
+    assert len(store.history("a")) == 3 and len(store.history("b")) == 2
+    data_manager.save_entries([entry("b", "2024-05-03")])
+    assert in_sync(store, data_manager)
@@ -0,0 +1,82 @@
+# tests/test_recommendations_engine.py
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from managers.recommendation_rules import DEFAULT_RULES, RULE_COLUMNS
+from managers.recommendations_engine import RecommendationsEngine
+from managers.schema import NUMERIC_COLS
+
+# Values generate() must handle: missing, unparseable, on every default threshold and out of range
+ODD_VALUES = [
+    np.nan, None, pd.NA, pd.NaT, "", " ", "abc", "7 hours", [7], "nan", "inf", "-inf", " 7", "1_000",
+    True, False, -1, 0, 1, 3, 3.5, 4, 6, 6.5, 7, 9, 9.01, 10, 14.99, 15, 29.99, 30, 1e9, -np.inf, np.inf,
+]
+
+# Many bounds per metric, so classifying takes the binary search instead of comparisons
+FINE_RULES = pd.DataFrame(
+    [("sleep_hours", low, low + 0.5, closed, level, f"Sleep {{low}}–{{high}} ({closed})")
+     for low, closed, level in zip(np.arange(0, 12, 0.5), itertools.cycle(["left", "right", "both", "neither"]),
+                                   itertools.cycle(["healthy", "moderate", "high"]))]
+    + [("stress", 5, None, "neither", "high", "Stress above 5"), ("stress", None, None, "both", "healthy", "Stress ok")],
+    columns=RULE_COLUMNS,
+).astype({"low": float, "high": float})
+
+
+def assert_batch_matches_generate(engine, df):
+    """
+    generate_batch() must give exactly the tips of generate() on every row.
+    """
+    batch = engine.generate_batch(df, render=True)
+    assert batch.index.equals(df.index)
+    for i, row in enumerate(df.to_dict("records")):
+        assert batch["tips"].iat[i] == engine.generate(row), row
+
+
+@pytest.mark.parametrize("rules", [DEFAULT_RULES, FINE_RULES], ids=["default", "fine"])
+def test_odd_values_in_object_columns(rules):
+    engine = RecommendationsEngine()
+    engine.set_rules(rules)
+    rng = np.random.default_rng(0)
+    picks = rng.integers(0, len(ODD_VALUES), size=(500, len(NUMERIC_COLS)))
+    df = pd.DataFrame({c: pd.Series([ODD_VALUES[k] for k in picks[:, j]], dtype=object)
+                       for j, c in enumerate(NUMERIC_COLS)})
+    assert_batch_matches_generate(engine, df)
+
+
+def test_every_odd_value_in_every_metric():
+    engine = RecommendationsEngine()
+    df = pd.DataFrame({c: pd.Series(ODD_VALUES, dtype=object) for c in NUMERIC_COLS})
+    assert_batch_matches_generate(engine, df)
+
+
+@pytest.mark.parametrize("rules", [DEFAULT_RULES, FINE_RULES], ids=["default", "fine"])
+def test_numeric_columns_on_and_around_thresholds(rules):
+    engine = RecommendationsEngine()
+    engine.set_rules(rules)
+    edges = np.unique(rules[["low", "high"]].to_numpy(dtype=float))
+    edges = edges[~np.isnan(edges)]
+    values = np.concatenate([edges, np.nextafter(edges, -np.inf), np.nextafter(edges, np.inf),
+                             [np.nan, -np.inf, np.inf, -1e9, 1e9]])
+    df = pd.DataFrame({c: np.resize(np.roll(values, j), len(values)) for j, c in enumerate(NUMERIC_COLS)})
+    assert_batch_matches_generate(engine, df)
+
+
+def test_typed_and_nullable_columns():
+    engine = RecommendationsEngine()
+    df = pd.DataFrame({
+        "sleep_hours": pd.array([7.0, None, 6.5, 9.5], dtype="Float64"),
+        "mood": pd.array([5, None, 7, 1], dtype="Int64"),
+        "stress": pd.array([True, False, None, True], dtype="boolean"),
+        "activity_min": pd.Series(["30", "", None, "15.0"], dtype="string"),
+    }, index=[10, 20, 30, 40])
+    assert_batch_matches_generate(engine, df)
+
+
+def test_missing_columns_and_empty_frames():
+    engine = RecommendationsEngine()
+    assert_batch_matches_generate(engine, pd.DataFrame({"mood": [3, 8, np.nan]}))
+    assert_batch_matches_generate(engine, pd.DataFrame({"notes": ["a", "b"]}))
+    assert engine.generate_batch(pd.DataFrame(columns=NUMERIC_COLS))["tips"].tolist() == []
@@ -0,0 +1,33 @@
+# tests/test_sample_data_generator.py
+import pandas as pd
+
+from managers.data_manager import DataManager
+from managers.sample_data_generator import SampleDataGenerator
+
+
+def entry(user_id, day, sleep="7.5", mood="8", stress="2", activity="40"):
+    return {"date": day, "user_id": user_id, "sleep_hours": sleep, "mood": mood, "stress": stress,
+            "activity_min": activity, "notes": ""}
+
+
+def test_values_outside_the_storage_dtype_are_out_of_range_not_missing(tmp_path):
+    df = pd.DataFrame([
+        entry("a", "2024-05-01", mood="300", activity="70000"),
+        entry("a", "2024-05-02", mood="", stress="abc"),
+        entry("a", "2024-05-03", sleep="25", stress="-1"),
+    ])
+    report = SampleDataGenerator(users_csv=str(tmp_path / "users.csv")).validate_data(df)
+    assert report.loc["mood"].tolist() == [3, 1, 1]
+    assert report.loc["activity_min"].tolist() == [3, 0, 1]
+    assert report.loc["stress"].tolist() == [3, 1, 1]
+    assert report.loc["sleep_hours"].tolist() == [3, 0, 1]
+
+
+def test_chunks_are_validated_like_one_frame(tmp_path):
+    data_manager = DataManager(data_csv=str(tmp_path / "saved_data.csv"))
+    data_manager.save_entries([entry("a", f"2024-05-{d:02d}", mood=str(d * 20)) for d in range(1, 8)])
+    generator = SampleDataGenerator(users_csv=str(tmp_path / "users.csv"))
+    whole = generator.validate_data(data_manager.backend.snapshot()[0])
+    chunked = generator.validate_data(data_manager.backend.iter_chunks(chunksize=3))
+    pd.testing.assert_frame_equal(whole, chunked)
+    assert chunked.loc["mood", "out_of_range"] == 7
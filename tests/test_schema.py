@@ -0,0 +1,38 @@
+# tests/test_schema.py
+import pandas as pd
+
+from managers.data_manager import DataManager
+from managers.schema import to_typed_frame
+
+
+def raw(**metrics):
+    row = {"date": "2024-05-01", "user_id": "a", "sleep_hours": "7.5", "mood": "8", "stress": "2",
+           "activity_min": "40", "notes": ""}
+    row.update(metrics)
+    return row
+
+
+def test_integer_metrics_that_do_not_fit_exactly_become_missing():
+    typed = to_typed_frame(pd.DataFrame([
+        raw(mood="6.5", stress="2.5", activity_min="30.5"),
+        raw(mood="7.0", stress="3", activity_min="45"),
+        raw(mood="300", stress="x", activity_min="70000"),
+    ]))
+    assert str(typed["mood"].dtype) == "Int8"
+    assert typed["mood"].tolist() == [pd.NA, 7, pd.NA]
+    assert typed["stress"].tolist() == [pd.NA, 3, pd.NA]
+    assert typed["activity_min"].tolist() == [pd.NA, 45, pd.NA]
+
+
+def test_fractional_sleep_is_kept():
+    typed = to_typed_frame(pd.DataFrame([raw(sleep_hours="6.25")]))
+    assert str(typed["sleep_hours"].dtype) == "Float32"
+    assert typed["sleep_hours"].iloc[0] == 6.25
+
+
+def test_stored_fractional_mood_loads_as_missing(tmp_path):
+    data_manager = DataManager(data_csv=str(tmp_path / "saved_data.csv"))
+    data_manager.save_entries([raw(mood="6.5"), raw(date="2024-05-02", mood="6")])
+    loaded = data_manager.load_user_entries("a").sort_values("date")
+    assert loaded["mood"].isna().tolist() == [True, False]
+    assert loaded["mood"].iloc[1] == 6
@@ -0,0 +1,96 @@
+# tests/test_storage.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from managers.schema import COLUMNS, KEY_COLUMNS, NUMERIC_COLS, to_typed_frame
+from managers.storage import make_backend
+
+BACKENDS = [
+    ("csv", {}),
+    ("csv", {"append_only": False}),
+    ("sqlite", {}),
+    ("parquet", {}),
+]
+
+
+def open_backend(tmp_path, kind, options):
+    if kind == "parquet":
+        pytest.importorskip("pyarrow")
+    return make_backend(kind, str(tmp_path / "saved_data.csv"), **options)
+
+
+def batch(rng, users, days, n):
+    """
+    Random records, with repeated (user_id, date) keys within and across batches.
+    """
+    return pd.DataFrame({
+        "date": rng.choice(pd.date_range("2024-01-01", periods=days).strftime("%Y-%m-%d"), n),
+        "user_id": rng.choice(users, n),
+        "sleep_hours": rng.integers(40, 100, n) / 10,
+        "mood": rng.integers(1, 11, n),
+        "stress": rng.integers(1, 11, n),
+        "activity_min": rng.integers(0, 120, n),
+        "notes": rng.choice(["", "ok", "tired"], n),
+    }).reindex(columns=COLUMNS)
+
+
+def canonical(df):
+    """
+    Typed entries sorted by key, for comparing what backends return.
+    """
+    typed = to_typed_frame(df.reindex(columns=COLUMNS))
+    typed["user_id"] = typed["user_id"].astype(str)
+    typed["notes"] = typed["notes"].astype(object).where(typed["notes"].notna(), None)
+    return typed.sort_values(KEY_COLUMNS).reset_index(drop=True)
+
+
+# SQLite relies on its own transactions instead of the write journal
+@pytest.mark.parametrize("kind,options", [b for b in BACKENDS if b[0] != "sqlite"])
+def test_journal_is_replayed_after_an_interrupted_write(tmp_path, kind, options):
+    backend = open_backend(tmp_path, kind, options)
+    backend.upsert(pd.DataFrame([{"date": "2024-05-01", "user_id": "a", "sleep_hours": 7.0, "mood": 5,
+                                  "stress": 3, "activity_min": 20, "notes": ""}]))
+    pending = pd.DataFrame([
+        {"date": "2024-05-01", "user_id": "a", "sleep_hours": 8.0, "mood": 6, "stress": 2,
+         "activity_min": 30, "notes": "redo"},
+        {"date": "2024-05-02", "user_id": "b", "sleep_hours": 6.5, "mood": 7, "stress": 4,
+         "activity_min": 45, "notes": ""},
+    ]).reindex(columns=COLUMNS)
+    # The process dies after journaling the batch, before applying it
+    backend.journal.record(pending)
+
+    reopened = open_backend(tmp_path, kind, options)
+    assert reopened.journal.pending().empty
+    stored = canonical(reopened.read())
+    pd.testing.assert_frame_equal(stored, canonical(pending))
+
+
+@pytest.mark.parametrize("kind,options", BACKENDS)
+def test_upserts_and_compaction_match_last_write_wins(tmp_path, kind, options):
+    rng = np.random.default_rng(7)
+    batches = [batch(rng, ["a", "b", "c"], 20, 40) for _ in range(5)]
+    expected = canonical(pd.concat(batches, ignore_index=True).drop_duplicates(subset=KEY_COLUMNS, keep="last"))
+
+    backend = open_backend(tmp_path, kind, options)
+    for rows in batches:
+        backend.upsert(rows)
+    pd.testing.assert_frame_equal(canonical(backend.read()), expected)
+    pd.testing.assert_frame_equal(canonical(backend.compact()), expected)
+    pd.testing.assert_frame_equal(canonical(backend.read()), expected)
+    pd.testing.assert_frame_equal(canonical(open_backend(tmp_path, kind, options).read()), expected)
+
+
+def test_backends_agree_on_the_same_writes(tmp_path):
+    rng = np.random.default_rng(11)
+    batches = [batch(rng, ["a", "b"], 10, 25) for _ in range(4)]
+    results = []
+    for kind, options in BACKENDS:
+        folder = tmp_path / f"{kind}-{len(results)}"
+        folder.mkdir()
+        backend = open_backend(folder, kind, options)
+        for rows in batches:
+            backend.upsert(rows)
+        results.append(canonical(backend.read())[KEY_COLUMNS + NUMERIC_COLS])
+    for result in results[1:]:
+        pd.testing.assert_frame_equal(result, results[0])